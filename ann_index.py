@@ -0,0 +1,276 @@
+"""
+Chỉ mục ANN (Approximate Nearest Neighbour) kiểu IVF, viết thuần NumPy,
+cho bài toán tìm Top-K theo tích vô hướng (MIPS) trên vector recipe.
+
+- Gom cụm (k-means) các vector item thành ``nlist`` cụm.
+- Lưu item theo thứ tự cụm ⇒ mỗi cụm là 1 dải liên tục trong ma trận ``vectors``.
+- Khi truy vấn chỉ quét ``nprobe`` cụm có tâm gần query nhất.
+  ``nprobe`` là núm vặn recall/latency: càng lớn càng chính xác nhưng càng chậm
+  (``nprobe = nlist`` ⇒ bằng quét toàn bộ).
+
+Bias của item (nếu có) được gắn thêm làm 1 chiều cuối của vector, query gắn thêm 1
+⇒ ``[q, 1] · [v, b] = q·v + b`` giống hệt điểm của SVDScorer.
+
+Dùng từ dòng lệnh::
+
+    python ann_index.py build --vectors svd_factors.npz --key item_factors --bias-key item_bias --out ann_index_svd
+    python ann_index.py bench --index ann_index_svd --vectors svd_factors.npz --key item_factors --bias-key item_bias
+
+Index lưu thành thư mục (``centroids.npy``, ``offsets.npy``, ``item_positions.npy``,
+``vectors.npy`` + ``meta.json`` ghi ``nprobe``) và được mở bằng memory-map: mọi worker trên
+cùng máy dùng chung 1 bản ``vectors`` trong page cache.
+
+``bench`` mặc định dùng chính các hàng ``user_factors`` trong file factors làm query (đúng
+tải thật: user × item); vector item + nhiễu cho recall cao hơn thực tế khá nhiều.
+``build`` có query user thì hiệu chỉnh luôn: ``nprobe`` nhỏ nhất đạt ``TARGET_RECALL`` được lưu
+trong index. Engine chỉ dùng index đã hiệu chỉnh, chưa có thì quét toàn bộ (exact).
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from scoring import top_k
+
+
+SVD_INDEX_PATH = Path("ann_index_svd")
+TAG_INDEX_PATH = Path("ann_index_tag")
+_INDEX_ARRAYS = ("centroids", "offsets", "item_positions", "vectors")
+# Hiệu chỉnh bằng ``bench`` với query là user thật trên factors đã train (~1000 cụm):
+# recall@20 ≈ 0.58 (nprobe 16), 0.79 (32), 0.92 (64) ⇒ 64 (~6% catalog mỗi query)
+DEFAULT_NPROBE = 64
+TARGET_RECALL = 0.9
+
+
+def _augment(vectors, bias=None) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if bias is None:
+        return np.ascontiguousarray(vectors)
+    return np.hstack([vectors, np.asarray(bias, dtype=np.float32)[:, None]])
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, block: int = 16384) -> np.ndarray:
+    """Gán mỗi vector vào tâm gần nhất (L2), tính theo block cho đỡ tốn RAM."""
+    c_norm = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), block):
+        xb = x[start:start + block]
+        # ||x - c||² = ||x||² - 2x·c + ||c||², bỏ ||x||² vì không đổi theo c
+        out[start:start + block] = np.argmin(c_norm - 2.0 * xb @ centroids.T, axis=1)
+    return out
+
+
+def kmeans(x: np.ndarray, k: int, n_iter: int = 15, sample: int = 65536, seed: int = 0) -> np.ndarray:
+    """K-means (Lloyd) trên một mẫu ngẫu nhiên của x, trả về ma trận tâm cụm (k × d)."""
+    rng = np.random.default_rng(seed)
+    if len(x) > sample:
+        x = x[rng.choice(len(x), sample, replace=False)]
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _assign(x, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+        # Cụm rỗng ⇒ khởi tạo lại bằng một điểm ngẫu nhiên
+        n_empty = int((~nonempty).sum())
+        if n_empty:
+            centroids[~nonempty] = x[rng.choice(len(x), n_empty, replace=False)]
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index: ``centroids`` + các dải item liên tục theo cụm."""
+
+    def __init__(self, centroids, offsets, item_positions, vectors, nprobe: int | None = None):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.item_positions = np.asarray(item_positions, dtype=np.int32)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        # nprobe đã hiệu chỉnh (``calibrate``) đạt TARGET_RECALL; None = chưa hiệu chỉnh
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, vectors, bias=None, nlist: int | None = None, n_iter: int = 15, seed: int = 0):
+        """
+        Xây index từ ma trận vector item (N × d) và bias (N,) tuỳ chọn.
+        Mặc định ``nlist ≈ 2·√N`` (≈ 1000 cụm cho 231K recipe).
+        """
+        x = _augment(vectors, bias)
+        if nlist is None:
+            nlist = max(1, int(2 * np.sqrt(len(x))))
+        nlist = min(nlist, len(x))
+        centroids = kmeans(x, nlist, n_iter=n_iter, seed=seed)
+        labels = _assign(x, centroids)
+        order = np.argsort(labels, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))])
+        return cls(centroids, offsets, order, x[order])
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map thư mục index (chỉ đọc, dùng chung giữa các worker); None nếu chưa build."""
+        path = Path(path)
+        if not (path / "meta.json").exists():
+            return None
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = [np.load(path / f"{name}.npy", mmap_mode="r") for name in _INDEX_ARRAYS]
+        return cls(*arrays, nprobe=meta.get("nprobe"))
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in _INDEX_ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        # meta.json ghi cuối cùng: có meta ⇒ các file .npy đã đủ
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"nprobe": self.nprobe}, f, indent=2)
+
+    def calibrate(self, vectors, bias, queries, k: int = 20, target: float = TARGET_RECALL,
+                  n_queries: int = 200) -> list:
+        """
+        Gán ``self.nprobe`` = nprobe nhỏ nhất (1, 2, 4, …, nlist) có recall@K ≥ ``target`` trên
+        ``queries`` (vd. user_factors); trả về kết quả ``benchmark`` đã đo.
+        """
+        nprobes = [1 << i for i in range(int(np.log2(self.nlist)) + 1)] + [self.nlist]
+        results = benchmark(self, vectors, bias, queries, k=k, nprobes=sorted(set(nprobes)), n_queries=n_queries)
+        self.nprobe = next(r["nprobe"] for r in results[1:] if r["recall"] >= target or r["nprobe"] == self.nlist)
+        return results
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def search(self, query, k: int = 20, nprobe: int | None = None, exclude=None):
+        """
+        Tìm Top-K item theo tích vô hướng với ``query``.
+        - ``query``: vector user (d,) — nếu index có gắn bias thì tự thêm chiều 1.
+        - ``nprobe``: số cụm được quét (mặc định: giá trị đã hiệu chỉnh, không có thì ``DEFAULT_NPROBE``).
+        - ``exclude``: vị trí item cần loại (vd. recipe user đã rate).
+        Trả về (vị trí item, điểm), đã sort giảm dần.
+        """
+        q = np.asarray(query, dtype=np.float32)
+        if len(q) == self.vectors.shape[1] - 1:
+            q = np.append(q, np.float32(1.0))
+        nprobe = (self.nprobe or DEFAULT_NPROBE) if nprobe is None else nprobe
+        nprobe = max(1, min(int(nprobe), self.nlist))
+        probes = top_k(self.centroids @ q, nprobe)
+        # Mỗi cụm là 1 dải liên tục ⇒ ghép các dải rồi nhân 1 lần
+        ranges = [np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes]
+        cand = np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+        scores = self.vectors[cand] @ q
+        positions = self.item_positions[cand]
+        if exclude is not None and len(exclude):
+            scores[np.isin(positions, exclude)] = -np.inf
+        best = top_k(scores, k)
+        return positions[best], scores[best]
+
+
+def _load_vectors(path, key=None, bias_key=None):
+    path = Path(path)
+    if path.suffix == ".npy":
+        return np.load(path, mmap_mode="r"), None
+    with np.load(path) as z:
+        vectors = z[key or z.files[0]]
+        bias = z[bias_key] if bias_key else None
+    return vectors, bias
+
+
+def _load_queries(path, key):
+    """Ma trận query ``key`` trong file ``.npz`` (vd. user_factors); None nếu không có."""
+    path = Path(path)
+    if path.suffix == ".npy" or not key:
+        return None
+    with np.load(path) as z:
+        return z[key] if key in z.files else None
+
+
+def benchmark(index: IVFIndex, vectors, bias=None, queries=None, k: int = 20,
+              nprobes=(1, 2, 4, 8, 16, 32, 64), n_queries: int = 200, seed: int = 0):
+    """
+    So sánh ANN với quét toàn bộ (exact): recall@K và latency trung bình / query.
+    ``queries``: vd. ``user_factors`` (lấy mẫu ``n_queries`` hàng); không có thì dùng chính
+    các vector item ± nhiễu nhỏ (recall cao hơn tải thật).
+    Trả về list dict: {"nprobe", "recall", "ms"} (nprobe=None là exact scan).
+    """
+    x = _augment(vectors, bias)
+    rng = np.random.default_rng(seed)
+    if queries is None:
+        base = np.asarray(vectors, dtype=np.float32)[rng.choice(len(x), n_queries, replace=False)]
+        queries = base + rng.normal(0, base.std() * 0.1, base.shape).astype(np.float32)
+    if len(queries) > n_queries:
+        queries = np.asarray(queries)[np.sort(rng.choice(len(queries), n_queries, replace=False))]
+    queries = np.asarray(queries, dtype=np.float32)
+
+    def aug(q):
+        return np.append(q, np.float32(1.0)) if bias is not None else q
+
+    t0 = time.perf_counter()
+    truth = [top_k(x @ aug(q), k) for q in queries]
+    results = [{"nprobe": None, "recall": 1.0, "ms": (time.perf_counter() - t0) * 1000 / len(queries)}]
+
+    for nprobe in nprobes:
+        hits = 0
+        t0 = time.perf_counter()
+        found = [index.search(q, k, nprobe=nprobe)[0] for q in queries]
+        ms = (time.perf_counter() - t0) * 1000 / len(queries)
+        for f, t in zip(found, truth):
+            hits += len(np.intersect1d(f, t))
+        results.append({"nprobe": nprobe, "recall": hits / (k * len(queries)), "ms": ms})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build / benchmark IVF index cho vector recipe")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("build", "bench"):
+        p = sub.add_parser(name)
+        p.add_argument("--vectors", required=True, help=".npz (kèm --key) hoặc .npy")
+        p.add_argument("--key", default="item_factors")
+        p.add_argument("--bias-key", default=None)
+        if name == "build":
+            p.add_argument("--out", required=True)
+            p.add_argument("--nlist", type=int, default=None)
+            p.add_argument("--iters", type=int, default=15)
+            p.add_argument("--queries-key", default="user_factors",
+                           help="mảng query trong --vectors để hiệu chỉnh nprobe (không có ⇒ không hiệu chỉnh)")
+            p.add_argument("--target-recall", type=float, default=TARGET_RECALL)
+        else:
+            p.add_argument("--index", required=True)
+            p.add_argument("--k", type=int, default=20)
+            p.add_argument("--queries", type=int, default=200)
+            p.add_argument("--queries-key", default="user_factors",
+                           help="mảng query trong --vectors (.npz); không có ⇒ vector item + nhiễu")
+            p.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128])
+    args = parser.parse_args()
+
+    vectors, bias = _load_vectors(args.vectors, args.key, args.bias_key)
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        index = IVFIndex.build(vectors, bias, nlist=args.nlist, n_iter=args.iters)
+        print(f"Built {index.nlist} lists over {len(index.vectors)} items in {time.perf_counter() - t0:.1f}s")
+        queries = _load_queries(args.vectors, args.queries_key)
+        if queries is None:
+            print(f"No {args.queries_key!r} in {args.vectors}: index not calibrated, engine will scan exactly")
+        else:
+            results = index.calibrate(vectors, bias, queries, target=args.target_recall)
+            recall = next(r["recall"] for r in results if r["nprobe"] == index.nprobe)
+            print(f"Calibrated nprobe={index.nprobe} (recall@20 {recall:.3f}, target {args.target_recall})")
+        index.save(args.out)
+        print(f"Saved → {args.out}")
+    else:
+        index = IVFIndex.load(args.index)
+        queries = _load_queries(args.vectors, args.queries_key)
+        if queries is None:
+            print(f"No {args.queries_key!r} in {args.vectors}: using noisy item vectors as queries")
+        print(f"{'nprobe':>8} {'recall@' + str(args.k):>10} {'ms/query':>10}")
+        for r in benchmark(index, vectors, bias, queries, k=args.k, nprobes=args.nprobe, n_queries=args.queries):
+            label = "exact" if r["nprobe"] is None else r["nprobe"]
+            print(f"{label:>8} {r['recall']:>10.4f} {r['ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
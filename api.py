@@ -0,0 +1,205 @@
+"""
+API JSON headless cho engine gợi ý, không qua vòng rerun của Streamlit; dùng chung
+``engine.py`` (cùng artifact, cùng logic chọn đường gợi ý) với ``app.py``.
+
+    python api.py --port 8000
+    curl 'localhost:8000/recommend?user=1533&model=best&k=10'
+    curl -X POST localhost:8000/recommend -d '{"users": [1533, 2046], "model": "fast", "k": 20}'
+    curl 'localhost:8000/image?name=chicken+curry'
+    curl 'localhost:8000/health'
+
+- ``ThreadingHTTPServer`` + HTTP/1.1: mỗi kết nối 1 thread, kết nối được giữ (keep-alive)
+  giữa các request vì mọi response đều có ``Content-Length``.
+- Artifact load lúc khởi động rồi hot reload theo version (``artifacts.py``): mỗi request lấy
+  engine hiện tại 1 lần và dùng nó tới hết request, kể cả khi version mới được swap vào giữa chừng.
+- Lỗi trả về JSON ``{"error": ...}`` với mã 400 (tham số sai) / 404 (user / đường dẫn lạ).
+"""
+import argparse
+import json
+import os
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from artifacts import HotReloader
+from blending import MODEL_PRESETS
+from image_cache import ImageCache
+from images import ImageResolver, RateLimiter
+
+
+DEFAULT_PORT = 8000
+MAX_K = 100
+MAX_BATCH_USERS = 1000
+MAX_BODY_BYTES = 1 << 20
+IMAGE_DEADLINE_SEC = 6.0
+_INT = re.compile(r"-?[0-9]+")
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(value, name: str, default=None, low=None, high=None) -> int:
+    if value is None:
+        if default is None:
+            raise ApiError(400, f"missing parameter: {name}")
+        return default
+    # Chỉ nhận int (không nhận bool) hoặc chuỗi chữ số, không để true ⇒ 1 hay 2.7 ⇒ 2 lọt qua
+    if isinstance(value, str) and _INT.fullmatch(value.strip()):
+        value = int(value)
+    elif isinstance(value, bool) or not isinstance(value, int):
+        raise ApiError(400, f"{name} must be an integer")
+    if (low is not None and value < low) or (high is not None and value > high):
+        raise ApiError(400, f"{name} must be in [{low}, {high}]")
+    return value
+
+
+def _model_param(value) -> str:
+    model = value or "best"
+    if model not in MODEL_PRESETS:
+        raise ApiError(400, f"unknown model {model!r}, expected one of {sorted(MODEL_PRESETS)}")
+    return model
+
+
+class RecommendHandler(BaseHTTPRequestHandler):
+    """Handler dùng ``server.store`` / ``server.resolver`` (gắn vào server lúc khởi tạo)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, code="-", size="-"):
+        # Chỉ ghi log request lỗi, không ghi mọi request thành công
+        if isinstance(code, int) and code >= 400:
+            super().log_request(code, size)
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, route):
+        try:
+            self._send_json(200, route())
+        except ApiError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except Exception as e:  # lỗi không lường trước: vẫn trả JSON, giữ kết nối
+            self.log_error("unhandled error: %r", e)
+            self._send_json(500, {"error": "internal error"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        routes = {
+            "/recommend": lambda: self.recommend_one(query),
+            "/image": lambda: self.image(query),
+            "/health": self.health,
+        }
+        self._dispatch(routes.get(url.path, self.not_found))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        routes = {"/recommend": self.recommend_batch}
+        self._dispatch(routes.get(url.path, self.not_found))
+
+    def not_found(self):
+        raise ApiError(404, f"no route {urlparse(self.path).path}")
+
+    def health(self):
+        engine = self.server.store.current()
+        return {
+            "status": "ok",
+            "version": engine.version,
+            "online": engine.blender is not None,
+            "users": len(engine.scorer.user_ids) if engine.scorer is not None else None,
+        }
+
+    def recommend_one(self, query: dict):
+        engine = self.server.store.current()
+        user_id = _int_param(query.get("user"), "user")
+        model = _model_param(query.get("model"))
+        k = _int_param(query.get("k"), "k", default=20, low=1, high=MAX_K)
+        if not engine.has_user(user_id, model):
+            raise ApiError(404, f"unknown user {user_id}")
+        t0 = time.perf_counter()
+        engine.sync()
+        ids, source = engine.recommend(user_id, model, k)
+        return {
+            "user": user_id,
+            "model": model,
+            "source": source,
+            "ms": round((time.perf_counter() - t0) * 1000, 2),
+            "items": [engine.recipe(rid) for rid in ids],
+        }
+
+    def recommend_batch(self):
+        length = _int_param(self.headers.get("Content-Length"), "Content-Length", low=0, high=MAX_BODY_BYTES)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ApiError(400, "body must be JSON") from None
+        if not isinstance(body, dict) or not isinstance(body.get("users"), list):
+            raise ApiError(400, 'body must be {"users": [...], "model": ..., "k": ...}')
+        users = [_int_param(u, "users[]") for u in body["users"]]
+        if len(users) > MAX_BATCH_USERS:
+            raise ApiError(400, f"at most {MAX_BATCH_USERS} users per request")
+        model = _model_param(body.get("model"))
+        k = _int_param(body.get("k"), "k", default=20, low=1, high=MAX_K)
+
+        engine = self.server.store.current()
+        t0 = time.perf_counter()
+        engine.sync()
+        results = engine.recommend_many(users, model, k)
+        return {
+            "model": model,
+            "k": k,
+            "ms": round((time.perf_counter() - t0) * 1000, 2),
+            "results": {str(u): ids for u, ids in results.items()},
+        }
+
+    def image(self, query: dict):
+        name = (query.get("name") or "").strip()
+        if not name:
+            raise ApiError(400, "missing parameter: name")
+        return {"name": name, "url": self.server.resolver.resolve(name, limiter=self.server.limiter)}
+
+
+def make_server(store, host: str = "127.0.0.1", port: int = DEFAULT_PORT, resolver=None):
+    """
+    Server chưa chạy (gọi ``serve_forever``); port 0 ⇒ port ngẫu nhiên, tiện cho test local.
+    ``store``: ``HotReloader`` (hoặc object bất kỳ có ``current()`` trả về engine).
+    """
+    server = ThreadingHTTPServer((host, port), RecommendHandler)
+    server.daemon_threads = True
+    server.store = store
+    server.resolver = resolver or ImageResolver(os.environ.get("SPOONACULAR_API_KEY", ""), ImageCache(),
+                                                hedged=True, deadline=IMAGE_DEADLINE_SEC)
+    # 1 token bucket cho cả API: không đốt hết quota Spoonacular
+    server.limiter = RateLimiter()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON API gợi ý recipe (dùng chung engine với app.py)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    store = HotReloader()
+    # API không có "first paint": load hết trước khi nhận request để request đầu không phải chờ
+    engine = store.current().warm()
+    for name, seconds in engine.load_report():
+        print(f"  {name:<20} {seconds * 1000:8.1f} ms")
+    server = make_server(store, args.host, args.port)
+    print(f"Loaded artifacts {store.version or '(working directory)'} in {time.perf_counter() - t0:.1f}s, "
+          f"serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
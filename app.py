@@ -1,91 +1,66 @@
+import time
+# Mốc đầu mỗi lần chạy script: báo cáo thời gian khởi động (cuối trang) tính từ đây
+RUN_T0 = time.perf_counter()
+
 import streamlit as st
-import pickle
 import base64
 from pathlib import Path
 
 import os
-import requests
-import re
+from concurrent.futures import wait
+
+from blending import MODEL_PRESETS
+from image_cache import ImageCache
+from images import ImageResolver, RateLimiter
+from media import build_media
+from diversity import DEFAULT_LAMBDA
+from artifacts import HotReloader
+from recipe_grid import pop_event, recipe_grid
+
+run_marks = [("Import module", time.perf_counter() - RUN_T0)]
 
 
 SPOONACULAR_API_KEY = st.secrets["SPOONACULAR_API_KEY"]
 
-PLACEHOLDER_NO_KEY = "https://via.placeholder.com/600x400?text=No+API+Key"
-PLACEHOLDER_NO_IMAGE = "https://via.placeholder.com/600x400?text=No+Image"
+IMAGE_RATE_PER_SEC = 2.0
+IMAGE_RATE_BURST = 5
+PREFETCH_WAIT_SEC = 1.5
+IMAGE_DEADLINE_SEC = 6.0
+SIMILAR_COUNT = 8
+USER_PAGE_SIZE = 30
+RECENT_USERS = 10
+SEARCH_RESULTS = 24
+REC_PAGE_SIZE = 20
+TAB_LABELS = ["📊 Data & EDA", "🤖 Model & Recommendation", "🔍 Tìm món"]
+# Key widget của tab khuyến nghị / tìm món (prefix): giữ lại state khi tab đang ẩn
+REC_WIDGET_KEYS = ("model_choice", "user_query", "user_page", "user_id", "alpha_", "tag_expr", "mmr")
+SEARCH_WIDGET_KEYS = ("recipe_query",)
+
+@st.cache_resource
+def load_image_resolver():
+    # Session HTTP keep-alive + thread pool + cache ảnh trên đĩa (SQLite), dùng chung cho mọi session.
+    # hedged: 3 chiến lược query chạy đua, tổng thời gian không quá IMAGE_DEADLINE_SEC
+    return ImageResolver(SPOONACULAR_API_KEY, ImageCache(), hedged=True, deadline=IMAGE_DEADLINE_SEC)
+
+def session_rate_limiter():
+    # Mỗi session Streamlit 1 token bucket riêng ⇒ không ai đốt hết quota API
+    if "image_rate_limiter" not in st.session_state:
+        st.session_state["image_rate_limiter"] = RateLimiter(IMAGE_RATE_PER_SEC, IMAGE_RATE_BURST)
+    return st.session_state["image_rate_limiter"]
 
-@st.cache_data(show_spinner=False)
 def get_image_url(name: str):
     """
     Lấy ảnh minh hoạ cho món ăn bằng Spoonacular, cố gắng xử lý tên cho “thông minh”:
     - Bỏ chuỗi 'Recipe 71606'… nếu có.
     - Chuẩn hoá khoảng trắng/ký tự lạ.
-    - Thử lần lượt: full name → phần trước dấu phẩy/with/and → từ cuối cùng.
+    - Chạy song song: full name → phần trước dấu phẩy/with/and → từ cuối cùng,
+      ưu tiên kết quả theo đúng thứ tự đó, không quá IMAGE_DEADLINE_SEC giây.
     - Nếu vẫn không được thì trả placeholder.
-    Kết quả được cache theo tên ⇒ cùng 1 món chỉ gọi API 1 lần.
+    Kết quả (kể cả không có ảnh / lỗi HTTP) được cache trên đĩa theo tên đã chuẩn hoá,
+    mỗi loại có TTL riêng ⇒ cùng 1 món chỉ gọi API 1 lần cho mọi process.
+    Nếu món đang được prefetch thì chờ đúng request đó thay vì gọi lại.
     """
-    if not SPOONACULAR_API_KEY:
-        return PLACEHOLDER_NO_KEY
-
-    raw = str(name)
-
-    # Bỏ "Recipe 71606" nếu tồn tại trong name
-    base = re.sub(r"(?i)recipe\s*\d*", "", raw)
-    # Thay _ và - bằng khoảng trắng, gom nhiều khoảng trắng
-    base = re.sub(r"[_\-]", " ", base)
-    base = re.sub(r"\s+", " ", base).strip()
-
-    if not base:
-        base = "food"
-
-    def query_spoonacular(q: str) -> str | None:
-        """Gọi Spoonacular, trả về URL ảnh nếu có, ngược lại None."""
-        url = "https://api.spoonacular.com/recipes/complexSearch"
-        params = {
-            "query": q,
-            "number": 1,
-            "apiKey": SPOONACULAR_API_KEY,
-        }
-        try:
-            res = requests.get(url, params=params, timeout=5)
-            # Nếu hết quota hoặc lỗi 4xx/5xx thì in ra log cho dễ debug
-            if not res.ok:
-                print("Spoonacular HTTP error:", res.status_code, res.text[:200])
-                return None
-
-            data = res.json()
-            results = data.get("results") or []
-            if results and results[0].get("image"):
-                img = results[0]["image"]
-                print("DEBUG Image for", q, "→", img)
-                return img
-        except Exception as e:
-            print("Spoonacular exception:", e)
-        return None
-
-    # Chiến lược 1: dùng full name
-    img = query_spoonacular(base)
-    if img:
-        return img
-
-    # Chiến lược 2: lấy phần trước dấu phẩy / ' with ' / ' and '
-    simplified = re.split(r",| with | and ", base, maxsplit=1)[0].strip()
-    if simplified and simplified.lower() != base.lower():
-        img = query_spoonacular(simplified)
-        if img:
-            return img
-
-    # Chiến lược 3: dùng từ cuối cùng (thường là loại món: cake, soup, crepes,…)
-    parts = base.split()
-    if parts:
-        last_word = parts[-1]
-        if last_word and last_word.lower() not in {simplified.lower(), base.lower()}:
-            img = query_spoonacular(last_word)
-            if img:
-                return img
-
-    # Không tìm được ảnh phù hợp
-    print("DEBUG: No image for", raw, "→ dùng placeholder")
-    return PLACEHOLDER_NO_IMAGE
+    return load_image_resolver().resolve(name, limiter=session_rate_limiter())
 
 
 
@@ -134,13 +109,31 @@ def get_short_recipe_snippet(name: str, tags=None):
 
     return ingredients, steps
 
+@st.cache_data(show_spinner=False)
 def get_base64_image(image_path):
     with open(image_path, "rb") as img_file:
         return base64.b64encode(img_file.read()).decode()
 
 ASSETS = Path("assets")
+
+@st.cache_resource
+def load_media():
+    # Build 1 lần / process (file đã có thì bỏ qua): WebP nhiều cỡ + MP4 faststart trong static/media
+    try:
+        return build_media(ASSETS)
+    except OSError as e:
+        print("Media build failed:", e)
+        return {}
+
+def media_source(path: Path, mime: str) -> dict:
+    """URL tĩnh (có hash) của media; nếu chưa build được thì quay về data URI base64."""
+    entry = load_media().get(path.name)
+    if entry:
+        return entry
+    return {"src": f"data:{mime};base64,{get_base64_image(path)}"}
+
 bg_path = ASSETS / "bg_food.jpg"
-bg_img = get_base64_image(bg_path) if bg_path.exists() else None
+bg_url = media_source(bg_path, "image/jpeg")["src"] if bg_path.exists() else None
 
 # --- CSS: Professional, accessible, cards as layers, tab styling + image optimization ---
 st.markdown(f"""
@@ -168,7 +161,7 @@ st.markdown(f"""
 
 /* Background with improved contrast */
 .stApp {{
-    {f'background-image: url("data:image/jpg;base64,{bg_img}");' if bg_img else ''}
+    {f'background-image: url("{bg_url}");' if bg_url else ''}
     background-size: cover;
     background-position: center;
     background-attachment: fixed;
@@ -457,6 +450,14 @@ st.markdown(f"""
     opacity: 1;
 }}
 
+.recipe-thumb {{
+    width: 100%;
+    height: 120px;
+    object-fit: cover;
+    border-radius: 10px;
+    margin-bottom: 0.6rem;
+}}
+
 .recipe-title {{
     font-weight: 700;
     color: var(--accent-contrast);
@@ -551,16 +552,20 @@ div[data-testid="stImage"] {{
 # overlay element
 st.markdown('<div class="app-overlay"></div>', unsafe_allow_html=True)
 
-# --- Load pickles cached resource ---
+run_marks.append(("CSS + media", time.perf_counter() - RUN_T0))
+
+# --- Load artifact (cached resource, hot reload theo version) ---
 @st.cache_resource
-def load_data():
-    with open('recommendations_3models.pkl', 'rb') as f:
-        recs = pickle.load(f)
-    with open('recipe_info.pkl', 'rb') as f:
-        info = pickle.load(f)
-    return recs, info
+def load_engine_store():
+    # Artifact theo version trong artifacts/ (artifacts.py): version mới được load + build index
+    # ở thread nền, engine cũ vẫn phục vụ tới lúc swap; chưa có manifest thì load thư mục hiện tại
+    return HotReloader()
 
-recs, recipe_info = load_data()
+# Mỗi lần chạy script lấy engine hiện tại: logic chọn đường gợi ý dùng chung với api.py.
+# Engine load lười: artifact (catalog, factors, đặc trưng của từng model...) chỉ được đọc
+# khi tab / model cần tới, trang đầu không phải chờ load model nào
+engine = load_engine_store().current()
+run_marks.append(("Khởi tạo engine", time.perf_counter() - RUN_T0))
 
 # --- header ---
 st.markdown("""
@@ -570,10 +575,21 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# === 2 TABS ===
-tab1, tab2 = st.tabs(["📊 Data & EDA", "🤖 Model & Recommendation"])
+# === 3 TABS ===
+# Tab lười (on_change="rerun"): chỉ chạy code của tab đang mở (xem cuối file)
+tab1, tab2, tab3 = st.tabs(TAB_LABELS, key="main_tab", on_change="rerun")
+run_marks.append(("Header + tabs (first paint)", time.perf_counter() - RUN_T0))
+
 
-with tab1:
+def keep_widget_state(prefixes):
+    # Widget của tab đang ẩn không được chạy ⇒ Streamlit xoá state của nó cuối lần chạy;
+    # gán lại giá trị để quay lại tab vẫn giữ lựa chọn cũ
+    for key in list(st.session_state.keys()):
+        if key.startswith(prefixes):
+            st.session_state[key] = st.session_state[key]
+
+
+def render_eda_tab():
     # Section header
     st.markdown("""
     <div class="section-header">
@@ -624,10 +640,11 @@ with tab1:
     st.markdown('<div class="eda-container">', unsafe_allow_html=True)
     for img_path, caption in eda_images:
         if img_path.exists():
-            img_b64 = get_base64_image(img_path)
+            img = media_source(img_path, "image/png")
+            srcset = f' srcset="{img["srcset"]}" sizes="(max-width: 900px) 100vw, 50vw"' if img.get("srcset") else ""
             st.markdown(f"""
             <div class="eda-card">
-                <img src="data:image/png;base64,{img_b64}" alt="{caption}">
+                <img src="{img['src']}"{srcset} loading="lazy" alt="{caption}">
                 <div class="eda-caption">{caption}</div>
             </div>
             """, unsafe_allow_html=True)
@@ -658,11 +675,11 @@ with tab1:
         st.markdown('<div class="eda-container" style="grid-template-columns: repeat(2, 1fr);">', unsafe_allow_html=True)
         for video_path, caption in eda_videos:
             if video_path.exists():
-                video_b64 = get_base64_image(video_path)
+                video = media_source(video_path, "video/mp4")
                 st.markdown(f"""
                 <div class="eda-card">
-                    <video width="100%" style="border-radius: 10px; box-shadow: 0 2px 8px rgba(0,0,0,0.06);" autoplay loop muted playsinline>
-                        <source src="data:video/mp4;base64,{video_b64}" type="video/mp4">
+                    <video width="100%" style="border-radius: 10px; box-shadow: 0 2px 8px rgba(0,0,0,0.06);" autoplay loop muted playsinline preload="metadata">
+                        <source src="{video['src']}" type="video/mp4">
                         Your browser does not support the video tag.
                     </video>
                     <div class="eda-caption">{caption}</div>
@@ -677,7 +694,191 @@ with tab1:
         st.markdown('</div>', unsafe_allow_html=True)
 
 
-with tab2:
+# --- Fragments tab khuyến nghị: click trong grid / panel chỉ rerun đúng phần đó,
+# không chạy lại CSS, tab EDA hay bước chấm điểm ---
+
+@st.fragment
+def render_model_metrics(model_key):
+    st.markdown("""
+    <div class="section-header">
+        <h3>📊 Hiệu suất Model</h3>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Metrics từ artifact offline evaluation (evaluation.py); chưa có thì dùng số của bản gốc
+    metrics = engine.metrics
+    regression_title = "Regression Metrics"
+    if metrics and model_key in metrics["models"]:
+        m = metrics["models"][model_key]
+        k = metrics["k"]
+        # RMSE / R² là của rating SVD, chung cho mọi model (điểm blend không phải rating)
+        rmse, r2 = f"{metrics['svd']['rmse']:.4f}", f"{metrics['svd']['r2']:.4f}"
+        regression_title = "Regression Metrics (SVD)"
+        p20, r20, ndcg20, map20 = (f"{m[f'{name}@{k}']:.4f}" for name in ("precision", "recall", "ndcg", "map"))
+    elif model_key == 'fast':
+        rmse, r2 = "0.9471", "0.0869"
+        p20, r20, ndcg20, map20 = "0.0050", "0.1000", "0.0384", "0.0222"
+    elif model_key == 'best':
+        rmse, r2 = "0.9467", "0.0878"
+        p20, r20, ndcg20, map20 = "0.0030", "0.0600", "0.0196", "0.0086"
+    else:  # tag
+        rmse, r2 = "0.9465", "0.0882"
+        p20, r20, ndcg20, map20 = "0.0080", "0.1600", "0.0621", "0.0415"
+
+    colm1, colm2 = st.columns([1, 1])
+    with colm1:
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, rgba(102,126,234,0.08), rgba(118,75,162,0.08)); 
+                    padding: 1.25rem; border-radius: 12px; border-left: 4px solid var(--accent-1);'>
+            <h4 style='margin: 0 0 1rem 0; color: var(--accent-contrast); font-size: 1.1rem; font-weight: 700;'>{regression_title}</h4>
+            <div style='display: grid; gap: 0.75rem;'>
+                <div class='stat' style='margin: 0;'>
+                    <div class='label'>RMSE</div>
+                    <div class='value'>{rmse}</div>
+                </div>
+                <div class='stat' style='margin: 0;'>
+                    <div class='label'>R²</div>
+                    <div class='value'>{r2}</div>
+                </div>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with colm2:
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, rgba(255,107,107,0.08), rgba(255,142,83,0.08)); 
+                    padding: 1.25rem; border-radius: 12px; border-left: 4px solid var(--accent-2);'>
+            <h4 style='margin: 0 0 1rem 0; color: var(--accent-contrast); font-size: 1.1rem; font-weight: 700;'>Ranking Metrics @ K=20</h4>
+            <div style='display: grid; gap: 0.75rem;'>
+                <div class='stat' style='margin:0;'><div class='label'>P@20</div><div class='value'>{p20}</div></div>
+                <div class='stat' style='margin:0;'><div class='label'>R@20</div><div class='value'>{r20}</div></div>
+                <div class='stat' style='margin:0;'><div class='label'>nDCG@20</div><div class='value'>{ndcg20}</div></div>
+                <div class='stat' style='margin:0;'><div class='label'>mAP@20</div><div class='value'>{map20}</div></div>
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+def select_recipe(rid_key):
+    st.session_state["selected_recipe"] = rid_key
+
+
+@st.fragment
+def render_recommendations(cursor):
+    # Click trong grid (component) chỉ rerun fragment này; xử lý trước khi vẽ lại grid.
+    # "Xem thêm": cursor trong session cắt thêm 1 trang đã xếp hạng
+    event = pop_event("rec_grid")
+    if event is not None and event["action"] == "select":
+        select_recipe(int(event["id"]))
+    elif event is not None and event["action"] == "more":
+        cursor.more(REC_PAGE_SIZE)
+
+    items = cursor.items
+    st.markdown(f"""
+    <div class="section-header" style="margin-top: 2rem;">
+        <h3>🍽️ Top-{len(items)} Recipe Đề Xuất</h3>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # Prefetch ảnh cho cả danh sách trên thread pool nền, chờ ngắn để card có thumbnail
+    resolver = load_image_resolver()
+    names = [engine.recipe_info.get(int(rid), {}).get('name', f"Recipe {int(rid)}") for rid in items]
+    pending = resolver.prefetch(names, limiter=session_rate_limiter())
+    if pending:
+        wait(pending, timeout=PREFETCH_WAIT_SEC)
+
+    # Grid 4 cột: 1 component, dữ liệu card là list JSON gọn [id, tên, tags, ảnh]
+    cards = []
+    for rid, name in zip(items, names):
+        tag_list = engine.recipe_info.get(int(rid), {}).get('tags') or []
+        tags = ", ".join(tag_list[:2]) if tag_list else "No tags"
+        cards.append([int(rid), name, tags, resolver.peek(name)])
+    more_label = f"⬇️ Xem thêm {REC_PAGE_SIZE} món" if cursor.has_more else None
+    recipe_grid(cards, key="rec_grid", selected=st.session_state.get("selected_recipe"), more_label=more_label)
+
+    render_recipe_detail()
+
+
+def rate_recipe(user_id, rid_key):
+    stars = st.session_state.get(f"rating_{user_id}_{rid_key}")
+    if stars is not None:
+        ms = engine.updater.rate(user_id, rid_key, stars + 1)
+        st.session_state["rating_saved"] = (rid_key, stars + 1, ms)
+
+
+@st.fragment
+def render_recipe_detail():
+    # Vừa chấm điểm ⇒ rerun cả app để Top-20 tính lại với factor mới của user
+    saved = st.session_state.pop("rating_saved", None)
+    if saved is not None:
+        st.session_state["last_rating"] = saved
+        st.rerun()
+
+    # Panel hiển thị hình minh hoạ cho món đang chọn
+    selected_id = st.session_state.get("selected_recipe")
+    if selected_id is not None:
+        info = engine.recipe_info.get(selected_id, {})
+        name = info.get('name', f"Recipe {selected_id}")
+        tag_list = info.get('tags', []) or []
+        tags = ", ".join(tag_list[:5]) if tag_list else "No tags"
+
+        img_url = get_image_url(name)
+
+        st.markdown("""
+        <div class="section-header" style="margin-top: 2rem;">
+            <h3>📷 Hình minh hoạ cho món bạn đã chọn</h3>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # 2 cột: trái là ảnh nhỏ, phải là box thông tin
+        col_img, col_info = st.columns([1, 1.4])
+
+        with col_img:
+            # Ảnh nhỏ để nét hơn
+            st.image(img_url, caption=name, width=320)
+            st.markdown(f"[🔗 Mở ảnh trong tab mới]({img_url})")
+            st.caption(f"Debug image URL: {img_url}")
+
+        with col_info:
+            # Sinh gợi ý nguyên liệu & cách làm ngắn
+            short_ing, short_steps = get_short_recipe_snippet(name, tag_list)
+
+            st.markdown(f"### {name}")
+            st.markdown(f"**Recipe ID:** `{selected_id}`")
+            st.markdown(f"**Tags:** {tags}")
+            st.markdown(f"**Gợi ý nguyên liệu:** {short_ing}")
+            st.markdown(f"**Cách làm gợi ý:** {short_steps}")
+
+            # Chấm điểm món: cập nhật ngay factor của user (fold-in) và Top-20
+            rec_user = st.session_state.get("rec_user")
+            if engine.updater is not None and engine.scorer.has_user(rec_user):
+                st.markdown("**Đánh giá của bạn:**")
+                st.feedback("stars", key=f"rating_{rec_user}_{selected_id}",
+                            on_change=rate_recipe, args=(rec_user, selected_id))
+                last = st.session_state.get("last_rating")
+                if last is not None and last[2] is not None:
+                    st.caption(f"Đã lưu {last[1]}⭐ cho recipe {last[0]} · cập nhật Top-20 trong {last[2]:.1f} ms")
+            st.markdown(
+                f"[🔍 Xem công thức chi tiết hơn trên web]"
+                f"(https://www.google.com/search?q={name.replace(' ', '+')}+recipe)"
+            )
+
+        # Món tương tự: đọc thẳng từ bảng láng giềng tính sẵn, không tính cosine lúc request
+        neighbours = engine.neighbours
+        similar = neighbours.similar(selected_id, SIMILAR_COUNT) if neighbours is not None else []
+        if similar:
+            st.markdown("#### 🍲 Món tương tự")
+            sim_cols = st.columns(4)
+            for i, (sim_id, score) in enumerate(similar):
+                with sim_cols[i % 4]:
+                    sim_name = engine.recipe_info.get(sim_id, {}).get('name', f"Recipe {sim_id}")
+                    st.button(f"{sim_name} · {score:.2f}", key=f"similar_{sim_id}",
+                              on_click=select_recipe, args=(sim_id,), use_container_width=True)
+
+
+def render_recommend_tab():
+    blender = engine.blender
+
     st.markdown("""
     <div class="section-header">
         <h2>⚙️ Chọn Model & User</h2>
@@ -689,6 +890,10 @@ with tab2:
         st.session_state["show_recs"] = False
     if "selected_recipe" not in st.session_state:
         st.session_state["selected_recipe"] = None
+    if "recent_users" not in st.session_state:
+        st.session_state["recent_users"] = []
+    if "user_page" not in st.session_state:
+        st.session_state["user_page"] = 1
 
     col1, col2 = st.columns(2)
     with col1:
@@ -699,7 +904,8 @@ with tab2:
                 "Hybrid CBF (α=0.7 SVD + 0.3 CBF)",
                 "Hybrid SVD+Tag (α=0.6 SVD + 0.4 Tag)"
             ],
-            help="Hybrid Simple: ưu tiên hành vi | Hybrid CBF: kết hợp nội dung | SVD+Tag: kết hợp tag genome"
+            help="Hybrid Simple: ưu tiên hành vi | Hybrid CBF: kết hợp nội dung | SVD+Tag: kết hợp tag genome",
+            key="model_choice",
         )
         # Ánh xạ model
         if "Simple" in model_choice:
@@ -710,143 +916,166 @@ with tab2:
             model_key = 'tag'
             
     with col2:
+        # Tìm theo prefix trên index đã sort: widget chỉ nhận user gần đây + 1 trang kết quả
+        user_index = engine.user_index(model_key)
+        search_col, page_col = st.columns([3, 1])
+        with search_col:
+            # Đổi query ⇒ về trang 1
+            user_query = st.text_input("Tìm User ID", placeholder="Gõ các chữ số đầu của ID", key="user_query",
+                                       on_change=lambda: st.session_state.update(user_page=1))
+        matches, total = user_index.search(user_query, page_size=USER_PAGE_SIZE)
+        n_pages = max((total + USER_PAGE_SIZE - 1) // USER_PAGE_SIZE, 1)
+        with page_col:
+            st.session_state["user_page"] = min(st.session_state["user_page"], n_pages)
+            page = st.number_input("Trang", min_value=1, max_value=n_pages, key="user_page",
+                                   disabled=n_pages == 1)
+        if page > 1:
+            matches, total = user_index.search(user_query, page=page - 1, page_size=USER_PAGE_SIZE)
+
+        recent = [u for u in st.session_state["recent_users"] if u in user_index]
         user_id = st.selectbox(
             "Chọn User ID",
-            sorted(recs[model_key].keys()),
-            help="10 user có nhiều tương tác nhất"
+            recent + [u for u in matches if u not in recent],
+            help=f"{total:,} / {len(user_index):,} user khớp · user xem gần đây ở đầu danh sách",
+            key="user_id",
+        )
+        if user_id is None:
+            st.caption("Không có user nào khớp.")
+
+    preset = MODEL_PRESETS[model_key]
+    alpha = preset["alpha"]
+    if blender is not None:
+        # Slider α: re-rank ngay, không cần pickle riêng cho mỗi trọng số
+        alpha = st.slider(
+            "α (trọng số SVD)",
+            min_value=0.0, max_value=1.0, value=preset["alpha"], step=0.05,
+            key=f"alpha_{model_key}",
+            help=f"Điểm = α·SVD + (1−α)·{preset['secondary'].upper()}"
+        )
+        if not blender.has_component(preset["secondary"]):
+            st.caption(f"⚠️ Chưa có đặc trưng {preset['secondary'].upper()} ⇒ chỉ dùng SVD.")
+
+    # Lọc theo tag: tính bằng bitmap, áp vào engine trước bước Top-K
+    tag_mask = None
+    if blender is not None:
+        tag_index = engine.tag_index()
+        tag_expr = st.text_input(
+            "Lọc theo tag",
+            placeholder="vd. vegetarian AND 30-minutes-or-less AND NOT dessert",
+            help="Dùng AND / OR / NOT (hoặc & | !) và ngoặc. Tag phổ biến: "
+                 + ", ".join(tag_index.popular_tags(8)),
+            key="tag_expr",
+        )
+        if tag_expr.strip():
+            try:
+                tag_mask = tag_index.mask(tag_expr)
+                st.caption(f"{int(tag_mask.sum()):,} recipe thoả điều kiện lọc")
+            except ValueError as e:
+                st.warning(f"Bộ lọc tag không hợp lệ: {e}")
+
+    # Đa dạng hoá: re-rank MMR trên vài trăm ứng viên điểm cao nhất
+    diversity_lambda = None
+    if blender is not None and st.toggle("Đa dạng hoá kết quả (MMR)", key="mmr"):
+        diversity_lambda = st.slider(
+            "λ (liên quan ↔ đa dạng)",
+            min_value=0.0, max_value=1.0, value=DEFAULT_LAMBDA, step=0.05, key="mmr_lambda",
+            help="λ = 1: giữ nguyên thứ hạng; λ nhỏ: ưu tiên món khác hẳn các món đã chọn"
         )
 
     # Nút sinh gợi ý
     if st.button("🎯 Recommend Top-20", type="primary", use_container_width=True):
         st.session_state["show_recs"] = True
         st.session_state["selected_recipe"] = None  # reset khi recommend lại
+        st.session_state.pop("rec_cursor", None)  # về trang đầu
 
     # Nếu đã bấm Recommend ít nhất 1 lần thì hiển thị kết quả
-    if st.session_state["show_recs"]:
-        top20 = recs[model_key][user_id]
-
-        st.markdown("""
-        <div class="section-header">
-            <h3>📊 Hiệu suất Model</h3>
-        </div>
-        """, unsafe_allow_html=True)
-
-        # Metrics cho 3 models (giữ nguyên như bản gốc)
-        if model_key == 'fast':
-            rmse, r2 = "0.9471", "0.0869"
-            p20, r20, ndcg20, map20 = "0.0050", "0.1000", "0.0384", "0.0222"
-        elif model_key == 'best':
-            rmse, r2 = "0.9467", "0.0878"
-            p20, r20, ndcg20, map20 = "0.0030", "0.0600", "0.0196", "0.0086"
-        else:  # tag
-            rmse, r2 = "0.9465", "0.0882"
-            p20, r20, ndcg20, map20 = "0.0080", "0.1600", "0.0621", "0.0415"
-
-        colm1, colm2 = st.columns([1, 1])
-        with colm1:
-            st.markdown(f"""
-            <div style='background: linear-gradient(135deg, rgba(102,126,234,0.08), rgba(118,75,162,0.08)); 
-                        padding: 1.25rem; border-radius: 12px; border-left: 4px solid var(--accent-1);'>
-                <h4 style='margin: 0 0 1rem 0; color: var(--accent-contrast); font-size: 1.1rem; font-weight: 700;'>Regression Metrics</h4>
-                <div style='display: grid; gap: 0.75rem;'>
-                    <div class='stat' style='margin: 0;'>
-                        <div class='label'>RMSE</div>
-                        <div class='value'>{rmse}</div>
-                    </div>
-                    <div class='stat' style='margin: 0;'>
-                        <div class='label'>R²</div>
-                        <div class='value'>{r2}</div>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with colm2:
-            st.markdown(f"""
-            <div style='background: linear-gradient(135deg, rgba(255,107,107,0.08), rgba(255,142,83,0.08)); 
-                        padding: 1.25rem; border-radius: 12px; border-left: 4px solid var(--accent-2);'>
-                <h4 style='margin: 0 0 1rem 0; color: var(--accent-contrast); font-size: 1.1rem; font-weight: 700;'>Ranking Metrics @ K=20</h4>
-                <div style='display: grid; gap: 0.75rem;'>
-                    <div class='stat' style='margin:0;'><div class='label'>P@20</div><div class='value'>{p20}</div></div>
-                    <div class='stat' style='margin:0;'><div class='label'>R@20</div><div class='value'>{r20}</div></div>
-                    <div class='stat' style='margin:0;'><div class='label'>nDCG@20</div><div class='value'>{ndcg20}</div></div>
-                    <div class='stat' style='margin:0;'><div class='label'>mAP@20</div><div class='value'>{map20}</div></div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        st.markdown("""
-        <div class="section-header" style="margin-top: 2rem;">
-            <h3>🍽️ Top-20 Recipe Đề Xuất</h3>
-        </div>
-        """, unsafe_allow_html=True)
+    if st.session_state["show_recs"] and user_id is not None:
+        st.session_state["rec_user"] = user_id
+        recent = [user_id] + [u for u in st.session_state["recent_users"] if u != user_id]
+        st.session_state["recent_users"] = recent[:RECENT_USERS]
+        # Rating mới từ session / process khác
+        engine.sync()
+        # Cursor "xem thêm" theo session: tạo lại khi đổi user / cấu hình / version artifact hoặc
+        # user vừa có rating mới (khi đó giữ nguyên số món đang hiển thị)
+        scorer = engine.scorer
+        cursor_key = (engine.version, user_id, model_key, alpha, st.session_state.get("tag_expr", ""),
+                      diversity_lambda, scorer.fold_count(user_id) if scorer is not None else 0)
+        cursor = st.session_state.get("rec_cursor")
+        old_key = st.session_state.get("rec_cursor_key")
+        if cursor is None or old_key != cursor_key:
+            shown = cursor.shown if cursor is not None and old_key[:-1] == cursor_key[:-1] else REC_PAGE_SIZE
+            # Cấu hình mặc định + user chưa rate thêm ⇒ Top-K tính sẵn; không thì chấm online + blend α
+            cursor = engine.cursor(user_id, model_key, first=shown, alpha=alpha, mask=tag_mask,
+                                   diversity=diversity_lambda)
+            st.session_state["rec_cursor"], st.session_state["rec_cursor_key"] = cursor, cursor_key
+
+        render_model_metrics(model_key)
+        render_recommendations(cursor)
+
+
+def render_search_tab():
+    st.markdown("""
+    <div class="section-header">
+        <h2>🔍 Tìm món theo tên / tag</h2>
+    </div>
+    """, unsafe_allow_html=True)
 
-        # Grid 4 cột các recipe
+    search_index, search_weights = engine.search_index()
+    query = st.text_input(
+        "Tên món hoặc tag",
+        placeholder="vd. chicken curry, vegetarian pasta, 30 min",
+        help="Mỗi từ khớp theo đầu từ (\"chick\" ⇒ chicken); món phải khớp mọi từ",
+        key="recipe_query",
+    )
+    if query.strip():
+        found, total = search_index.search(query, k=SEARCH_RESULTS, weights=search_weights)
+        order_note = " · phổ biến nhất trước" if search_weights is not None else ""
+        st.caption(f"{total:,} món khớp · hiển thị {len(found)}{order_note}")
         cols = st.columns(4)
-        for i, rid in enumerate(top20):
+        for i, rid in enumerate(found):
+            info = engine.recipe_info.get(rid, {})
+            name = info.get('name', f"Recipe {rid}")
+            tags = ", ".join(info.get('tags', [])[:3]) if info.get('tags') else "No tags"
             with cols[i % 4]:
-                rid_key = int(rid)
-
-                info = recipe_info.get(rid_key, {})
-                name = info.get('name', f"Recipe {rid_key}")
-                tags = ", ".join(info.get('tags', [])[:2]) if info.get('tags') else "No tags"
-                
                 st.markdown(f"""
                 <div class='recipe-card'>
                     <p style='margin:0;font-weight:600;color:#333;font-size:1.1rem;'>{name}</p>
-                    <p style='margin:0.3rem 0 0;font-size:0.9rem;color:#666;'><code>{rid_key}</code></p>
+                    <p style='margin:0.3rem 0 0;font-size:0.9rem;color:#666;'><code>{rid}</code></p>
                     <p style='margin:0.2rem 0 0;font-size:0.85rem;color:#FF6B6B;'>Tags: {tags}</p>
+                    <p style='margin:0.3rem 0 0;font-size:0.85rem;'>
+                        <a href="https://www.google.com/search?q={name.replace(' ', '+')}+recipe" target="_blank">🔗 Google</a>
+                    </p>
                 </div>
                 """, unsafe_allow_html=True)
 
-                # Nút xem hình cho từng recipe
-                if st.button("📷 Xem hình", key=f"img_{rid_key}"):
-                    st.session_state["selected_recipe"] = rid_key
-
-
-
-
-               # Panel hiển thị hình minh hoạ cho món đang chọn
-        selected_id = st.session_state.get("selected_recipe")
-        if selected_id is not None:
-            info = recipe_info.get(selected_id, {})
-            name = info.get('name', f"Recipe {selected_id}")
-            tag_list = info.get('tags', []) or []
-            tags = ", ".join(tag_list[:5]) if tag_list else "No tags"
-
-            img_url = get_image_url(name)
-
-            st.markdown("""
-            <div class="section-header" style="margin-top: 2rem;">
-                <h3>📷 Hình minh hoạ cho món bạn đã chọn</h3>
-            </div>
-            """, unsafe_allow_html=True)
-
-            # 2 cột: trái là ảnh nhỏ, phải là box thông tin
-            col_img, col_info = st.columns([1, 1.4])
-
-            with col_img:
-                # Ảnh nhỏ để nét hơn
-                st.image(img_url, caption=name, width=320)
-                st.markdown(f"[🔗 Mở ảnh trong tab mới]({img_url})")
-                st.caption(f"Debug image URL: {img_url}")
-
-            with col_info:
-                # Sinh gợi ý nguyên liệu & cách làm ngắn
-                short_ing, short_steps = get_short_recipe_snippet(name, tag_list)
-
-                st.markdown(f"### {name}")
-                st.markdown(f"**Recipe ID:** `{selected_id}`")
-                st.markdown(f"**Tags:** {tags}")
-                st.markdown(f"**Gợi ý nguyên liệu:** {short_ing}")
-                st.markdown(f"**Cách làm gợi ý:** {short_steps}")
-                st.markdown(
-                    f"[🔍 Xem công thức chi tiết hơn trên web]"
-                    f"(https://www.google.com/search?q={name.replace(' ', '+')}+recipe)"
-                )
-
-            
 
+# Chỉ tab đang mở được chạy: tab EDA không đụng tới artifact nào, tab khuyến nghị chỉ load
+# model đang chọn, index tìm món chỉ build khi mở tab tìm món
+tab_renders = [(render_eda_tab, ()), (render_recommend_tab, REC_WIDGET_KEYS), (render_search_tab, SEARCH_WIDGET_KEYS)]
+for label, tab, (render, widget_keys) in zip(TAB_LABELS, (tab1, tab2, tab3), tab_renders):
+    if tab.open:
+        with tab:
+            render()
+        run_marks.append((f"Tab {label}", time.perf_counter() - RUN_T0))
+    elif widget_keys:
+        keep_widget_state(widget_keys)
+
+# --- Báo cáo khởi động: mốc thời gian lần chạy đầu của phiên + artifact đã load ---
+startup_marks = st.session_state.setdefault("startup_marks", run_marks)
+with st.expander("⏱️ Thời gian khởi động"):
+    st.markdown("**Lần chạy đầu của phiên** (ms tính từ đầu script)")
+    st.table({"Mốc": [name for name, _ in startup_marks],
+              "ms": [round(seconds * 1000, 1) for _, seconds in startup_marks]})
+    report = engine.load_report()
+    if report:
+        st.markdown("**Artifact đã load** (lần đầu dùng tới, dùng chung mọi phiên)")
+        st.table({"Thành phần": [name for name, _ in report],
+                  "ms": [round(seconds * 1000, 1) for _, seconds in report]})
+    else:
+        st.caption("Chưa load artifact nào.")
+    cache_stats = load_image_resolver().cache.stats()
+    st.caption(f"Image cache (process này, chỉ tính lần tra ảnh món đã chọn): {cache_stats['hits']} hit · "
+               f"{cache_stats['misses']} miss · {cache_stats['expired']} hết hạn")
 
 # footer
 st.markdown("""
@@ -0,0 +1,221 @@
+"""
+Artifact theo version + hot reload không downtime.
+
+    artifacts/
+        manifest.json          {"current": "20240601-120000", "history": [...], "served": [...]}
+        20240601-120000/       svd_factors.npz, precomputed_recs/, recipe_catalog/, ...
+        20240608-120000/
+
+- ``publish``: copy thư mục artifact vào ``artifacts/.staging-<version>`` rồi rename
+  thành ``artifacts/<version>`` (worker không bao giờ thấy version copy dở), sau đó ghi
+  manifest mới bằng file tạm + ``os.replace`` (đổi version hiện tại là 1 thao tác nguyên tử).
+  Version cũ bị xoá theo thứ tự *đã từng phục vụ* (``served``: publish / rollback đều đưa
+  version lên đầu), không theo thứ tự publish; version đang phục vụ trước lần publish không
+  bao giờ bị xoá (worker còn dùng nó tới lần kiểm tra manifest sau).
+- ``HotReloader``: mỗi worker (session Streamlit, API) giữ 1 engine; tối đa 1 lần mỗi
+  ``poll_interval`` giây kiểm tra mtime của manifest. Có version mới ⇒ load + ``warm()``
+  trong thread nền, engine cũ vẫn phục vụ; xong thì swap bằng 1 phép gán tham chiếu.
+  Request đang chạy giữ engine cũ tới khi xong, request sau dùng engine mới — không có
+  request nào phải chờ load artifact hay build index.
+- Chưa có manifest ⇒ load artifact trong thư mục hiện tại như trước (không hot reload).
+
+    python artifacts.py publish build_out/ [--version V] [--keep 3]
+    python artifacts.py list
+    python artifacts.py rollback 20240601-120000
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from engine import RecommenderEngine
+
+
+ARTIFACTS_DIR = Path("artifacts")
+MANIFEST_NAME = "manifest.json"
+POLL_INTERVAL_SEC = 5.0
+# Giữ lại vài version cũ: engine cũ còn đọc file (shard tính sẵn mở lazy) + rollback nhanh
+DEFAULT_KEEP = 3
+
+
+def read_manifest(root=ARTIFACTS_DIR):
+    """Manifest hiện tại; None nếu chưa publish version nào."""
+    path = Path(root) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(root: Path, manifest: dict):
+    tmp = root / f"{MANIFEST_NAME}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, root / MANIFEST_NAME)
+
+
+def current_artifacts(root=ARTIFACTS_DIR) -> tuple:
+    """(version, thư mục artifact) đang được chọn; chưa có manifest ⇒ (None, thư mục hiện tại)."""
+    manifest = read_manifest(root)
+    if manifest is None or not manifest.get("current"):
+        return None, Path(".")
+    return manifest["current"], Path(root) / manifest["current"]
+
+
+def _served(manifest: dict) -> list:
+    """Các version theo thứ tự được phục vụ gần nhất (manifest cũ chưa có ``served``: theo thứ tự publish)."""
+    served = manifest.get("served") or [h["version"] for h in manifest["history"]]
+    current = manifest.get("current")
+    return ([current] if current else []) + [v for v in served if v != current]
+
+
+def publish(src, version: str | None = None, root=ARTIFACTS_DIR, keep: int = DEFAULT_KEEP) -> str:
+    """Copy ``src`` thành version mới và chuyển manifest sang version đó; trả về tên version."""
+    root, src = Path(root), Path(src)
+    if not src.is_dir():
+        raise FileNotFoundError(f"artifact directory not found: {src}")
+    version = version or time.strftime("%Y%m%d-%H%M%S")
+    dst = root / version
+    if dst.exists():
+        raise ValueError(f"version {version!r} already exists in {root}")
+    root.mkdir(parents=True, exist_ok=True)
+    staging = root / f".staging-{version}"
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.copytree(src, staging)
+    os.replace(staging, dst)
+
+    manifest = read_manifest(root) or {"history": []}
+    previous = manifest.get("current")
+    history = [h for h in manifest["history"] if h["version"] != version]
+    history.insert(0, {"version": version, "published_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+    served = [version] + [v for v in _served(manifest) if v != version]
+    # Giữ ``keep`` version phục vụ gần nhất + version đang phục vụ trước lần publish này
+    kept = set(served[:max(keep, 1)]) | {previous}
+    for old in history:
+        if old["version"] not in kept:
+            shutil.rmtree(root / old["version"], ignore_errors=True)
+    _write_manifest(root, {
+        "current": version,
+        "history": [h for h in history if h["version"] in kept],
+        "served": [v for v in served if v in kept],
+    })
+    return version
+
+
+
+def rollback(version: str, root=ARTIFACTS_DIR):
+    """Chuyển manifest về 1 version còn giữ trên đĩa; worker tự swap ở lần kiểm tra sau."""
+    root = Path(root)
+    manifest = read_manifest(root)
+    if manifest is None or not (root / version).is_dir():
+        raise ValueError(f"version {version!r} not found in {root}")
+    manifest["served"] = [version] + [v for v in _served(manifest) if v != version]
+    manifest["current"] = version
+    _write_manifest(root, manifest)
+
+
+class HotReloader:
+    """
+    Engine của version hiện tại; version mới được load ở thread nền rồi swap nguyên tử.
+    ``loader(path, version)`` trả về engine load lười: engine đầu tiên load dần theo request
+    (khởi động nhanh), engine thay thế được ``warm()`` hết trước khi swap.
+    """
+
+    def __init__(self, root=ARTIFACTS_DIR, loader=RecommenderEngine.load, poll_interval: float = POLL_INTERVAL_SEC):
+        self.root = Path(root)
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._loading = None
+        self._failed = None
+        self._mtime = self._manifest_mtime()
+        self._checked = time.monotonic()
+        # Lần đầu chưa có engine nào để phục vụ thay ⇒ tạo ngay, artifact load khi request cần
+        version, path = current_artifacts(self.root)
+        self._engine = loader(path, version)
+
+    @property
+    def version(self):
+        return self._engine.version
+
+    def _manifest_mtime(self):
+        try:
+            return (self.root / MANIFEST_NAME).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def current(self) -> RecommenderEngine:
+        """Engine đang phục vụ; kiểm tra manifest (chỉ 1 lần ``stat``) tối đa 1 lần / ``poll_interval``."""
+        now = time.monotonic()
+        if now - self._checked >= self.poll_interval:
+            self._checked = now
+            self.check()
+        return self._engine
+
+    def check(self) -> bool:
+        """Manifest trỏ tới version khác ⇒ bắt đầu load ở thread nền; True nếu vừa bắt đầu."""
+        mtime = self._manifest_mtime()
+        if mtime is None or mtime == self._mtime:
+            return False
+        version, path = current_artifacts(self.root)
+        with self._lock:
+            self._mtime = mtime
+            if version in (self._engine.version, self._loading, self._failed):
+                return False
+            self._loading = version
+        threading.Thread(target=self._load, args=(version, path), daemon=True,
+                         name=f"artifact-load-{version}").start()
+        return True
+
+    def _load(self, version, path):
+        t0 = time.perf_counter()
+        try:
+            engine = self.loader(path, version).warm()
+        except Exception as e:  # version lỗi: giữ engine cũ, không thử lại version này
+            print(f"Failed to load artifacts {version}: {e!r}")
+            with self._lock:
+                self._failed, self._loading = version, None
+            return
+        with self._lock:
+            # Swap: 1 phép gán; request đang chạy vẫn giữ tham chiếu tới engine cũ
+            self._engine, self._loading = engine, None
+        print(f"Swapped to artifacts {version} (loaded in {time.perf_counter() - t0:.1f}s)")
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Chờ lần load nền đang chạy (nếu có) xong; True nếu không còn load nào."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._loading is not None:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quản lý version artifact (publish / list / rollback)")
+    parser.add_argument("--root", type=Path, default=ARTIFACTS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    pub = sub.add_parser("publish", help="Copy thư mục artifact thành version mới và chuyển sang version đó")
+    pub.add_argument("src", type=Path)
+    pub.add_argument("--version")
+    pub.add_argument("--keep", type=int, default=DEFAULT_KEEP)
+    sub.add_parser("list", help="Các version còn giữ")
+    back = sub.add_parser("rollback", help="Chuyển về 1 version còn giữ")
+    back.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        t0 = time.perf_counter()
+        version = publish(args.src, args.version, args.root, args.keep)
+        print(f"Published {version} in {time.perf_counter() - t0:.1f}s")
+    elif args.command == "rollback":
+        rollback(args.version, args.root)
+        print(f"Current version: {args.version}")
+    else:
+        manifest = read_manifest(args.root) or {"history": []}
+        for h in manifest["history"]:
+            mark = "*" if h["version"] == manifest.get("current") else " "
+            print(f"{mark} {h['version']}  {h['published_at']}")
@@ -0,0 +1,288 @@
+"""
+Tính sẵn Top-K của mọi user cho cả 3 model (job chạy hằng đêm), thay cho pickle chỉ có 10 user.
+
+- User chia thành shard (mặc định 4096 user theo thứ tự ``user_ids``); mỗi shard chấm điểm
+  theo block bằng ``HybridBlender.score_block`` (1 phép nhân ma trận-ma trận mỗi block),
+  loại recipe đã rate, Top-K theo hàng. Các shard chạy song song trên process pool,
+  mỗi worker tự đọc factors 1 lần (initializer), không gửi ma trận qua pickle.
+- Mỗi shard = 2 file ``.npy``: ``ids`` (M × B × K, int32 recipe ID, -1 = không có) và
+  ``scores`` (M × B × K, float16), M = số model theo thứ tự trong manifest.
+  6 byte / gợi ý ⇒ 23K user × 3 model × Top-20 chỉ ~8 MB.
+- Checkpoint: shard được ghi qua file tạm + ``os.replace`` nên không bao giờ có shard ghi dở;
+  chạy lại với cùng factors / đặc trưng hybrid / tag genome / tham số thì bỏ qua shard đã
+  xong, chỉ tính phần còn lại.
+- Tra cứu: ``user_ids.npy`` (đã sort) là bảng offset — offset = binary search,
+  shard = offset // shard_size, hàng = offset % shard_size, đọc qua memory-map.
+
+    python batch_recs.py --k 20 --jobs 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from blending import HYBRID_FEATURES_PATH, HybridBlender, MODEL_PRESETS
+from catalog import CATALOG_DIR, RecipeCatalog
+from evaluation import file_version
+from scoring import FACTORS_PATH, SVDScorer, top_k_rows
+from tag_genome import TAG_GENOME_DIR, TagGenome
+
+
+PRECOMPUTED_DIR = Path("precomputed_recs")
+DEFAULT_SHARD_SIZE = 4096
+DEFAULT_K = 20
+# Các khoá manifest phải giống hệt thì mới resume được từ shard đã ghi
+_RESUME_KEYS = ("factors_version", "features_version", "genome_version",
+                "n_users", "k", "shard_size", "models", "presets")
+
+
+def _artifact_version(path):
+    """Version của 1 file, hoặc của cả thư mục (từng file theo tên); None nếu không có."""
+    path = Path(path)
+    if path.is_file():
+        return file_version(path)
+    if not path.is_dir():
+        return None
+    h = hashlib.sha256()
+    for f in sorted(p for p in path.iterdir() if p.is_file()):
+        h.update(f"{f.name}:{file_version(f)};".encode())
+    return h.hexdigest()[:12]
+
+
+def artifact_versions(factors_path, features_path, genome_dir) -> dict:
+    """
+    Version của các artifact đầu vào, ghi vào manifest; engine so lại với artifact nó
+    đang phục vụ trước khi dùng Top-K tính sẵn (None = không có artifact đó).
+    """
+    return {
+        "factors_version": _artifact_version(factors_path),
+        "features_version": _artifact_version(features_path),
+        "genome_version": _artifact_version(genome_dir),
+    }
+
+
+def _shard_path(out_dir, shard: int, kind: str) -> Path:
+    return Path(out_dir) / f"shard_{shard:05d}.{kind}.npy"
+
+
+def _save_atomic(path: Path, array: np.ndarray):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def _read_manifest(path):
+    path = Path(path) / "manifest.json"
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(out_dir, manifest: dict):
+    path = Path(out_dir) / "manifest.json"
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+# Engine của mỗi worker process (đọc 1 lần trong initializer)
+_SHARED = {}
+
+
+def _init_worker(factors_path, features_path, genome_dir, catalog_dir, models, k, block_size):
+    scorer = SVDScorer.load(factors_path)
+    # Như engine / evaluation: genome lệch thứ tự với catalog thì bỏ qua
+    genome = TagGenome.open(genome_dir, catalog=RecipeCatalog.open(catalog_dir))
+    blender = HybridBlender.load(scorer, features_path, genome=genome)
+    _SHARED.update(scorer=scorer, blender=blender, models=models, k=k, block_size=block_size)
+
+
+def _compute_shard(task):
+    """Top-K mọi model cho user [start, end) rồi ghi shard; trả về (shard, số giây)."""
+    out_dir, shard, start, end = task
+    t0 = time.perf_counter()
+    s = _SHARED
+    scorer, blender, k = s["scorer"], s["blender"], s["k"]
+    ids = np.full((len(s["models"]), end - start, k), -1, dtype=np.int32)
+    scores = np.zeros((len(s["models"]), end - start, k), dtype=np.float16)
+    for m, key in enumerate(s["models"]):
+        preset = MODEL_PRESETS[key]
+        for b0 in range(start, end, s["block_size"]):
+            rows = np.arange(b0, min(b0 + s["block_size"], end))
+            block = scorer.mask_seen(blender.score_block(rows, preset["alpha"], preset["secondary"]), rows)
+            top = top_k_rows(block, k)
+            top_scores = np.take_along_axis(block, top, axis=1)
+            # User đã rate gần hết catalog: phần thiếu là -inf ⇒ ID -1
+            ok = np.isfinite(top_scores)
+            ids[m, rows - start] = np.where(ok, scorer.item_ids[top], -1)
+            scores[m, rows - start] = np.where(ok, top_scores, 0.0)
+    # ids ghi sau cùng: có file ids = shard đã xong
+    _save_atomic(_shard_path(out_dir, shard, "scores"), scores)
+    _save_atomic(_shard_path(out_dir, shard, "ids"), ids)
+    return shard, time.perf_counter() - t0
+
+
+def precompute(out_dir=PRECOMPUTED_DIR, factors_path=FACTORS_PATH, features_path=HYBRID_FEATURES_PATH,
+               genome_dir=TAG_GENOME_DIR, k: int = DEFAULT_K, shard_size: int = DEFAULT_SHARD_SIZE,
+               block_size: int = 128, n_jobs: int | None = None, models=None,
+               catalog_dir=CATALOG_DIR) -> dict:
+    """Tính (hoặc tính tiếp) Top-K của mọi user; trả về manifest."""
+    scorer = SVDScorer.load(factors_path)
+    if scorer is None:
+        raise FileNotFoundError(factors_path)
+    models = list(models or MODEL_PRESETS)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n_users = len(scorer.user_ids)
+    manifest = {
+        **artifact_versions(factors_path, features_path, genome_dir),
+        "n_users": n_users,
+        "k": min(k, scorer.n_items),
+        "shard_size": shard_size,
+        "models": models,
+        "presets": {key: MODEL_PRESETS[key] for key in models},
+    }
+
+    previous = _read_manifest(out_dir)
+    if previous is None or any(previous.get(key) != manifest[key] for key in _RESUME_KEYS):
+        # Factors / tham số đổi ⇒ shard cũ không dùng được nữa
+        for path in out_dir.glob("shard_*.npy"):
+            path.unlink()
+    _write_manifest(out_dir, {**manifest, "complete": False})
+    _save_atomic(out_dir / "user_ids.npy", scorer.user_ids)
+    del scorer
+
+    n_shards = (n_users + shard_size - 1) // shard_size
+    tasks = [(str(out_dir), shard, shard * shard_size, min((shard + 1) * shard_size, n_users))
+             for shard in range(n_shards) if not _shard_path(out_dir, shard, "ids").exists()]
+    print(f"{n_shards - len(tasks)}/{n_shards} shards already done, computing {len(tasks)}")
+
+    t0 = time.perf_counter()
+    shared = (str(factors_path), str(features_path), str(genome_dir), str(catalog_dir),
+              models, manifest["k"], block_size)
+    n_jobs = min(n_jobs or os.cpu_count(), max(len(tasks), 1))
+    if n_jobs == 1:
+        _init_worker(*shared)
+        results = map(_compute_shard, tasks)
+    else:
+        pool = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=shared)
+        results = pool.map(_compute_shard, tasks)
+    try:
+        for done, (shard, seconds) in enumerate(results, start=1):
+            print(f"  shard {shard} ({done}/{len(tasks)}): {seconds:.1f}s")
+    finally:
+        if n_jobs != 1:
+            pool.shutdown(cancel_futures=True)
+
+    manifest.update(complete=True, created_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    seconds=round(time.perf_counter() - t0, 1))
+    _write_manifest(out_dir, manifest)
+    return manifest
+
+
+class PrecomputedRecs:
+    """
+    Đọc kết quả batch: ``recs[model_key][user_id]`` trả về list recipe ID giống dict
+    pickle cũ, nhưng chỉ đọc đúng 1 hàng của shard (memory-map) thay vì unpickle tất cả.
+    """
+
+    def __init__(self, path, manifest: dict, user_ids):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.user_ids = user_ids
+        self.models = manifest["models"]
+        self.shard_size = manifest["shard_size"]
+        self._shards = {}
+
+    @classmethod
+    def open(cls, path=PRECOMPUTED_DIR):
+        """None nếu chưa chạy batch hoặc lần chạy gần nhất chưa xong."""
+        path = Path(path)
+        manifest = _read_manifest(path)
+        if manifest is None or not manifest.get("complete"):
+            return None
+        return cls(path, manifest, np.load(path / "user_ids.npy", mmap_mode="r"))
+
+    def offset(self, user_id):
+        """Vị trí của user trong ``user_ids`` (binary search), None nếu không có."""
+        i = int(np.searchsorted(self.user_ids, user_id))
+        if i < len(self.user_ids) and self.user_ids[i] == user_id:
+            return i
+        return None
+
+    def _shard(self, shard: int) -> tuple:
+        if shard not in self._shards:
+            self._shards[shard] = (np.load(_shard_path(self.path, shard, "ids"), mmap_mode="r"),
+                                   np.load(_shard_path(self.path, shard, "scores"), mmap_mode="r"))
+        return self._shards[shard]
+
+    def lookup(self, model_key, user_id):
+        """(recipe ID, điểm) Top-K đã tính sẵn của user; None nếu user / model không có."""
+        offset = self.offset(user_id)
+        if offset is None or model_key not in self.models:
+            return None
+        ids, scores = self._shard(offset // self.shard_size)
+        m, row = self.models.index(model_key), offset % self.shard_size
+        ok = ids[m, row] >= 0
+        return np.asarray(ids[m, row][ok], dtype=np.int64), np.asarray(scores[m, row][ok], dtype=np.float32)
+
+    def __contains__(self, model_key):
+        return model_key in self.models
+
+    def __getitem__(self, model_key):
+        if model_key not in self.models:
+            raise KeyError(model_key)
+        return _ModelRecs(self, model_key)
+
+
+class _ModelRecs:
+    """View 1 model của ``PrecomputedRecs`` với giao diện dict ``{user_id: [recipe_id, ...]}``."""
+
+    def __init__(self, recs: PrecomputedRecs, model_key):
+        self.recs = recs
+        self.model_key = model_key
+
+    def keys(self):
+        return self.recs.user_ids.tolist()
+
+    def __len__(self):
+        return len(self.recs.user_ids)
+
+    def __contains__(self, user_id):
+        return self.recs.offset(user_id) is not None
+
+    def __getitem__(self, user_id) -> list:
+        found = self.recs.lookup(self.model_key, user_id)
+        if found is None:
+            raise KeyError(user_id)
+        return found[0].tolist()
+
+    def get(self, user_id, default=None):
+        return self[user_id] if user_id in self else default
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch Top-K cho mọi user, ghi theo shard (resume được)")
+    parser.add_argument("--factors", default=str(FACTORS_PATH))
+    parser.add_argument("--features", default=str(HYBRID_FEATURES_PATH))
+    parser.add_argument("--genome", default=str(TAG_GENOME_DIR))
+    parser.add_argument("--catalog", default=str(CATALOG_DIR))
+    parser.add_argument("--out", default=str(PRECOMPUTED_DIR))
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument("--block-size", type=int, default=128)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--models", nargs="+", choices=list(MODEL_PRESETS), default=None)
+    args = parser.parse_args()
+    res = precompute(args.out, args.factors, args.features, args.genome, args.k, args.shard_size,
+                     args.block_size, args.jobs, args.models, args.catalog)
+    print(f"Wrote {args.out}: {res['n_users']:,} users × {len(res['models'])} models × Top-{res['k']} "
+          f"in {res['seconds']}s")
@@ -0,0 +1,282 @@
+"""
+Engine blend hybrid tại thời điểm request: giữ riêng vector điểm của từng thành phần
+(SVD, popularity, CBF, tag) và kết hợp với α bất kỳ bằng 1 phép nhân vectơ.
+
+    score = α · SVD + (1 − α) · thành_phần_phụ
+
+Mỗi thành phần = (ma trận user, ma trận item) cùng thứ tự ID với SVDScorer,
+điểm của user u là ``item_matrix @ user_matrix[u]``.
+Các thành phần phụ đọc từ ``hybrid_features.npz`` (``cbf_user``/``cbf_item``,
+``tag_user``/``tag_item``); thiếu thành phần nào thì bỏ qua thành phần đó.
+Mỗi thành phần phụ chỉ được đọc từ file lần đầu có model dùng tới (model 'fast' chỉ cần
+SVD + popularity, không đọc đặc trưng CBF / tag).
+Có tag genome (``tag_genome.py``) thì ma trận item của thành phần tag đọc thẳng từ
+genome float16 memory-map, không giữ bản float32 trong RAM. ``score_block`` cũng vậy:
+nhân thẳng với factor SVD (kể cả bản lượng tử hoá dùng chung) và genome theo block,
+không ghép ra ma trận item float32 riêng của process.
+"""
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from scoring import QUANT_BLOCK_ROWS, top_k
+
+
+HYBRID_FEATURES_PATH = Path("hybrid_features.npz")
+
+# α mặc định + thành phần phụ của 3 model trên giao diện
+MODEL_PRESETS = {
+    "fast": {"alpha": 0.9, "secondary": "pop"},
+    "best": {"alpha": 0.7, "secondary": "cbf"},
+    "tag": {"alpha": 0.6, "secondary": "tag"},
+}
+
+
+class _FeatureFile:
+    """Đọc từng mảng của file ``.npz`` khi cần thay vì giải nén cả file lúc khởi động."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with np.load(self.path) as z:
+            self.files = list(z.files)
+
+    def __contains__(self, key):
+        return key in self.files
+
+    def __getitem__(self, key):
+        with np.load(self.path) as z:
+            return z[key]
+
+
+class HybridBlender:
+    """
+    Blend điểm SVD với các thành phần phụ.
+    Điểm từng thành phần của 1 user được chuẩn hoá z-score rồi cache (C × I),
+    nên kéo slider α chỉ tốn 1 phép ``weights @ stack``; hàng của thành phần chưa
+    dùng tới chưa được tính (và đặc trưng của nó chưa được đọc).
+    """
+
+    def __init__(self, scorer, features=None, cache_size: int = 8, genome=None):
+        self.scorer = scorer
+        # Popularity: log số lượt rate của mỗi recipe, giống nhau cho mọi user
+        counts = np.bincount(scorer.seen_indices, minlength=scorer.n_items)
+        self.popularity = np.log1p(counts).astype(np.float32)
+        self._features = features or {}
+        self._genome_source = genome
+        self.genome = None
+        self._genome_rows = None
+        self.components = {}
+        self.load_seconds = {}
+        self._components_lock = threading.Lock()
+        self.names = ["svd", "pop"] + [
+            name for name in ("cbf", "tag")
+            if f"{name}_user" in self._features
+            and (f"{name}_item" in self._features or (name == "tag" and genome is not None))
+        ]
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # Cache dùng chung giữa các thread (session Streamlit / request API)
+        self._cache_lock = threading.Lock()
+        self._item_moments = {}
+
+    @classmethod
+    def load(cls, scorer, path=HYBRID_FEATURES_PATH, genome=None):
+        """Tạo blender cho scorer; file features và tag genome là tuỳ chọn (chỉ đọc danh sách mảng)."""
+        if scorer is None:
+            return None
+        path = Path(path)
+        if not path.exists():
+            return cls(scorer, genome=genome)
+        return cls(scorer, _FeatureFile(path), genome=genome)
+
+    def has_component(self, name: str) -> bool:
+        return name in self.names
+
+    def component(self, name: str) -> tuple:
+        """
+        (ma trận user, ma trận item | None nếu tính qua tag genome) của 1 thành phần phụ,
+        đọc từ file lần đầu được dùng.
+        """
+        with self._components_lock:
+            if name not in self.components:
+                t0 = time.perf_counter()
+                users = np.asarray(self._features[f"{name}_user"], dtype=np.float32)
+                genome = self._genome_source
+                if name == "tag" and genome is not None and users.shape[1] == genome.n_tags:
+                    # Tag genome: ma trận item = None, điểm tính qua genome.score theo block
+                    if not np.array_equal(genome.ids, self.scorer.item_ids):
+                        self._genome_rows = genome.rows(self.scorer.item_ids)
+                    self.genome = genome
+                    self.components[name] = (users, None)
+                elif f"{name}_item" in self._features:
+                    self.components[name] = (users, np.asarray(self._features[f"{name}_item"], dtype=np.float32))
+                else:
+                    raise ValueError(f"{name}_user has {users.shape[1]} columns, tag genome has {genome.n_tags}")
+                self.load_seconds[name] = time.perf_counter() - t0
+            return self.components[name]
+
+    def warm(self):
+        """Đọc sẵn mọi thành phần phụ (vd. trước khi swap sang version artifact mới)."""
+        for name in self.names[2:]:
+            self.component(name)
+
+    def _component_row(self, name: str, user_id, row) -> np.ndarray:
+        if name == "svd":
+            return self.scorer.score_user(user_id)
+        if name == "pop":
+            return self.popularity.copy()
+        users, items = self.component(name)
+        if items is None:
+            return self.genome.score(users[row], rows=self._genome_rows)[0]
+        return items @ users[row]
+
+    def component_scores(self, user_id, names=None) -> np.ndarray:
+        """
+        Ma trận (C × I) điểm đã chuẩn hoá của user, theo thứ tự ``self.names``; có LRU cache.
+        Chỉ bảo đảm các hàng trong ``names`` (mặc định: mọi thành phần), hàng khác có thể = 0.
+        """
+        names = self.names if names is None else names
+        with self._cache_lock:
+            cached = self._cache.get(user_id)
+            if cached is not None:
+                self._cache.move_to_end(user_id)
+        row = self.scorer.user_row(user_id)
+        if row is None:
+            raise KeyError(user_id)
+        if cached is None:
+            cached = (np.zeros((len(self.names), self.scorer.n_items), dtype=np.float32), set())
+        stack, filled = cached
+        for name in [n for n in names if n in self.names and n not in filled]:
+            scores = self._component_row(name, user_id, row)
+            scores -= scores.mean()
+            std = scores.std()
+            stack[self.names.index(name)] = scores / (std if std > 0 else 1.0)
+            filled.add(name)
+
+        with self._cache_lock:
+            self._cache[user_id] = cached
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return stack
+
+    def refresh(self, user_id):
+        """Tính lại tại chỗ dòng SVD trong cache của user sau khi factor của user đổi (fold-in)."""
+        cached = self._cache.get(user_id)
+        if cached is None or "svd" not in cached[1]:
+            return
+        svd = self.scorer.score_user(user_id)
+        svd -= svd.mean()
+        std = svd.std()
+        cached[0][0] = svd / (std if std > 0 else 1.0)
+
+    def weights(self, alpha: float, secondary: str) -> np.ndarray:
+        w = np.zeros(len(self.names), dtype=np.float32)
+        w[0] = alpha
+        if secondary in self.names:
+            w[self.names.index(secondary)] = 1.0 - alpha
+        return w
+
+    def blend(self, user_id, alpha: float, secondary: str) -> np.ndarray:
+        """Điểm hybrid của user với toàn bộ recipe: ``weights @ stack``."""
+        return self.weights(alpha, secondary) @ self.component_scores(user_id, ("svd", secondary))
+
+    def _item_block(self, secondary: str, start: int, stop: int) -> np.ndarray:
+        """Hàng ``start:stop`` của ma trận item ghép [item_factors, item_bias, thành phần phụ] (float32)."""
+        parts = [self.scorer.item_factors[start:stop], self.scorer.item_bias[start:stop, None]]
+        if secondary == "pop":
+            parts.append(self.popularity[start:stop, None])
+        elif secondary in self.names[2:]:
+            items = self.component(secondary)[1]
+            if items is None:
+                rows = np.arange(start, stop) if self._genome_rows is None else self._genome_rows[start:stop]
+                items = self.genome.vectors(rows)
+            else:
+                items = items[start:stop]
+            parts.append(items)
+        return np.hstack(parts).astype(np.float32)
+
+    def _moments(self, secondary: str) -> tuple:
+        """
+        Trung bình (d,) và moment bậc 2 (d × d) theo item của ma trận item ghép — cộng dồn
+        theo block ``QUANT_BLOCK_ROWS`` hàng (không giữ cả ma trận), tính 1 lần rồi cache.
+        """
+        if secondary not in self._item_moments:
+            n = self.scorer.n_items
+            total, second = 0.0, 0.0
+            for start in range(0, n, QUANT_BLOCK_ROWS):
+                block = self._item_block(secondary, start, min(start + QUANT_BLOCK_ROWS, n))
+                total = total + block.sum(axis=0, dtype=np.float64)
+                second = second + block.T.astype(np.float64) @ block
+            self._item_moments[secondary] = (total / n, second / n)
+        return self._item_moments[secondary]
+
+    @staticmethod
+    def _row_std(users, mean, second, cols) -> np.ndarray:
+        """Độ lệch chuẩn theo item của điểm ``items[:, cols] @ u`` cho từng u, tính từ moment (không cần B × I)."""
+        mu, g = mean[cols], second[np.ix_(cols, cols)]
+        var = np.einsum("bi,ij,bj->b", users, g, users) - (users @ mu) ** 2
+        return np.sqrt(np.maximum(var, 1e-12)).astype(np.float32)
+
+    def score_block(self, rows, alpha: float, secondary: str) -> np.ndarray:
+        """
+        Điểm hybrid cho nhiều user (theo hàng) cùng lúc (B × I), dùng cho đánh giá offline / batch.
+        Cùng thứ hạng với ``blend``: mỗi thành phần chia cho độ lệch chuẩn của nó
+        (tính giải tích từ moment của item), phần trung bình là hằng số theo user nên bỏ.
+        Mỗi thành phần 1 phép nhân ma trận thẳng trên ma trận item của nó (factor SVD
+        lượng tử hoá / genome float16 đổi sang float32 theo block).
+        """
+        if alpha >= 1.0 or secondary not in self.names:
+            secondary = "svd"
+        mean, second = self._moments(secondary)
+        scorer = self.scorer
+        f = scorer.item_factors.shape[1] + 1
+        svd_users = np.hstack([scorer.user_factors[rows], np.ones((len(rows), 1), dtype=np.float32)])
+        svd_users *= (min(alpha, 1.0) / self._row_std(svd_users, mean, second, np.arange(f)))[:, None]
+        scores = np.ascontiguousarray(svd_users[:, :-1]) @ scorer.item_factors.T
+        scores += svd_users[:, -1:] * scorer.item_bias
+        if secondary == "pop":
+            std = float(np.sqrt(max(second[f, f] - mean[f] ** 2, 1e-12)))
+            scores += np.float32((1.0 - alpha) / std) * self.popularity
+        elif secondary != "svd":
+            users, items = self.component(secondary)
+            users = users[rows]
+            cols = np.arange(f, len(mean))
+            users = users * ((1.0 - alpha) / self._row_std(users, mean, second, cols))[:, None]
+            scores += self.genome.score(users, rows=self._genome_rows) if items is None else users @ items.T
+        return scores
+
+    def rank(self, user_id, alpha: float, secondary: str, k: int = 20,
+             exclude_seen: bool = True, index=None, nprobe: int | None = None, mask=None) -> tuple:
+        """
+        Top-K theo điểm hybrid dưới dạng (vị trí item, điểm), đã sort giảm dần.
+        α = 1 (chỉ SVD) và có ``index`` ⇒ dùng ANN của SVDScorer, không cần quét toàn bộ.
+        ``mask`` (bool theo vị trí item): recipe ngoài bộ lọc bị loại trước bước Top-K.
+        """
+        if alpha >= 1.0 or secondary not in self.names:
+            return self.scorer.rank(user_id, k, exclude_seen=exclude_seen, index=index,
+                                    nprobe=nprobe, mask=mask)
+        scores = self.blend(user_id, alpha, secondary)
+        if exclude_seen:
+            scores[self.scorer.seen_items(self.scorer.user_row(user_id))] = -np.inf
+        if mask is not None:
+            scores[~mask] = -np.inf
+        best = top_k(scores, k)
+        return best, scores[best]
+
+    def recommend(self, user_id, alpha: float, secondary: str, k: int = 20,
+                  exclude_seen: bool = True, index=None, nprobe: int | None = None, mask=None) -> list:
+        """Top-K recipe ID theo điểm hybrid (xem ``rank``)."""
+        positions, _ = self.rank(user_id, alpha, secondary, k, exclude_seen, index, nprobe, mask)
+        return self.scorer.item_ids[positions].tolist()
+
+    def item_vectors(self, positions) -> np.ndarray:
+        """
+        Vector mô tả item dùng để đo độ giống nhau giữa các món (vd. cho MMR):
+        đặc trưng nội dung CBF nếu có, không thì SVD item factors.
+        """
+        if "cbf" in self.names:
+            return self.component("cbf")[1][positions]
+        return self.scorer.item_factors[positions]
@@ -0,0 +1,134 @@
+"""
+Catalog recipe dạng cột (columnar) trên đĩa, đọc bằng memory-map.
+
+Thay cho dict pickle ``{rid: {'name', 'tags'}}``: không phải unpickle cả catalog khi
+khởi động, các trang dữ liệu được OS chia sẻ giữa mọi worker Streamlit, và chỉ
+giải mã đúng recipe đang được tra cứu.
+
+Thư mục catalog gồm:
+- ``ids.npy``: recipe ID (int64) đã sort ⇒ tra cứu bằng binary search.
+- ``name_offsets.npy`` + ``names.bin``: tên món UTF-8 nối liền, offset (N+1).
+- ``tag_offsets.npy`` + ``tag_codes.npy``: tag của từng recipe dưới dạng mã int32.
+- ``tag_vocab.json``: bảng mã → tên tag (intern 1 lần cho toàn catalog).
+
+Build từ pickle cũ::
+
+    python catalog.py recipe_info.pkl recipe_catalog
+"""
+import json
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+
+
+CATALOG_DIR = Path("recipe_catalog")
+
+
+class RecipeCatalog:
+    """
+    Catalog chỉ đọc, dùng được như dict cũ: ``catalog.get(rid, {})`` trả về
+    ``{'name': ..., 'tags': [...]}`` (giải mã lười, theo từng lần tra cứu).
+    """
+
+    def __init__(self, ids, name_offsets, names, tag_offsets, tag_codes, tag_vocab):
+        self.ids = ids
+        self.name_offsets = name_offsets
+        self.names = names
+        self.tag_offsets = tag_offsets
+        self.tag_codes = tag_codes
+        self.tag_vocab = tag_vocab
+
+    @classmethod
+    def open(cls, path=CATALOG_DIR):
+        """Memory-map thư mục catalog; None nếu chưa build."""
+        path = Path(path)
+        if not (path / "ids.npy").exists():
+            return None
+        names_path = path / "names.bin"
+        # np.memmap không cho map file rỗng
+        names = (np.memmap(names_path, dtype=np.uint8, mode="r")
+                 if names_path.stat().st_size else np.empty(0, dtype=np.uint8))
+        with open(path / "tag_vocab.json", encoding="utf-8") as f:
+            tag_vocab = json.load(f)
+        return cls(
+            np.load(path / "ids.npy", mmap_mode="r"),
+            np.load(path / "name_offsets.npy", mmap_mode="r"),
+            names,
+            np.load(path / "tag_offsets.npy", mmap_mode="r"),
+            np.load(path / "tag_codes.npy", mmap_mode="r"),
+            tag_vocab,
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, rid):
+        """Vị trí của recipe trong các cột, None nếu không có."""
+        i = int(np.searchsorted(self.ids, rid))
+        if i < len(self.ids) and self.ids[i] == rid:
+            return i
+        return None
+
+    def __contains__(self, rid):
+        return self.row(rid) is not None
+
+    def name_at(self, i: int) -> str:
+        return bytes(self.names[self.name_offsets[i]:self.name_offsets[i + 1]]).decode("utf-8")
+
+    def tag_codes_at(self, i: int) -> np.ndarray:
+        return self.tag_codes[self.tag_offsets[i]:self.tag_offsets[i + 1]]
+
+    def tags_at(self, i: int) -> list:
+        return [self.tag_vocab[c] for c in self.tag_codes_at(i)]
+
+    def __getitem__(self, rid):
+        i = self.row(rid)
+        if i is None:
+            raise KeyError(rid)
+        return {"name": self.name_at(i), "tags": self.tags_at(i)}
+
+    def get(self, rid, default=None):
+        i = self.row(rid)
+        if i is None:
+            return default
+        return {"name": self.name_at(i), "tags": self.tags_at(i)}
+
+
+def build_catalog(recipe_info: dict, out_dir=CATALOG_DIR):
+    """Ghi dict ``{rid: {'name', 'tags'}}`` ra thư mục catalog dạng cột."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    ids = np.array(sorted(int(rid) for rid in recipe_info), dtype=np.int64)
+    vocab = {}
+    name_blob = bytearray()
+    name_offsets = [0]
+    tag_codes = []
+    tag_offsets = [0]
+    for rid in ids.tolist():
+        info = recipe_info[rid]
+        name_blob += str(info.get("name") or "").encode("utf-8")
+        name_offsets.append(len(name_blob))
+        for tag in info.get("tags") or []:
+            tag_codes.append(vocab.setdefault(str(tag), len(vocab)))
+        tag_offsets.append(len(tag_codes))
+
+    np.save(out_dir / "ids.npy", ids)
+    np.save(out_dir / "name_offsets.npy", np.array(name_offsets, dtype=np.int64))
+    (out_dir / "names.bin").write_bytes(bytes(name_blob))
+    np.save(out_dir / "tag_offsets.npy", np.array(tag_offsets, dtype=np.int64))
+    np.save(out_dir / "tag_codes.npy", np.array(tag_codes, dtype=np.int32))
+    with open(out_dir / "tag_vocab.json", "w", encoding="utf-8") as f:
+        json.dump(list(vocab), f, ensure_ascii=False)
+    return RecipeCatalog.open(out_dir)
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "recipe_info.pkl"
+    dst = sys.argv[2] if len(sys.argv) > 2 else CATALOG_DIR
+    with open(src, "rb") as f:
+        info = {int(k): v for k, v in pickle.load(f).items()}
+    catalog = build_catalog(info, dst)
+    print(f"Catalog: {len(catalog)} recipes, {len(catalog.tag_vocab)} tags → {dst}")
@@ -0,0 +1,225 @@
+"""
+Content index cho CBF: TF-IDF thưa (CSR) trên tag + nguyên liệu của recipe, và
+bảng láng giềng item-item (cosine Top-N) tính sẵn để app tra "món tương tự" trong O(1).
+
+- Token = ``tag:<tag>`` / ``ing:<nguyên liệu>``; TF nhị phân × IDF, mỗi hàng chuẩn hoá L2
+  ⇒ cosine = tích vô hướng.
+- Bỏ token quá hiếm (< ``min_df`` recipe, không tạo cặp nào) hoặc quá phổ biến
+  (> ``max_df``, vd. 'salt', 'easy'): vừa như stop-word, vừa là phần đắt nhất của phép nhân.
+- Build láng giềng theo block hàng: mỗi block nhân với ma trận chuyển vị (CSC) qua
+  posting list, cộng dồn bằng ``bincount`` thành ma trận dense (B × N), rồi
+  argpartition lấy Top-N; các block chạy song song trên process pool. Số hàng mỗi block
+  mặc định theo N (``BLOCK_CELLS``) để ma trận B × N của mỗi worker có cỡ cố định.
+- ``neighbours.npz``: ``item_ids`` (N,), ``neighbours`` (N × Top-N, int32 recipe ID,
+  -1 = không có) và ``scores`` (N × Top-N, float16).
+
+    python content_index.py --recipes RAW_recipes.csv --top-n 20
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+NEIGHBOURS_PATH = Path("neighbours.npz")
+DEFAULT_TOP_N = 20
+# Số ô (B × N) của ma trận điểm dense mỗi block: float64 (bincount) ≈ 32 MB / worker
+BLOCK_CELLS = 1 << 22
+MIN_DF = 2
+MAX_DF = 0.05
+
+# Cột tags / ingredients của RAW_recipes.csv là repr của list Python
+_LIST_ITEM = re.compile(r"'((?:[^'\\]|\\.)*)'|\"((?:[^\"\\]|\\.)*)\"")
+
+
+def _parse_list(text) -> list:
+    return [a or b for a, b in _LIST_ITEM.findall(text)] if isinstance(text, str) else []
+
+
+def read_recipes(path):
+    """Đọc RAW_recipes.csv: trả về DataFrame (id, name, tags, ingredients) với tags/ingredients là list."""
+    df = pd.read_csv(path, usecols=["id", "name", "tags", "ingredients"])
+    df["name"] = df["name"].fillna("").astype(str)
+    df["tags"] = df["tags"].map(_parse_list)
+    df["ingredients"] = df["ingredients"].map(_parse_list)
+    return df
+
+
+def recipe_tokens(tags, ingredients) -> list:
+    """Token nội dung của 1 recipe (tag và nguyên liệu tách không gian tên)."""
+    return ["tag:" + t for t in tags or []] + ["ing:" + i for i in ingredients or []]
+
+
+class TfidfIndex:
+    """Ma trận TF-IDF (N × V) dạng CSR, hàng chuẩn hoá L2."""
+
+    def __init__(self, indptr, indices, data, vocab: list):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float32)
+        self.vocab = vocab
+
+    @classmethod
+    def build(cls, token_lists: list, min_df: int = MIN_DF, max_df: float = MAX_DF):
+        n = len(token_lists)
+        rows = np.repeat(np.arange(n), [len(t) for t in token_lists])
+        codes, uniq = pd.factorize(pd.Series([t for tokens in token_lists for t in tokens], dtype=object))
+        # TF nhị phân: token lặp lại trong cùng recipe chỉ tính 1 lần
+        pairs = np.sort(rows * max(len(uniq), 1) + codes)
+        pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+        rows, codes = pairs // max(len(uniq), 1), pairs % max(len(uniq), 1)
+
+        df = np.bincount(codes, minlength=len(uniq))
+        keep = (df >= min_df) & (df <= max_df * n)
+        remap = np.full(len(uniq), -1, dtype=np.int64)
+        remap[keep] = np.arange(keep.sum())
+        cols = remap[codes]
+        rows, cols = rows[cols >= 0], cols[cols >= 0]
+        idf = (np.log((1 + n) / (1 + df[keep])) + 1.0).astype(np.float32)
+
+        data = idf[cols]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=n)).astype(np.float32)
+        data /= norms[rows]
+        return cls(indptr, cols, data, [str(t) for t in uniq[keep]])
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    def transpose(self):
+        """Dạng CSC (= CSR của ma trận chuyển vị): (indptr theo token, hàng, giá trị)."""
+        order = np.argsort(self.indices, kind="stable")
+        col_indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=len(self.vocab)), out=col_indptr[1:])
+        rows = np.repeat(np.arange(self.n_rows, dtype=np.int32), np.diff(self.indptr))
+        return col_indptr, rows[order], self.data[order]
+
+
+# Dữ liệu dùng chung của mỗi worker process (gửi 1 lần qua initializer, không gửi lại theo block)
+_SHARED = {}
+
+
+def _init_worker(indptr, indices, data, col_indptr, col_rows, col_data, top_n):
+    _SHARED.update(indptr=indptr, indices=indices, data=data, col_indptr=col_indptr,
+                   col_rows=col_rows, col_data=col_data, top_n=top_n)
+    # Phần lớn điểm trong 1 hàng bằng đúng 0: argpartition trên nhiều giá trị trùng rất chậm,
+    # nên cộng 1 nhiễu âm cực nhỏ, khác nhau theo cột để phá thế hoà
+    n = len(indptr) - 1
+    _SHARED["tiebreak"] = -(np.random.default_rng(0).permutation(n) + 1) * 1e-12
+
+
+def _block_neighbours(bounds):
+    """Top-N cosine cho các hàng [r0, r1): trả về (vị trí láng giềng, điểm) (B × Top-N)."""
+    r0, r1 = bounds
+    s = _SHARED
+    indptr, col_indptr = s["indptr"], s["col_indptr"]
+    n, b, top_n = len(indptr) - 1, r1 - r0, s["top_n"]
+
+    start, end = indptr[r0], indptr[r1]
+    terms = s["indices"][start:end]
+    weights = s["data"][start:end]
+    block_rows = np.repeat(np.arange(b), np.diff(indptr[r0:r1 + 1]))
+
+    # Mỗi phần tử (hàng, token) nhân với toàn bộ posting list của token đó
+    p_start = col_indptr[terms]
+    p_len = col_indptr[terms + 1] - p_start
+    entry = np.repeat(np.arange(len(terms)), p_len)
+    within = np.arange(p_len.sum()) - np.repeat(np.cumsum(p_len) - p_len, p_len)
+    at = p_start[entry] + within
+    sims = np.bincount(block_rows[entry] * n + s["col_rows"][at],
+                       weights=weights[entry] * s["col_data"][at], minlength=b * n).reshape(b, n)
+    sims[np.arange(b), np.arange(r0, r1)] = 0.0   # bỏ chính nó
+    sims += s["tiebreak"]
+
+    k = min(top_n, n - 1)
+    if k <= 0:
+        # Chỉ 1 recipe: không có láng giềng nào
+        return np.empty((b, 0), dtype=np.int32), np.empty((b, 0), dtype=np.float16)
+    part = np.argpartition(sims, n - k, axis=1)[:, n - k:]
+    part_scores = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    positions = np.take_along_axis(part, order, axis=1)
+    scores = np.take_along_axis(part_scores, order, axis=1)
+    positions[scores <= 0] = -1
+    return positions.astype(np.int32), scores.astype(np.float16)
+
+
+def build_neighbours(index: TfidfIndex, top_n: int = DEFAULT_TOP_N, block_size: int | None = None,
+                     n_jobs: int | None = None) -> tuple:
+    """
+    Top-N láng giềng cosine của mọi hàng; trả về (vị trí (N × Top-N) int32, điểm float16).
+    ``block_size`` mặc định = ``BLOCK_CELLS // N`` hàng (≈ 18 hàng với 231K recipe).
+    """
+    block_size = block_size or max(1, BLOCK_CELLS // max(index.n_rows, 1))
+    col_indptr, col_rows, col_data = index.transpose()
+    shared = (index.indptr, index.indices, index.data, col_indptr, col_rows, col_data, top_n)
+    blocks = [(r, min(r + block_size, index.n_rows)) for r in range(0, index.n_rows, block_size)]
+    n_jobs = n_jobs or os.cpu_count()
+    if n_jobs == 1:
+        _init_worker(*shared)
+        parts = [_block_neighbours(bounds) for bounds in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=shared) as pool:
+            parts = list(pool.map(_block_neighbours, blocks, chunksize=8))
+    return np.vstack([p[0] for p in parts]), np.vstack([p[1] for p in parts])
+
+
+class ContentNeighbours:
+    """Bảng láng giềng item-item tính sẵn: tra "món tương tự" bằng 1 binary search."""
+
+    def __init__(self, item_ids, neighbours, scores):
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.neighbours = np.asarray(neighbours, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float16)
+
+    @classmethod
+    def load(cls, path=NEIGHBOURS_PATH):
+        """Đọc ``neighbours.npz``; None nếu chưa build."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        with np.load(path) as z:
+            return cls(z["item_ids"], z["neighbours"], z["scores"])
+
+    def save(self, path=NEIGHBOURS_PATH):
+        np.savez(path, item_ids=self.item_ids, neighbours=self.neighbours, scores=self.scores)
+
+    def similar(self, recipe_id, n: int | None = None) -> list:
+        """[(recipe_id, cosine)] các món giống nhất, giảm dần; [] nếu recipe lạ."""
+        row = int(np.searchsorted(self.item_ids, recipe_id))
+        if row >= len(self.item_ids) or self.item_ids[row] != recipe_id:
+            return []
+        ids, scores = self.neighbours[row, :n], self.scores[row, :n]
+        return [(int(i), float(sc)) for i, sc in zip(ids, scores) if i >= 0]
+
+
+def build_from_recipes(recipes: pd.DataFrame, top_n: int = DEFAULT_TOP_N, block_size: int | None = None,
+                       n_jobs: int | None = None) -> ContentNeighbours:
+    recipes = recipes.drop_duplicates("id").sort_values("id")
+    index = TfidfIndex.build([recipe_tokens(t, i) for t, i in zip(recipes["tags"], recipes["ingredients"])])
+    positions, scores = build_neighbours(index, top_n, block_size, n_jobs)
+    item_ids = recipes["id"].to_numpy(np.int64)
+    neighbours = np.where(positions >= 0, item_ids[positions], -1).astype(np.int32)
+    return ContentNeighbours(item_ids, neighbours, scores)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build TF-IDF content index + Top-N láng giềng item-item")
+    parser.add_argument("--recipes", required=True, help="RAW_recipes.csv")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N)
+    parser.add_argument("--block-size", type=int, default=None, help="mặc định theo số recipe (BLOCK_CELLS)")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--out", default=str(NEIGHBOURS_PATH))
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    result = build_from_recipes(read_recipes(args.recipes), args.top_n, args.block_size, args.jobs)
+    result.save(args.out)
+    print(f"Wrote {args.out}: {len(result.item_ids):,} recipes × {args.top_n} neighbours "
+          f"in {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,44 @@
+"""
+Đa dạng hoá Top-K bằng Maximal Marginal Relevance (MMR).
+
+Lấy vài trăm ứng viên điểm cao nhất từ engine, rồi chọn lần lượt món có
+``λ · độ_liên_quan − (1 − λ) · độ_giống_lớn_nhất_với_các_món_đã_chọn`` cao nhất:
+λ = 1 giữ nguyên thứ hạng, λ nhỏ ưu tiên món khác hẳn những món đã có.
+
+Ma trận cosine (C × C) giữa các ứng viên tính 1 lần bằng 1 phép nhân ma trận; mỗi
+bước chọn chỉ là vài phép toán vector trên C phần tử ⇒ C = 300, K = 20 tốn < 1 ms.
+"""
+import numpy as np
+
+
+DEFAULT_CANDIDATES = 300
+DEFAULT_LAMBDA = 0.7
+
+
+def mmr(scores: np.ndarray, vectors: np.ndarray, k: int, lam: float = DEFAULT_LAMBDA) -> np.ndarray:
+    """
+    Thứ tự chọn (chỉ số trong tập ứng viên) sau re-rank MMR.
+    ``scores`` (C,) được co về [0, 1] để so được với cosine; cosine âm tính là 0.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    scores = np.asarray(scores, dtype=np.float32)
+    spread = float(scores.max() - scores.min())
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones(n, dtype=np.float32)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms > 0, norms, 1.0)
+    sims = unit @ unit.T
+
+    chosen = np.empty(k, dtype=np.int64)
+    penalty = np.zeros(n, dtype=np.float32)
+    gain = lam * relevance
+    for i in range(k):
+        j = int(np.argmax(gain - (1.0 - lam) * penalty))
+        chosen[i] = j
+        gain[j] = -np.inf
+        np.maximum(penalty, sims[j], out=penalty)
+    return chosen
@@ -0,0 +1,389 @@
+"""
+Engine gợi ý dùng chung cho ``app.py`` (Streamlit) và ``api.py`` (HTTP JSON): giữ các
+artifact đã load và chọn đường phục vụ cho từng request.
+
+- ``precomputed``: cấu hình mặc định của model, user chưa rate thêm ⇒ Top-K tính sẵn (batch_recs.py),
+  chỉ khi manifest batch khớp version factors / đặc trưng hybrid / tag genome trong thư mục gốc.
+- ``online``: user có trong factor matrix ⇒ chấm điểm + blend α lúc request (lọc tag, MMR).
+- ``pickle``: chưa train factors ⇒ dict pickle cũ.
+
+``recommend_many`` gom các user cần chấm online thành block và chấm bằng 1 phép nhân
+ma trận-ma trận mỗi block thay vì từng user một.
+
+Tách pickle gợi ý cũ theo model (mỗi model unpickle riêng khi cần)::
+
+    python engine.py recommendations_3models.pkl recs_by_model
+
+Mọi artifact của 1 engine đọc từ cùng 1 thư mục gốc (``load(root)``), nên nhiều version
+artifact có thể cùng tồn tại (xem ``artifacts.py``). Artifact được load lười theo từng
+thành phần, lần đầu dùng tới: trang EDA không đụng tới model nào, model 'fast' không đọc
+đặc trưng CBF / tag. ``warm()`` load hết + build sẵn các index phụ (tag, tìm món, user)
+để engine mới được swap vào đã sẵn sàng phục vụ.
+"""
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ann_index import IVFIndex, SVD_INDEX_PATH
+from batch_recs import PRECOMPUTED_DIR, PrecomputedRecs, artifact_versions
+from blending import HYBRID_FEATURES_PATH, HybridBlender, MODEL_PRESETS
+from catalog import CATALOG_DIR, RecipeCatalog
+from content_index import ContentNeighbours, NEIGHBOURS_PATH
+from diversity import DEFAULT_CANDIDATES, mmr
+from evaluation import METRICS_PATH, load_metrics
+from online import OnlineUpdater
+from paging import DEFAULT_DEPTH, RecCursor
+from scoring import FACTORS_PATH, QUANTIZED_FACTORS_DIR, SVDScorer, top_k_rows
+from search_index import RecipeSearchIndex
+from tag_filter import TagBitmapIndex
+from tag_genome import TAG_GENOME_DIR, TagGenome
+from user_index import UserIndex
+
+
+RECS_PICKLE_PATH = "recommendations_3models.pkl"
+# Pickle gợi ý tách theo model (``split_recs_pickle``): ``<model>.pkl``
+RECS_PICKLE_DIR = Path("recs_by_model")
+RECIPE_INFO_PICKLE_PATH = "recipe_info.pkl"
+# Số user mỗi block khi chấm nhiều user cùng lúc (128 × 231K float32 ≈ 118 MB)
+BATCH_BLOCK_USERS = 128
+
+
+class PickleRecs:
+    """
+    Gợi ý pickle cũ ``{model_key: {user_id: [recipe_id, ...]}}``, unpickle theo model lần đầu
+    dùng: có ``recs_by_model/<model>.pkl`` thì chỉ đọc đúng file của model, không thì đọc
+    file gộp (1 lần cho cả 3 model).
+    """
+
+    def __init__(self, root="."):
+        self.root = Path(root)
+        self.load_seconds = {}
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, model_key):
+        return model_key in MODEL_PRESETS
+
+    def __getitem__(self, model_key):
+        if model_key not in MODEL_PRESETS:
+            raise KeyError(model_key)
+        with self._lock:
+            if model_key not in self._models:
+                t0 = time.perf_counter()
+                path = self.root / RECS_PICKLE_DIR / f"{model_key}.pkl"
+                if path.exists():
+                    with open(path, "rb") as f:
+                        self._models[model_key] = pickle.load(f)
+                else:
+                    with open(self.root / RECS_PICKLE_PATH, "rb") as f:
+                        for key, recs in pickle.load(f).items():
+                            self._models.setdefault(key, recs)
+                    self._models.setdefault(model_key, {})
+                self.load_seconds[model_key] = time.perf_counter() - t0
+            return self._models[model_key]
+
+
+def split_recs_pickle(src=RECS_PICKLE_PATH, out_dir=RECS_PICKLE_DIR):
+    """Tách pickle gộp 3 model thành ``out_dir/<model>.pkl`` để mỗi model load riêng."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(src, "rb") as f:
+        recs = pickle.load(f)
+    for model_key, model_recs in recs.items():
+        with open(out_dir / f"{model_key}.pkl", "wb") as f:
+            pickle.dump(model_recs, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return list(recs)
+
+
+def load_recs(root="."):
+    """
+    Top-K tính sẵn cho mọi user (memory-map, chỉ đọc hàng của model được hỏi);
+    chưa chạy batch thì dùng pickle cũ, unpickle theo model khi cần.
+    """
+    recs = PrecomputedRecs.open(Path(root) / PRECOMPUTED_DIR)
+    return recs if recs is not None else PickleRecs(root)
+
+
+def load_recipe_info(root="."):
+    """Catalog dạng cột memory-map (load gần như tức thì); chưa build thì dùng pickle cũ."""
+    info = RecipeCatalog.open(Path(root) / CATALOG_DIR)
+    if info is None:
+        with open(Path(root) / RECIPE_INFO_PICKLE_PATH, "rb") as f:
+            info = pickle.load(f)
+    return info
+
+
+class RecommenderEngine:
+    """
+    Artifact trong 1 thư mục (recs, catalog, scorer, blender, ANN, updater, index phụ) + logic
+    chọn đường gợi ý. Mỗi artifact chỉ được load lần đầu dùng tới, thời gian load ghi vào
+    ``timings`` (xem ``load_report``).
+    """
+
+    def __init__(self, root=".", version=None):
+        self.root = Path(root)
+        self.version = version
+        self.timings = {}
+        self._components = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, root=".", version=None):
+        """Engine trên artifact trong ``root``; chưa đọc file nào (thiếu artifact nào thì bỏ qua đường đó)."""
+        return cls(root, version)
+
+    def _cached(self, key: str, build):
+        """Giá trị của ``key``, build + đo thời gian lần đầu; mỗi key 1 lock (load song song key khác)."""
+        if key in self._components:
+            return self._components[key]
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._components:
+                t0 = time.perf_counter()
+                self._components[key] = build()
+                self.timings[key] = time.perf_counter() - t0
+            return self._components[key]
+
+    def loaded(self, key: str) -> bool:
+        return key in self._components
+
+    @property
+    def recs(self):
+        return self._cached("recs", lambda: load_recs(self.root))
+
+    @property
+    def recipe_info(self):
+        return self._cached("recipe_info", lambda: load_recipe_info(self.root))
+
+    @property
+    def scorer(self):
+        # Có bản lượng tử hoá (svd_factors_q/) ⇒ map dùng chung giữa các worker thay vì đọc .npz vào RAM
+        def build():
+            scorer = SVDScorer.open(self.root / QUANTIZED_FACTORS_DIR)
+            return scorer if scorer is not None else SVDScorer.load(self.root / FACTORS_PATH)
+        return self._cached("scorer", build)
+
+    @property
+    def tag_genome(self):
+        info = self.recipe_info
+        catalog = info if isinstance(info, RecipeCatalog) else None
+        return self._cached("tag_genome", lambda: TagGenome.open(self.root / TAG_GENOME_DIR, catalog=catalog))
+
+    @property
+    def blender(self):
+        # Load phụ thuộc trước (đo thời gian riêng); đặc trưng CBF / tag chỉ đọc khi model cần
+        scorer = self.scorer
+        genome = self.tag_genome if scorer is not None else None
+        return self._cached("blender", lambda: HybridBlender.load(scorer, self.root / HYBRID_FEATURES_PATH,
+                                                                  genome=genome))
+
+    @property
+    def ann_index(self):
+        scorer = self.scorer
+        def build():
+            index = IVFIndex.load(self.root / SVD_INDEX_PATH) if scorer is not None else None
+            # Index chưa hiệu chỉnh nprobe trên user thật (recall không rõ) ⇒ quét toàn bộ
+            return index if index is not None and index.nprobe is not None else None
+        return self._cached("ann_index", build)
+
+    @property
+    def updater(self):
+        scorer, blender = self.scorer, self.blender
+        # Log rating dùng chung giữa các version: engine mới replay lại toàn bộ rating đã ghi
+        return self._cached("updater", lambda: OnlineUpdater(scorer, blender) if scorer is not None else None)
+
+    @property
+    def neighbours(self):
+        return self._cached("neighbours", lambda: ContentNeighbours.load(self.root / NEIGHBOURS_PATH))
+
+    @property
+    def metrics(self):
+        return self._cached("metrics", lambda: load_metrics(self.root / METRICS_PATH))
+
+    def tag_index(self):
+        """Bitmap nén của từng tag theo đúng vị trí recipe của scorer; None nếu chưa có scorer."""
+        scorer, info = self.scorer, self.recipe_info
+        if scorer is None:
+            return None
+
+        def build():
+            if isinstance(info, RecipeCatalog):
+                index = TagBitmapIndex.from_catalog(info)
+            else:
+                index = TagBitmapIndex.from_recipe_info(info)
+            return index.align(scorer.item_ids)
+        return self._cached("tag_index", build)
+
+    def search_index(self) -> tuple:
+        """(inverted index tên + tag, độ phổ biến theo vị trí trong index | None nếu chưa có blender)."""
+        info, blender = self.recipe_info, self.blender
+
+        def build():
+            if isinstance(info, RecipeCatalog):
+                index = RecipeSearchIndex.from_catalog(info)
+            else:
+                index = RecipeSearchIndex.from_recipe_info(info)
+            weights = None
+            if blender is not None:
+                weights = index.align_values(blender.scorer.item_ids, blender.popularity)
+            return index, weights
+        return self._cached("search_index", build)
+
+    def user_index(self, model_key) -> UserIndex:
+        """ID user đã sort: gợi ý tính sẵn của model + user trong factor matrix."""
+        recs, scorer = self.recs, self.scorer
+        model_recs = recs[model_key] if model_key in recs else None
+        return self._cached(f"user_index:{model_key}", lambda: UserIndex.from_sources(
+            model_recs.keys() if model_recs is not None else None,
+            scorer.user_ids if scorer is not None else None,
+        ))
+
+    def load_report(self) -> list:
+        """[(thành phần, giây)] theo thứ tự load, gồm cả recs pickle / đặc trưng blender load theo model."""
+        report = list(self.timings.items())
+        recs = self._components.get("recs")
+        if isinstance(recs, PickleRecs):
+            report += [(f"recs:{m}", s) for m, s in recs.load_seconds.items()]
+        blender = self._components.get("blender")
+        if blender is not None:
+            report += [(f"blender:{name}", s) for name, s in blender.load_seconds.items()]
+        return report
+
+    def warm(self):
+        """Load mọi artifact + build mọi index phụ (gọi trước khi đưa engine vào phục vụ); trả về chính engine."""
+        for model_key in MODEL_PRESETS:
+            self.user_index(model_key)
+        if self.blender is not None:
+            self.blender.warm()
+        for name in ("ann_index", "updater", "neighbours", "metrics", "precomputed_current"):
+            getattr(self, name)
+        self.tag_index()
+        self.search_index()
+        return self
+
+    def sync(self):
+        """Áp dụng rating mới trong log (từ process khác) trước khi gợi ý."""
+        if self.updater is not None:
+            self.updater.sync()
+
+    def has_user(self, user_id, model_key) -> bool:
+        if self.scorer is not None and self.scorer.has_user(user_id):
+            return True
+        return model_key in self.recs and user_id in self.recs[model_key]
+
+    @property
+    def precomputed_current(self) -> bool:
+        """
+        Top-K tính sẵn được tính từ đúng factors / đặc trưng hybrid / tag genome trong ``root``;
+        lệch (vd. artifact build lại sau lần chạy batch) ⇒ chấm online. Hash 1 lần mỗi engine.
+        """
+        recs = self.recs
+
+        def build():
+            if not isinstance(recs, PrecomputedRecs):
+                return False
+            versions = artifact_versions(self.root / FACTORS_PATH, self.root / HYBRID_FEATURES_PATH,
+                                         self.root / TAG_GENOME_DIR)
+            stale = [key for key, version in versions.items() if recs.manifest.get(key) != version]
+            if stale:
+                print(f"Precomputed recs do not match served artifacts ({', '.join(stale)}): scoring online")
+            return not stale
+        return self._cached("precomputed_current", build)
+
+    def _use_precomputed(self, user_id, model_key, k, alpha) -> bool:
+        return (
+            self.precomputed_current and model_key in self.recs
+            and k <= self.recs.manifest["k"] and alpha == MODEL_PRESETS[model_key]["alpha"]
+            and user_id in self.recs[model_key]
+            and not (self.scorer is not None and self.scorer.is_folded(user_id))
+        )
+
+    def recommend(self, user_id, model_key, k: int = 20, alpha: float | None = None,
+                  mask=None, diversity: float | None = None) -> tuple:
+        """
+        (Top-K recipe ID, nguồn) cho 1 user. ``mask``: lọc tag (bool theo vị trí item),
+        ``diversity``: λ của MMR trên ``DEFAULT_CANDIDATES`` ứng viên. KeyError nếu user lạ.
+        """
+        preset = MODEL_PRESETS[model_key]
+        alpha = preset["alpha"] if alpha is None else alpha
+        if mask is None and diversity is None and self._use_precomputed(user_id, model_key, k, alpha):
+            return self.recs[model_key][user_id][:k], "precomputed"
+        if self.blender is not None and self.scorer.has_user(user_id):
+            if diversity is None:
+                top = self.blender.recommend(user_id, alpha, preset["secondary"], k=k,
+                                             index=self.ann_index, mask=mask)
+                return top, "online"
+            positions, scores = self.blender.rank(user_id, alpha, preset["secondary"],
+                                                  k=max(DEFAULT_CANDIDATES, k), index=self.ann_index, mask=mask)
+            order = mmr(scores, self.blender.item_vectors(positions), k, diversity)
+            return self.scorer.item_ids[positions[order]].tolist(), "online"
+        return list(self.recs[model_key][user_id])[:k], "pickle"
+
+    def cursor(self, user_id, model_key, first: int = 20, alpha: float | None = None,
+               mask=None, diversity: float | None = None, depth: int = DEFAULT_DEPTH) -> RecCursor:
+        """
+        Cursor "xem thêm" cho 1 user, trang đầu ``first`` món (tham số như ``recommend``).
+        Chấm online ⇒ xếp hạng sẵn Top-``depth`` ngay; trang đầu tính sẵn ⇒ chỉ chấm khi cần trang sau.
+        MMR: trang đầu re-rank trên ``DEFAULT_CANDIDATES`` ứng viên, giống hệt ``recommend(k=first)``;
+        trang sau lấy từ lần re-rank trên ``depth`` ứng viên (bỏ món đã hiển thị).
+        """
+        alpha = MODEL_PRESETS[model_key]["alpha"] if alpha is None else alpha
+
+        def fetch(n):
+            return self.recommend(user_id, model_key, n, alpha, mask, diversity)[0]
+
+        if diversity is not None:
+            return RecCursor(fetch(first), first, fetch, depth)
+        if mask is None and self._use_precomputed(user_id, model_key, first, alpha):
+            return RecCursor(self.recs[model_key][user_id][:first], first, fetch, depth)
+        ranked = fetch(depth)
+        return RecCursor(ranked, first, depth=depth)
+
+    def recommend_many(self, user_ids, model_key, k: int = 20) -> dict:
+        """
+        {user_id: Top-K recipe ID | None nếu user lạ} cho nhiều user, cấu hình mặc định của model.
+        User cần chấm online được chấm theo block (``HybridBlender.score_block``).
+        """
+        preset = MODEL_PRESETS[model_key]
+        out, online = {}, []
+        for user_id in user_ids:
+            if self._use_precomputed(user_id, model_key, k, preset["alpha"]):
+                out[user_id] = self.recs[model_key][user_id][:k]
+            elif self.blender is not None and self.scorer.has_user(user_id):
+                online.append(user_id)
+            elif model_key in self.recs and user_id in self.recs[model_key]:
+                out[user_id] = list(self.recs[model_key][user_id])[:k]
+            else:
+                out[user_id] = None
+
+        for start in range(0, len(online), BATCH_BLOCK_USERS):
+            users = online[start:start + BATCH_BLOCK_USERS]
+            rows = np.array([self.scorer.user_row(u) for u in users])
+            scores = self.scorer.mask_seen(self.blender.score_block(rows, preset["alpha"], preset["secondary"]), rows)
+            top = top_k_rows(scores, k)
+            finite = np.isfinite(np.take_along_axis(scores, top, axis=1))
+            for user_id, ids, ok in zip(users, self.scorer.item_ids[top], finite):
+                out[user_id] = ids[ok].tolist()
+        return out
+
+    def recipe(self, recipe_id) -> dict:
+        """``{'recipe_id', 'name', 'tags'}`` của 1 recipe (tên mặc định nếu không có trong catalog)."""
+        info = self.recipe_info.get(int(recipe_id), {}) or {}
+        return {
+            "recipe_id": int(recipe_id),
+            "name": info.get("name", f"Recipe {int(recipe_id)}"),
+            "tags": list(info.get("tags") or []),
+        }
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else RECS_PICKLE_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else RECS_PICKLE_DIR
+    models = split_recs_pickle(src, dst)
+    print(f"Split {src} into {len(models)} models → {dst}")
@@ -0,0 +1,186 @@
+"""
+Đánh giá offline các model trên tập rating held-out (test split).
+
+- Regression: RMSE, R² của dự đoán rating SVD (μ + b_u + b_i + p_u·q_i) trên mọi cặp test;
+  ghi 1 lần dưới ``"svd"`` (điểm blend của các model không phải rating nên không có RMSE riêng).
+- Ranking @K: P@K, R@K, nDCG@K, mAP@K — chấm điểm theo block user bằng nhân
+  ma trận-ma trận, loại recipe đã rate trong train, Top-K bằng argpartition theo hàng,
+  rồi tính metric vector hoá cho cả block (không có vòng lặp Python theo user).
+- Các block chạy song song trên thread pool (BLAS / argpartition nhả GIL).
+
+Kết quả ghi ra ``metrics.json`` (có schema version + version của model) để app đọc::
+
+    python evaluation.py --test test_ratings.csv --k 20
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from blending import HYBRID_FEATURES_PATH, HybridBlender, MODEL_PRESETS
+from catalog import CATALOG_DIR, RecipeCatalog
+from scoring import FACTORS_PATH, SVDScorer, top_k_rows
+from tag_genome import TAG_GENOME_DIR, TagGenome
+
+
+METRICS_PATH = Path("metrics.json")
+METRICS_SCHEMA_VERSION = 2
+
+
+def file_version(path) -> str:
+    """Version của artifact = 12 ký tự đầu sha256 nội dung file."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def load_test_ratings(path, scorer: SVDScorer):
+    """
+    Đọc CSV test (cột ``user_id``, ``recipe_id``, ``rating``) và ánh xạ sang
+    (hàng user, vị trí recipe, rating) của scorer; bỏ cặp có user / recipe lạ.
+    """
+    df = pd.read_csv(path, usecols=["user_id", "recipe_id", "rating"])
+    users = df["user_id"].to_numpy(np.int64)
+    items = df["recipe_id"].to_numpy(np.int64)
+    u_rows = np.searchsorted(scorer.user_ids, users).clip(0, len(scorer.user_ids) - 1)
+    i_rows = np.searchsorted(scorer.item_ids, items).clip(0, scorer.n_items - 1)
+    known = (scorer.user_ids[u_rows] == users) & (scorer.item_ids[i_rows] == items)
+    return u_rows[known], i_rows[known], df["rating"].to_numpy(np.float32)[known]
+
+
+def regression_metrics(scorer: SVDScorer, u_rows, i_rows, ratings) -> dict:
+    """RMSE và R² của dự đoán rating SVD trên mọi cặp test (vector hoá)."""
+    pred = (scorer.global_mean + scorer.user_bias[u_rows] + scorer.item_bias[i_rows]
+            + np.einsum("ij,ij->i", scorer.user_factors[u_rows], scorer.item_factors[i_rows]))
+    err = ratings - pred
+    ss_res = float((err ** 2).sum())
+    ss_tot = float(((ratings - ratings.mean()) ** 2).sum())
+    return {
+        "rmse": float(np.sqrt(ss_res / len(ratings))),
+        "r2": 1.0 - ss_res / ss_tot if ss_tot > 0 else 0.0,
+    }
+
+
+def ranking_metrics_block(topk: np.ndarray, rows: np.ndarray, n_rel: np.ndarray,
+                          test_keys: np.ndarray, n_items: int) -> dict:
+    """
+    Metric @K cho 1 block user. ``topk`` (B × K) vị trí recipe đã xếp hạng,
+    ``test_keys`` = hàng_user · n_items + vị_trí_recipe của các cặp test (đã sort).
+    Trả về tổng (chưa chia) của từng metric trên block.
+    """
+    k = topk.shape[1]
+    keys = rows[:, None].astype(np.int64) * n_items + topk
+    pos = np.searchsorted(test_keys, keys).clip(0, len(test_keys) - 1)
+    hits = (test_keys[pos] == keys).astype(np.float32)
+
+    n_hits = hits.sum(axis=1)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = hits @ discounts
+    idcg = np.cumsum(discounts)[np.minimum(n_rel, k) - 1]
+    precision_at = np.cumsum(hits, axis=1) / np.arange(1, k + 1)
+    ap = (precision_at * hits).sum(axis=1) / np.minimum(n_rel, k)
+    return {
+        "precision": float((n_hits / k).sum()),
+        "recall": float((n_hits / n_rel).sum()),
+        "ndcg": float((dcg / idcg).sum()),
+        "map": float(ap.sum()),
+    }
+
+
+def ranking_metrics(score_block, scorer: SVDScorer, u_rows, i_rows, k: int = 20,
+                    block_size: int = 512, n_jobs: int | None = None) -> dict:
+    """
+    P@K, R@K, nDCG@K, mAP@K trung bình trên mọi user có ít nhất 1 rating test.
+    ``score_block(rows)`` trả về ma trận điểm (B × I) của các user ``rows``.
+    """
+    n_items = scorer.n_items
+    test_keys = np.unique(u_rows.astype(np.int64) * n_items + i_rows)
+    users, n_rel = np.unique(test_keys // n_items, return_counts=True)
+
+    def run(start):
+        rows = users[start:start + block_size]
+        topk = top_k_rows(scorer.mask_seen(score_block(rows), rows), k)
+        return ranking_metrics_block(topk, rows, n_rel[start:start + block_size], test_keys, n_items)
+
+    totals = {"precision": 0.0, "recall": 0.0, "ndcg": 0.0, "map": 0.0}
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        for part in pool.map(run, range(0, len(users), block_size)):
+            for name, value in part.items():
+                totals[name] += value
+    return {f"{name}@{k}": value / max(len(users), 1) for name, value in totals.items()} | {"n_users": int(len(users))}
+
+
+def evaluate(test_path, factors_path=FACTORS_PATH, k: int = 20, out_path=METRICS_PATH,
+             block_size: int = 512, n_jobs: int | None = None,
+             features_path=HYBRID_FEATURES_PATH, genome_dir=TAG_GENOME_DIR) -> dict:
+    """
+    Đánh giá các model (theo MODEL_PRESETS) và ghi artifact metrics. Model thiếu thành phần
+    phụ (vd. chưa có tag genome) bị bỏ qua thay vì ghi điểm của SVD thuần dưới tên model đó.
+    """
+    scorer = SVDScorer.load(factors_path)
+    if scorer is None:
+        raise FileNotFoundError(factors_path)
+    genome = TagGenome.open(genome_dir, catalog=RecipeCatalog.open(CATALOG_DIR))
+    blender = HybridBlender.load(scorer, features_path, genome=genome)
+    u_rows, i_rows, ratings = load_test_ratings(test_path, scorer)
+
+    t0 = time.perf_counter()
+    regression = regression_metrics(scorer, u_rows, i_rows, ratings)
+    models = {}
+    for key, preset in MODEL_PRESETS.items():
+        if not blender.has_component(preset["secondary"]):
+            print(f"Skipping model {key!r}: component {preset['secondary']!r} is not available")
+            continue
+        def score_block(rows, preset=preset):
+            return blender.score_block(rows, preset["alpha"], preset["secondary"])
+        models[key] = ranking_metrics(score_block, scorer, u_rows, i_rows, k, block_size, n_jobs)
+
+    result = {
+        "schema_version": METRICS_SCHEMA_VERSION,
+        "model_version": file_version(factors_path),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "k": k,
+        "n_test_ratings": int(len(ratings)),
+        "seconds": round(time.perf_counter() - t0, 2),
+        "svd": regression,
+        "models": models,
+    }
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def load_metrics(path=METRICS_PATH):
+    """Đọc artifact metrics; None nếu chưa có hoặc sai schema version."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("schema_version") != METRICS_SCHEMA_VERSION:
+        return None
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline evaluation: RMSE, R², P/R/nDCG/mAP@K")
+    parser.add_argument("--test", required=True, help="CSV held-out: user_id, recipe_id, rating")
+    parser.add_argument("--factors", default=str(FACTORS_PATH))
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--out", default=str(METRICS_PATH))
+    parser.add_argument("--block-size", type=int, default=512)
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--features", default=str(HYBRID_FEATURES_PATH))
+    parser.add_argument("--genome", default=str(TAG_GENOME_DIR))
+    args = parser.parse_args()
+    res = evaluate(args.test, args.factors, args.k, args.out, args.block_size, args.jobs,
+                   args.features, args.genome)
+    print(json.dumps(res, indent=2))
@@ -0,0 +1,130 @@
+"""
+Cache URL ảnh món ăn trên đĩa (SQLite), dùng chung giữa các process / replica.
+
+- Key = tên món đã chuẩn hoá (bỏ "Recipe 123", ``_``/``-``, khoảng trắng thừa, chữ thường).
+- Lưu cả 3 loại kết quả, mỗi loại có TTL riêng:
+  ``hit`` (tìm được ảnh), ``miss`` (API trả về rỗng), ``error`` (lỗi HTTP / timeout).
+- SQLite ở chế độ WAL + busy_timeout ⇒ nhiều reader và writer đồng thời an toàn.
+- Với lần tra thành công, lưu luôn chiến lược (query) đã thắng ⇒ lần sau thử nó trước.
+- Đếm hit / miss / expired trong process qua ``stats()``.
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+
+IMAGE_CACHE_PATH = Path("image_cache.sqlite3")
+
+# TTL (giây) theo loại kết quả
+DEFAULT_TTLS = {
+    "hit": 30 * 24 * 3600,
+    "miss": 7 * 24 * 3600,
+    "error": 10 * 60,
+}
+
+CacheEntry = namedtuple("CacheEntry", ["status", "url", "fetched_at", "strategy"])
+
+
+def clean_name(name) -> str:
+    """Chuẩn hoá tên món để gửi lên API: bỏ 'Recipe 71606', thay _/- bằng khoảng trắng."""
+    base = re.sub(r"(?i)recipe\s*\d*", "", str(name))
+    base = re.sub(r"[_\-]", " ", base)
+    base = re.sub(r"\s+", " ", base).strip()
+    return base or "food"
+
+
+def cache_key(name) -> str:
+    return clean_name(name).lower()
+
+
+class ImageCache:
+    """Cache key → (status, url) trên SQLite, mỗi thread 1 connection riêng."""
+
+    def __init__(self, path=IMAGE_CACHE_PATH, ttls=None):
+        self.path = str(path)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "writes": 0}
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                " key TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " url TEXT,"
+                " fetched_at REAL NOT NULL,"
+                " strategy INTEGER)"
+            )
+            # DB tạo từ bản cũ chưa có cột strategy
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+            if "strategy" not in columns:
+                conn.execute("ALTER TABLE images ADD COLUMN strategy INTEGER")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def get(self, name, count: bool = True):
+        """
+        Entry còn hạn cho tên món, None nếu chưa có hoặc đã hết TTL.
+        ``count=False``: đọc không tính vào ``stats()`` (vd. kiểm tra trước khi prefetch).
+        """
+        row = self._conn().execute(
+            "SELECT status, url, fetched_at, strategy FROM images WHERE key = ?", (cache_key(name),)
+        ).fetchone()
+        if row is None:
+            if count:
+                self._count("misses")
+            return None
+        entry = CacheEntry(*row)
+        if time.time() - entry.fetched_at > self.ttls.get(entry.status, 0):
+            if count:
+                self._count("expired")
+            return None
+        if count:
+            self._count("hits")
+        return entry
+
+    def get_strategy(self, name):
+        """Chiến lược đã thắng ở lần tra thành công gần nhất (bỏ qua TTL), None nếu chưa có."""
+        row = self._conn().execute(
+            "SELECT strategy FROM images WHERE key = ?", (cache_key(name),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, name, status: str, url=None, strategy=None):
+        """
+        Ghi (đè) kết quả tra cứu; ``status`` ∈ {'hit', 'miss', 'error'}.
+        Không truyền ``strategy`` thì giữ chiến lược đã thắng trước đó (nếu có).
+        """
+        if status not in self.ttls:
+            raise ValueError(f"Unknown cache status: {status}")
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO images (key, status, url, fetched_at, strategy) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET status = excluded.status, url = excluded.url,"
+                " fetched_at = excluded.fetched_at,"
+                " strategy = COALESCE(excluded.strategy, images.strategy)",
+                (cache_key(name), status, url, time.time(), strategy),
+            )
+        self._count("writes")
+
+    def stats(self) -> dict:
+        """Bộ đếm của process hiện tại + số entry theo status trong DB."""
+        with self._lock:
+            out = dict(self._counters)
+        for status, n in self._conn().execute("SELECT status, COUNT(*) FROM images GROUP BY status"):
+            out[f"stored_{status}"] = n
+        return out
@@ -0,0 +1,259 @@
+"""
+Tra cứu ảnh món ăn qua Spoonacular.
+
+- Mọi request dùng chung 1 ``requests.Session`` (keep-alive, connection pool).
+- ``prefetch`` tra ảnh cho cả danh sách món trên 1 thread pool giới hạn số worker,
+  mỗi tên chỉ có 1 request đang chạy tại 1 thời điểm (single-flight).
+- ``RateLimiter`` (token bucket) giới hạn tốc độ gọi API, mỗi session Streamlit 1 bộ.
+- Chế độ hedged: chạy song song các query dự phòng, lấy kết quả của chiến lược ưu tiên
+  cao nhất thành công, huỷ phần còn lại và không vượt quá 1 deadline tổng.
+- Kết quả đọc / ghi qua ``ImageCache`` (SQLite) nên dùng chung giữa các process.
+"""
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from image_cache import cache_key, clean_name
+
+
+SPOONACULAR_URL = "https://api.spoonacular.com/recipes/complexSearch"
+
+PLACEHOLDER_NO_KEY = "https://via.placeholder.com/600x400?text=No+API+Key"
+PLACEHOLDER_NO_IMAGE = "https://via.placeholder.com/600x400?text=No+Image"
+
+
+# Mã chiến lược (lưu trong cache để lần sau thử chiến lược đã thắng trước)
+STRATEGY_FULL, STRATEGY_SIMPLIFIED, STRATEGY_LAST_WORD = 0, 1, 2
+
+
+def candidate_queries(base: str) -> list:
+    """
+    Các cặp (chiến lược, query) cho 1 tên món (đã clean), theo thứ tự ưu tiên:
+    full name → phần trước dấu phẩy/with/and → từ cuối cùng (thường là loại món).
+    """
+    queries = [(STRATEGY_FULL, base)]
+    # Chiến lược 2: lấy phần trước dấu phẩy / ' with ' / ' and '
+    simplified = re.split(r",| with | and ", base, maxsplit=1)[0].strip()
+    if simplified and simplified.lower() != base.lower():
+        queries.append((STRATEGY_SIMPLIFIED, simplified))
+    # Chiến lược 3: dùng từ cuối cùng (cake, soup, crepes,…)
+    parts = base.split()
+    if parts:
+        last_word = parts[-1]
+        if last_word and last_word.lower() not in {simplified.lower(), base.lower()}:
+            queries.append((STRATEGY_LAST_WORD, last_word))
+    return queries
+
+
+def make_session(pool_size: int = 16) -> requests.Session:
+    """Session HTTP dùng chung: giữ kết nối keep-alive tới Spoonacular."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class RateLimiter:
+    """Token bucket: trung bình ``rate`` request/giây, tối đa ``burst`` request dồn cục."""
+
+    def __init__(self, rate: float = 2.0, burst: int = 5):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Chờ tới khi lấy được 1 token; False nếu quá ``timeout`` giây."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class ImageResolver:
+    """Tra cứu URL ảnh: cache đĩa → (nếu thiếu) Spoonacular qua session + thread pool dùng chung."""
+
+    def __init__(self, api_key, cache, max_workers: int = 8, timeout: float = 5,
+                 limiter_timeout: float = 10, hedged: bool = False, deadline: float = 6):
+        self.api_key = api_key
+        self.cache = cache
+        self.timeout = timeout
+        self.limiter_timeout = limiter_timeout
+        self.hedged = hedged
+        self.deadline = deadline
+        self.session = make_session(max_workers * 4)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-prefetch")
+        # Pool riêng cho các query chạy đua: task trong self.pool chờ pool này, dùng chung sẽ deadlock
+        self.query_pool = ThreadPoolExecutor(max_workers=max_workers * 3, thread_name_prefix="image-query")
+        self._inflight = {}
+        # RLock: done-callback có thể chạy ngay trong lúc đang giữ lock (Future đã xong)
+        self._lock = threading.RLock()
+
+    def query(self, q: str, limiter=None, timeout: float | None = None) -> tuple:
+        """
+        Gọi Spoonacular cho 1 query; có ``timeout`` thì chờ token của limiter cũng không quá ``timeout``.
+        Trả về (url | None, status) với status ∈ {'hit', 'miss', 'error', 'limited'}.
+        """
+        wait_token = self.limiter_timeout if timeout is None else min(self.limiter_timeout, timeout)
+        if limiter is not None and not limiter.acquire(timeout=wait_token):
+            return None, "limited"
+        params = {
+            "query": q,
+            "number": 1,
+            "apiKey": self.api_key,
+        }
+        try:
+            res = self.session.get(SPOONACULAR_URL, params=params, timeout=timeout or self.timeout)
+            # Nếu hết quota hoặc lỗi 4xx/5xx thì in ra log cho dễ debug
+            if not res.ok:
+                print("Spoonacular HTTP error:", res.status_code, res.text[:200])
+                return None, "error"
+
+            results = res.json().get("results") or []
+            if results and results[0].get("image"):
+                img = results[0]["image"]
+                print("DEBUG Image for", q, "→", img)
+                return img, "hit"
+        except Exception as e:
+            print("Spoonacular exception:", e)
+            return None, "error"
+        return None, "miss"
+
+    def peek(self, name):
+        """URL ảnh đã có trong cache (không gọi mạng, không tính vào stats), None nếu chưa có."""
+        entry = self.cache.get(name, count=False)
+        return entry.url if entry is not None and entry.url else None
+
+    def _lookup(self, name, limiter=None) -> str:
+        raw = str(name)
+        # resolve() đã đếm lần tra này; prefetch là tra nền, không đếm
+        cached = self.cache.get(raw, count=False)
+        if cached is not None:
+            return cached.url or PLACEHOLDER_NO_IMAGE
+
+        candidates = candidate_queries(clean_name(raw))
+        statuses = set()
+        # Hedged: 1 deadline tổng cho cả lần tra (query chiến lược đã biết + phần chạy đua)
+        end = time.monotonic() + self.deadline
+
+        # Đã biết chiến lược thắng lần trước ⇒ thử thẳng nó trước
+        winner = self.cache.get_strategy(raw)
+        known = [c for c in candidates if c[0] == winner]
+        if known:
+            timeout = min(self.timeout, max(0.1, end - time.monotonic())) if self.hedged else None
+            img, status = self.query(known[0][1], limiter, timeout=timeout)
+            if img:
+                self.cache.put(raw, "hit", img, strategy=winner)
+                return img
+            statuses.add(status)
+            candidates = [c for c in candidates if c[0] != winner]
+
+        if self.hedged:
+            img, strategy, race_statuses = self._race(candidates, limiter, end)
+            statuses |= race_statuses
+            if img:
+                self.cache.put(raw, "hit", img, strategy=strategy)
+                return img
+        else:
+            for strategy, q in candidates:
+                img, status = self.query(q, limiter)
+                if img:
+                    self.cache.put(raw, "hit", img, strategy=strategy)
+                    return img
+                statuses.add(status)
+
+        # Bị rate limit thì không cache, lần sau thử lại
+        if "limited" not in statuses:
+            # Không tìm được ảnh phù hợp (lỗi HTTP ⇒ TTL ngắn để thử lại sớm)
+            self.cache.put(raw, "error" if "error" in statuses else "miss")
+        print("DEBUG: No image for", raw, "→ dùng placeholder")
+        return PLACEHOLDER_NO_IMAGE
+
+    def _race(self, candidates, limiter=None, end: float | None = None) -> tuple:
+        """
+        Chạy song song mọi query, tới mốc ``end`` (time.monotonic; mặc định sau ``self.deadline`` giây).
+        Kết quả hợp lệ = chiến lược ưu tiên cao nhất trả về ảnh mà mọi chiến lược
+        ưu tiên hơn nó đã xong (không có ảnh). Hết deadline thì lấy ảnh tốt nhất đã có.
+        Trả về (url | None, chiến lược | None, tập status); quá hạn ⇒ status 'error'.
+        """
+        end = time.monotonic() + self.deadline if end is None else end
+        stop = threading.Event()
+
+        def run(q):
+            # Đã có kết quả (hoặc hết deadline) thì các query còn xếp hàng khỏi gọi API
+            if stop.is_set() or time.monotonic() >= end:
+                return None, "cancelled"
+            return self.query(q, limiter, timeout=min(self.timeout, max(0.1, end - time.monotonic())))
+
+        futures = [self.query_pool.submit(run, q) for _, q in candidates]
+        results = [None] * len(futures)
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+            for f in done:
+                results[futures.index(f)] = f.result()
+            winner = None
+            for i, r in enumerate(results):
+                if r is None:
+                    break
+                if r[0]:
+                    winner = i
+                    break
+            if winner is not None or not done:
+                break
+
+        stop.set()
+        for f in pending:
+            f.cancel()
+        statuses = {r[1] for r in results if r is not None}
+        if pending:
+            statuses.add("error")
+        for i, r in enumerate(results):
+            if r is not None and r[0]:
+                return r[0], candidates[i][0], statuses
+        return None, None, statuses
+
+    def submit(self, name, limiter=None):
+        """Đưa việc tra ảnh vào thread pool; tên đang được tra thì dùng lại Future cũ."""
+        key = cache_key(name)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self.pool.submit(self._lookup, name, limiter)
+                self._inflight[key] = future
+                future.add_done_callback(lambda _f, key=key: self._forget(key))
+        return future
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def resolve(self, name, limiter=None) -> str:
+        """URL ảnh cho 1 món (chặn tới khi có kết quả)."""
+        if not self.api_key:
+            return PLACEHOLDER_NO_KEY
+        cached = self.cache.get(name)
+        if cached is not None:
+            return cached.url or PLACEHOLDER_NO_IMAGE
+        return self.submit(name, limiter).result()
+
+    def prefetch(self, names, limiter=None) -> list:
+        """Tra ảnh nền cho cả danh sách món; trả về các Future (món đã có trong cache thì bỏ qua)."""
+        if not self.api_key:
+            return []
+        return [self.submit(name, limiter) for name in names if self.cache.get(name, count=False) is None]
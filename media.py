@@ -0,0 +1,182 @@
+"""
+Pipeline media tĩnh: build 1 lần các bản dẫn xuất của ảnh / video trong ``assets/``
+rồi phục vụ qua static file serving của Streamlit (``static/`` → ``app/static/...``),
+thay vì đọc + base64 + nhét vào HTML ở mỗi lần rerun.
+
+- Ảnh: resize (không phóng to) ra vài độ rộng, nén lại thành WebP ⇒ dùng ``srcset``.
+- Video MP4: chuyển moov atom lên đầu file (faststart, không encode lại) để
+  trình duyệt phát ngay và tua bằng HTTP Range.
+- Tên file chứa hash nội dung ⇒ đổi ảnh là đổi URL, trình duyệt cache an toàn
+  (ETag / Last-Modified của static handler trả 304 cho các lần sau).
+- ``manifest.json`` ánh xạ tên file gốc → URL đã build.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+from pathlib import Path
+
+from PIL import Image
+
+
+ASSETS_DIR = Path("assets")
+STATIC_DIR = Path("static")
+MEDIA_DIR = STATIC_DIR / "media"
+MANIFEST_PATH = MEDIA_DIR / "manifest.json"
+STATIC_URL_PREFIX = "app/static/"
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+VIDEO_EXTENSIONS = {".mp4"}
+# Độ rộng các bản resize (px); ảnh nền cần to hơn ảnh EDA trong card
+DEFAULT_WIDTHS = (480, 1200)
+WIDTHS = {"bg_food.jpg": (1280, 1920), "background_food.jpg": (1280, 1920)}
+WEBP_QUALITY = 80
+# Tăng khi đổi cách build ⇒ mọi hash (và URL) đổi theo
+PIPELINE_VERSION = "1"
+
+
+def _digest(path: Path, *params) -> str:
+    h = hashlib.sha256(PIPELINE_VERSION.encode())
+    h.update(path.read_bytes())
+    for p in params:
+        h.update(str(p).encode())
+    return h.hexdigest()[:12]
+
+
+def _slug(stem: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", stem.lower()).strip("-") or "media"
+
+
+def _url(path: Path) -> str:
+    return STATIC_URL_PREFIX + path.relative_to(STATIC_DIR).as_posix()
+
+
+def _atomic_write(out: Path, write):
+    """Ghi ra file tạm rồi os.replace ⇒ nhiều process cùng build không đọc phải file dở."""
+    tmp = out.with_name(f".{out.name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, out)
+
+
+def build_image(src: Path, out_dir: Path = MEDIA_DIR, widths=DEFAULT_WIDTHS) -> dict:
+    """Tạo các bản WebP theo ``widths``; trả về {'src', 'srcset', 'width', 'height'}."""
+    digest = _digest(src, widths, WEBP_QUALITY)
+    with Image.open(src) as im:
+        im.load()
+        orig_w, orig_h = im.size
+        sizes = sorted({min(w, orig_w) for w in widths})
+        variants = []
+        for w in sizes:
+            out = out_dir / f"{_slug(src.stem)}.{digest}.w{w}.webp"
+            if not out.exists():
+                h = round(orig_h * w / orig_w)
+                resized = im.resize((w, h), Image.LANCZOS) if w != orig_w else im
+                _atomic_write(out, lambda p: resized.save(p, "WEBP", quality=WEBP_QUALITY, method=6))
+            variants.append((w, out))
+    return {
+        "src": _url(variants[-1][1]),
+        "srcset": ", ".join(f"{_url(p)} {w}w" for w, p in variants),
+        "width": orig_w,
+        "height": orig_h,
+    }
+
+
+# Box MP4 chứa box con cần duyệt để tìm bảng offset chunk (stco / co64)
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def _mp4_boxes(data: bytes, start: int = 0, end: int | None = None):
+    """Duyệt các box MP4 trong ``data[start:end]``: yield (loại, vị trí, header, kích thước)."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            raise ValueError("Corrupt MP4 box")
+        yield kind, pos, header, size
+        pos += size
+
+
+def is_faststart(path: Path) -> bool:
+    """MP4 có moov atom nằm trước mdat (phát được trước khi tải hết file)?"""
+    for kind, *_ in _mp4_boxes(Path(path).read_bytes()):
+        if kind == b"moov":
+            return True
+        if kind == b"mdat":
+            return False
+    return False
+
+
+def _shift_chunk_offsets(moov: bytearray, delta: int, start: int = 8, end: int | None = None):
+    """Cộng ``delta`` vào mọi offset chunk (stco 32-bit / co64 64-bit) trong moov."""
+    for kind, pos, header, size in _mp4_boxes(moov, start, end):
+        if kind in _MP4_CONTAINERS:
+            _shift_chunk_offsets(moov, delta, pos + header, pos + size)
+        elif kind in (b"stco", b"co64"):
+            fmt, width = (">I", 4) if kind == b"stco" else (">Q", 8)
+            count = struct.unpack(">I", moov[pos + header + 4:pos + header + 8])[0]
+            table = pos + header + 8
+            for i in range(count):
+                at = table + i * width
+                value = struct.unpack(fmt, moov[at:at + width])[0] + delta
+                if kind == b"stco" and value > 0xFFFFFFFF:
+                    raise ValueError("stco offset overflow")
+                moov[at:at + width] = struct.pack(fmt, value)
+
+
+def faststart(data: bytes) -> bytes:
+    """Đưa moov lên trước mdat (giống qt-faststart); file đã faststart thì trả nguyên."""
+    boxes = list(_mp4_boxes(data))
+    kinds = [b[0] for b in boxes]
+    if b"moov" not in kinds or b"mdat" not in kinds or kinds.index(b"moov") < kinds.index(b"mdat"):
+        return data
+    _, pos, _, size = boxes[kinds.index(b"moov")]
+    moov = bytearray(data[pos:pos + size])
+    # Mọi dữ liệu media đứng sau vị trí chèn moov bị đẩy lùi đúng len(moov) byte
+    _shift_chunk_offsets(moov, len(moov))
+    first_mdat = boxes[kinds.index(b"mdat")][1]
+    return data[:first_mdat] + bytes(moov) + data[first_mdat:pos] + data[pos + size:]
+
+
+def build_video(src: Path, out_dir: Path = MEDIA_DIR) -> dict:
+    """Bản MP4 faststart (chỉ sắp lại box, không encode lại); lỗi parse thì copy nguyên file."""
+    out = out_dir / f"{_slug(src.stem)}.{_digest(src)}.mp4"
+    if not out.exists():
+        try:
+            data = faststart(src.read_bytes())
+            _atomic_write(out, lambda p: p.write_bytes(data))
+        except (ValueError, struct.error) as e:
+            print("MP4 faststart failed:", src.name, e)
+            _atomic_write(out, lambda p: shutil.copyfile(src, p))
+    return {"src": _url(out), "faststart": is_faststart(out)}
+
+
+def build_media(assets_dir: Path = ASSETS_DIR, out_dir: Path = MEDIA_DIR) -> dict:
+    """
+    Build (bỏ qua file đã có) toàn bộ media trong ``assets_dir`` và ghi manifest.
+    Trả về manifest: {tên file gốc: thông tin bản build}.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for src in sorted(Path(assets_dir).iterdir()):
+        ext = src.suffix.lower()
+        if ext in IMAGE_EXTENSIONS:
+            manifest[src.name] = build_image(src, out_dir, WIDTHS.get(src.name, DEFAULT_WIDTHS))
+        elif ext in VIDEO_EXTENSIONS:
+            manifest[src.name] = build_video(src, out_dir)
+    _atomic_write(out_dir / MANIFEST_PATH.name,
+                  lambda p: p.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8"))
+    return manifest
+
+
+if __name__ == "__main__":
+    for name, info in build_media().items():
+        print(f"{name} → {info['src']}")
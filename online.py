@@ -0,0 +1,97 @@
+"""
+Cập nhật khuyến nghị ngay khi user chấm điểm món mới, không cần train lại.
+
+- Rating mới được ghi nối đuôi vào ``ratings_log.jsonl`` (append-only, mỗi dòng 1 JSON),
+  nên mọi process / replica đọc chung và khởi động lại vẫn giữ được.
+- ``OnlineUpdater.sync`` đọc phần log mới kể từ lần trước; với mỗi user có rating mới,
+  giải lại factor của user với item factors cố định (ALS fold-in, ``SVDScorer.fold_in``)
+  rồi cập nhật tại chỗ điểm đã cache của user trong ``HybridBlender`` — vài ms mỗi user.
+"""
+import json
+import threading
+import time
+from pathlib import Path
+
+
+RATINGS_LOG_PATH = Path("ratings_log.jsonl")
+
+
+class RatingsLog:
+    """Log rating append-only; ``read_new`` chỉ đọc phần được ghi thêm từ lần đọc trước."""
+
+    def __init__(self, path=RATINGS_LOG_PATH):
+        self.path = Path(path)
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def append(self, user_id, recipe_id, rating: float):
+        line = json.dumps({
+            "user_id": int(user_id),
+            "recipe_id": int(recipe_id),
+            "rating": float(rating),
+            "ts": time.time(),
+        })
+        # Mở ở chế độ append: mỗi lần ghi 1 dòng ngắn không xen lẫn giữa các process
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def read_new(self) -> list:
+        """Các bản ghi mới kể từ lần gọi trước; dòng cuối đang ghi dở để lại lần sau."""
+        with self._lock:
+            if not self.path.exists():
+                return []
+            size = self.path.stat().st_size
+            if size < self._offset:
+                # Log bị thay file khác ⇒ đọc lại từ đầu (fold-in ghi đè nên đọc lại vô hại)
+                self._offset = 0
+            if size == self._offset:
+                return []
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read(size - self._offset)
+            end = data.rfind(b"\n") + 1
+            self._offset += end
+
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                print("Bad ratings log line:", line[:200])
+        return records
+
+
+class OnlineUpdater:
+    """Áp dụng log rating vào ``SVDScorer`` (fold-in) và cache điểm của ``HybridBlender``."""
+
+    def __init__(self, scorer, blender=None, log=None):
+        self.scorer = scorer
+        self.blender = blender
+        self.log = log or RatingsLog()
+        self._lock = threading.Lock()
+        # Khởi động: phát lại toàn bộ log để user đã rate trước đó vẫn được cập nhật
+        self.sync()
+
+    def sync(self) -> dict:
+        """Fold-in các rating mới trong log; trả về {user_id: số ms cập nhật}."""
+        records = self.log.read_new()
+        if not records:
+            return {}
+        by_user = {}
+        for r in records:
+            by_user.setdefault(r["user_id"], {})[r["recipe_id"]] = r["rating"]
+
+        timings = {}
+        with self._lock:
+            for user_id, ratings in by_user.items():
+                t0 = time.perf_counter()
+                if self.scorer.fold_in(user_id, ratings):
+                    if self.blender is not None:
+                        self.blender.refresh(user_id)
+                    timings[user_id] = (time.perf_counter() - t0) * 1000
+        return timings
+
+    def rate(self, user_id, recipe_id, rating: float):
+        """Ghi 1 rating vào log và áp dụng ngay; trả về số ms fold-in (None nếu user lạ)."""
+        self.log.append(user_id, recipe_id, rating)
+        return self.sync().get(int(user_id))
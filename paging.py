@@ -0,0 +1,44 @@
+"""
+Duyệt gợi ý theo trang ("Xem thêm") sau Top-20, giữ cursor theo session.
+
+- Chấm online: chấm cả catalog 1 lần lúc tạo cursor, chọn Top-``depth`` bằng argpartition
+  (O(I)) + sort đúng ``depth`` phần tử — tốn gần bằng Top-20. Mọi trang sau chỉ là cắt
+  mảng đã sort: độ trễ mỗi trang không đổi theo số trang, không chấm lại catalog.
+- Trang đầu lấy từ Top-K tính sẵn (batch_recs.py): chưa chấm gì; lần đầu bấm "Xem thêm"
+  mới gọi ``fetch(depth)`` (chấm 1 lần), phần đã hiển thị giữ nguyên, món trùng bị bỏ.
+- Pickle cũ chỉ có Top-20 ⇒ hết trang sau trang đầu.
+"""
+
+
+DEFAULT_DEPTH = 500
+
+
+class RecCursor:
+    """Danh sách Top-``depth`` đã sort + số món đã hiển thị (``items``)."""
+
+    def __init__(self, ranked, shown: int, fetch=None, depth: int = DEFAULT_DEPTH):
+        self.depth = depth
+        self._ranked = list(ranked)[:depth]
+        self.shown = min(shown, len(self._ranked))
+        self._fetch = fetch
+
+    @property
+    def items(self) -> list:
+        return self._ranked[:self.shown]
+
+    @property
+    def has_more(self) -> bool:
+        if self.shown < len(self._ranked):
+            return True
+        return self._fetch is not None and self.shown < self.depth
+
+    def more(self, n: int) -> list:
+        """Hiển thị thêm tối đa ``n`` món tiếp theo; trả về các món vừa thêm."""
+        if self.shown + n > len(self._ranked) and self._fetch is not None:
+            known = set(self._ranked)
+            self._ranked += [rid for rid in self._fetch(self.depth) if rid not in known]
+            del self._ranked[self.depth:]
+            self._fetch = None
+        page = self._ranked[self.shown:self.shown + n]
+        self.shown += len(page)
+        return page
@@ -0,0 +1,200 @@
+"""
+Factor SVD lượng tử hoá, map dùng chung giữa các worker (định dạng: xem ``scoring.py``).
+
+    python quantize.py build --factors svd_factors.npz --out svd_factors_q --dtype int8
+    python quantize.py bench --factors svd_factors.npz --test test_ratings.csv --workers 4
+
+``bench`` so từng dtype với float32 gốc trên cùng 1 mẫu user:
+- ``overlap@K``: tỉ lệ Top-K (quét toàn bộ, bỏ recipe đã rate) trùng với Top-K float32.
+- ``MAE``: sai số tuyệt đối trung bình của điểm trên Top-K float32.
+- ``ms/user``: latency ``rank`` 1 user (đường chấm online của app).
+- Có ``--test``: nDCG / R@K trên rating held-out như ``evaluation.py`` (phần SVD).
+- ``MB/worker``: RAM riêng (Private_Clean + Private_Dirty trong ``/proc/self/smaps_rollup``)
+  mỗi process tăng thêm sau khi load + phục vụ, đo trên ``--workers`` process chạy cùng lúc.
+  Mỗi worker đi đúng đường phục vụ của engine: blender (đặc trưng hybrid, tag genome),
+  IVF index đã hiệu chỉnh, ``recommend`` từng user + ``score_block`` theo block cho mọi
+  model có đủ thành phần. float32 đọc .npz ⇒ mỗi worker giữ 1 bản factor; bản map chỉ tốn
+  page cache dùng chung 1 lần — phần còn lại là đặc trưng đọc từ .npz và cache điểm theo user.
+"""
+import argparse
+import multiprocessing as mp
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ann_index import IVFIndex, SVD_INDEX_PATH
+from blending import HYBRID_FEATURES_PATH, HybridBlender, MODEL_PRESETS
+from catalog import CATALOG_DIR, RecipeCatalog
+from evaluation import load_test_ratings, ranking_metrics
+from scoring import (FACTORS_PATH, QUANTIZED_DTYPES, QUANTIZED_FACTORS_DIR, SVDScorer,
+                     build_quantized_factors, top_k_rows)
+from tag_genome import TAG_GENOME_DIR, TagGenome
+
+
+SMAPS_ROLLUP = Path("/proc/self/smaps_rollup")
+
+
+def private_mb():
+    """RAM riêng của process hiện tại (MB); None nếu không phải Linux."""
+    if not SMAPS_ROLLUP.exists():
+        return None
+    total = 0
+    for line in SMAPS_ROLLUP.read_text().splitlines():
+        if line.startswith(("Private_Clean:", "Private_Dirty:")):
+            total += int(line.split()[1])
+    return total / 1024
+
+
+def _worker(source: str, users, barrier, results, artifacts: dict):
+    before = private_mb()
+    path = Path(source)
+    scorer = SVDScorer.open(path) if path.is_dir() else SVDScorer.load(path)
+    # Như RecommenderEngine: genome khớp catalog, chỉ dùng IVF index đã hiệu chỉnh
+    genome = TagGenome.open(artifacts["genome"], catalog=RecipeCatalog.open(artifacts["catalog"]))
+    blender = HybridBlender.load(scorer, artifacts["features"], genome=genome)
+    index = IVFIndex.load(artifacts["index"])
+    index = index if index is not None and index.nprobe is not None else None
+    rows = np.array([scorer.user_row(u) for u in users])
+    for preset in MODEL_PRESETS.values():
+        if not blender.has_component(preset["secondary"]):
+            continue
+        for user_id in users:
+            blender.recommend(user_id, preset["alpha"], preset["secondary"], k=20, index=index)
+        top_k_rows(scorer.mask_seen(blender.score_block(rows, preset["alpha"], preset["secondary"]), rows), 20)
+    # Đo khi mọi worker đều đang giữ artifact
+    barrier.wait()
+    after = private_mb()
+    results.put(None if before is None else max(after - before, 0.0))
+    barrier.wait()
+
+
+def worker_memory(source, users, n_workers: int = 2, artifacts: dict | None = None) -> list:
+    """
+    RAM riêng (MB) mỗi worker tăng thêm khi load ``source`` (.npz hoặc thư mục map) cùng các
+    artifact phục vụ khác (``artifacts``: features / genome / catalog / index) rồi gợi ý cho ``users``.
+    """
+    artifacts = {k: str(v) for k, v in _served_artifacts(artifacts).items()}
+    ctx = mp.get_context("spawn")
+    barrier, results = ctx.Barrier(n_workers), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(str(source), list(users), barrier, results, artifacts))
+             for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    out = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return out
+
+
+def _served_artifacts(artifacts: dict | None) -> dict:
+    defaults = {"features": HYBRID_FEATURES_PATH, "genome": TAG_GENOME_DIR,
+                "catalog": CATALOG_DIR, "index": SVD_INDEX_PATH}
+    return defaults | {k: v for k, v in (artifacts or {}).items() if v is not None}
+
+
+def _top_k(scorer: SVDScorer, rows, k: int) -> tuple:
+    scores = scorer.mask_seen(scorer.score_block(rows), rows)
+    top = top_k_rows(scores, k)
+    return top, np.take_along_axis(scores, top, axis=1)
+
+
+def compare(reference: SVDScorer, scorer: SVDScorer, rows, k: int = 20, block: int = 256) -> dict:
+    """Độ trùng Top-K và sai số điểm của ``scorer`` so với ``reference`` trên các user ``rows``."""
+    overlap, errors = 0, []
+    for start in range(0, len(rows), block):
+        part = rows[start:start + block]
+        ref_top, ref_scores = _top_k(reference, part, k)
+        top, _ = _top_k(scorer, part, k)
+        overlap += sum(len(np.intersect1d(a, b)) for a, b in zip(ref_top, top))
+        scores = scorer.score_block(part)
+        errors.append(np.abs(np.take_along_axis(scores, ref_top, axis=1) - ref_scores).ravel())
+    return {"overlap": overlap / (k * len(rows)), "mae": float(np.concatenate(errors).mean())}
+
+
+def rank_latency(scorer: SVDScorer, user_ids, k: int = 20) -> float:
+    t0 = time.perf_counter()
+    for user_id in user_ids:
+        scorer.rank(user_id, k)
+    return (time.perf_counter() - t0) * 1000 / len(user_ids)
+
+
+def benchmark(factors_path=FACTORS_PATH, dtypes=QUANTIZED_DTYPES, k: int = 20, n_users: int = 2000,
+              test_path=None, n_workers: int = 2, seed: int = 0, artifacts: dict | None = None) -> list:
+    """
+    Mỗi dòng kết quả: {"dtype", "MB", "overlap", "mae", "ms", "MB/worker" (+ "ndcg", "recall")};
+    dòng đầu là float32 gốc (overlap = 1). ``artifacts``: đường dẫn features / genome / catalog /
+    index cho phép đo ``MB/worker`` (mặc định: đường dẫn của engine, thiếu thì bỏ thành phần đó).
+    """
+    reference = SVDScorer.load(factors_path)
+    if reference is None:
+        raise FileNotFoundError(factors_path)
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(reference.user_ids), min(n_users, len(reference.user_ids)), replace=False))
+    user_ids = reference.user_ids[rows].tolist()
+    test = load_test_ratings(test_path, reference) if test_path else None
+
+    def measure(name, scorer, source):
+        row = {"dtype": name, "MB": (scorer.item_factors.nbytes + scorer.user_factors.nbytes) / 2 ** 20}
+        row |= compare(reference, scorer, rows, k)
+        row["ms"] = rank_latency(scorer, user_ids[:200], k)
+        if test is not None:
+            metrics = ranking_metrics(scorer.score_block, scorer, *test[:2], k=k)
+            row["ndcg"], row["recall"] = metrics[f"ndcg@{k}"], metrics[f"recall@{k}"]
+        memory = worker_memory(source, user_ids[:50], n_workers, artifacts) if n_workers > 0 else []
+        row["MB/worker"] = max(memory) if memory and None not in memory else None
+        return row
+
+    results = [measure("float32", reference, factors_path)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in dtypes:
+            out = Path(tmp) / dtype
+            results.append(measure(dtype, build_quantized_factors(reference, out, dtype), out))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build / benchmark factor SVD lượng tử hoá (memmap dùng chung)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--factors", default=str(FACTORS_PATH))
+    build.add_argument("--out", default=str(QUANTIZED_FACTORS_DIR))
+    build.add_argument("--dtype", choices=QUANTIZED_DTYPES, default="int8")
+    bench = sub.add_parser("bench")
+    bench.add_argument("--factors", default=str(FACTORS_PATH))
+    bench.add_argument("--dtype", choices=QUANTIZED_DTYPES, nargs="+", default=list(QUANTIZED_DTYPES))
+    bench.add_argument("--test", default=None, help="CSV held-out: user_id, recipe_id, rating")
+    bench.add_argument("--k", type=int, default=20)
+    bench.add_argument("--users", type=int, default=2000)
+    bench.add_argument("--workers", type=int, default=2)
+    bench.add_argument("--features", default=str(HYBRID_FEATURES_PATH))
+    bench.add_argument("--genome", default=str(TAG_GENOME_DIR))
+    bench.add_argument("--catalog", default=str(CATALOG_DIR))
+    bench.add_argument("--index", default=str(SVD_INDEX_PATH))
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        scorer = SVDScorer.load(args.factors)
+        if scorer is None:
+            raise SystemExit(f"factors not found: {args.factors}")
+        t0 = time.perf_counter()
+        mapped = build_quantized_factors(scorer, args.out, args.dtype)
+        size = (mapped.item_factors.nbytes + mapped.user_factors.nbytes) / 2 ** 20
+        print(f"Wrote {args.dtype} factors ({size:.1f} MB) in {time.perf_counter() - t0:.1f}s → {args.out}")
+    else:
+        artifacts = {"features": args.features, "genome": args.genome, "catalog": args.catalog, "index": args.index}
+        results = benchmark(args.factors, args.dtype, args.k, args.users, args.test, args.workers,
+                            artifacts=artifacts)
+        extra = ["ndcg", "recall"] if args.test else []
+        header = ["dtype", "MB", f"overlap@{args.k}", "MAE", "ms/user"] + [f"{m}@{args.k}" for m in extra] + ["MB/worker"]
+        print(" ".join(f"{h:>12}" for h in header))
+        for r in results:
+            cells = [r["dtype"], f"{r['MB']:.1f}", f"{r['overlap']:.4f}", f"{r['mae']:.5f}", f"{r['ms']:.3f}"]
+            cells += [f"{r[m]:.4f}" for m in extra]
+            cells.append("n/a" if r["MB/worker"] is None else f"{r['MB/worker']:.1f}")
+            print(" ".join(f"{c:>12}" for c in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Grid card recipe dạng 1 component: 1 payload HTML/JS tĩnh + 1 list JSON gọn thay cho
+K khối ``st.markdown`` + K ``st.button``. Mỗi lần vẽ chỉ là 1 delta qua websocket, số
+message không tăng theo K.
+
+Frontend không cần build: ``components/recipe_grid/index.html`` nói chuyện với Streamlit
+qua postMessage (componentReady / render / setComponentValue). Mọi click trong grid trả về
+1 giá trị duy nhất của component::
+
+    {"action": "select", "id": 12345, "nonce": "..."}   # nút "Xem hình" của 1 card
+    {"action": "more", "id": null, "nonce": "..."}      # nút "Xem thêm"
+
+Giá trị của component giữ nguyên qua các lần rerun, nên sự kiện được đọc bằng ``pop_event``
+(theo ``nonce``) *trước* khi vẽ lại grid: grid vẽ ra đã phản ánh click vừa rồi, không cần
+rerun thêm lần nữa.
+"""
+from pathlib import Path
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+
+FRONTEND_DIR = Path(__file__).parent / "components" / "recipe_grid"
+
+_component = components.declare_component("recipe_grid", path=str(FRONTEND_DIR))
+
+
+def pop_event(key: str):
+    """Sự kiện click chưa xử lý của grid ``key`` (dict), None nếu không có."""
+    event = st.session_state.get(key)
+    handled = f"{key}_handled"
+    if not event or st.session_state.get(handled) == event.get("nonce"):
+        return None
+    st.session_state[handled] = event.get("nonce")
+    return event
+
+
+def recipe_grid(cards: list, key: str, selected=None, more_label: str | None = None,
+                select_label: str = "📷 Xem hình", columns: int = 4):
+    """
+    Vẽ grid từ ``cards`` = [[recipe_id, tên, tags, url ảnh | None], ...].
+    ``selected``: recipe đang chọn (viền nổi bật); ``more_label`` None ⇒ ẩn nút "Xem thêm".
+    """
+    _component(cards=cards, selected=selected, more_label=more_label, select_label=select_label,
+               columns=columns, key=key, default=None)
@@ -0,0 +1,432 @@
+"""
+Engine chấm điểm online cho SVD: tính điểm của 1 user với toàn bộ recipe
+bằng đúng 1 phép nhân ma trận-vector của NumPy, rồi lấy Top-K bằng argpartition.
+
+File factors (``svd_factors.npz``) gồm:
+- ``user_ids`` / ``item_ids``: ID user / recipe, đã sort tăng dần (int64).
+- ``user_factors`` (U × f) / ``item_factors`` (I × f): float32.
+- ``user_bias`` / ``item_bias`` / ``global_mean``: bias của mô hình SVD.
+- ``seen_indptr`` / ``seen_indices``: các recipe user đã rate, dạng CSR
+  (hàng = user, cột = vị trí recipe trong ``item_ids``).
+- ``seen_ratings`` (tuỳ chọn): rating tương ứng với ``seen_indices``, cần cho fold-in.
+- ``reg`` (tuỳ chọn): regularization lúc train (``train.py --reg``), fold-in giải với cùng giá trị;
+  file cũ không có thì dùng ``ALS_REG``.
+
+Bản lượng tử hoá dùng chung giữa nhiều worker (``svd_factors_q/``, build bằng
+``build_quantized_factors`` / ``python quantize.py build``): cùng các mảng trên, mỗi mảng
+1 file ``.npy``, riêng ``user_factors`` / ``item_factors`` lưu float16, hoặc int8 kèm
+``<tên>_scale.npy`` (float32 theo hàng); ``meta.json`` ghi dtype + ``global_mean`` + ``reg``.
+``SVDScorer.open`` map các file này thay vì đọc vào RAM: mọi process Streamlit / API trên
+cùng máy dùng chung 1 bản trong page cache của OS, mỗi worker thêm gần như không tốn RAM riêng.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+FACTORS_PATH = Path("svd_factors.npz")
+QUANTIZED_FACTORS_DIR = Path("svd_factors_q")
+QUANTIZED_DTYPES = ("int8", "float16")
+# Số hàng giải nén mỗi lần khi nhân với ma trận lượng tử hoá (4096 × 32 float32 = 512 KB, nằm gọn trong cache)
+QUANT_BLOCK_ROWS = 4096
+# Regularization của ALS (λ·n_u); train.py và fold-in phải dùng cùng giá trị
+ALS_REG = 0.1
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Trả về vị trí của k điểm cao nhất (đã sort giảm dần).
+    Dùng argpartition (O(n)) rồi chỉ sort k phần tử ⇒ nhanh hơn argsort toàn bộ.
+    Các điểm -inf (đã bị loại) không bao giờ được trả về.
+    """
+    k = min(k, int(np.isfinite(scores).sum()))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def top_k_rows(scores: np.ndarray, k: int, chunk: int = 256) -> np.ndarray:
+    """
+    Top-k của từng hàng trong ma trận điểm (B × I): vị trí (B × k), mỗi hàng sort giảm dần.
+    Không argpartition cả hàng: max của từng đoạn ``chunk`` cột cho k phần tử khác nhau,
+    nên max lớn thứ k trong số đó là ngưỡng dưới của phần tử thứ k ⇒ chỉ còn sort các
+    phần tử ≥ ngưỡng (thường ~k mỗi hàng). Nhanh ~4 lần với I = 231K.
+    """
+    b, n = scores.shape
+    k = min(k, n)
+    if n < chunk * k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind="stable")
+        return np.take_along_axis(part, order, axis=1)
+
+    full = n // chunk * chunk
+    maxima = scores[:, :full].reshape(b, -1, chunk).max(axis=2)
+    if full < n:
+        maxima = np.hstack([maxima, scores[:, full:].max(axis=1, keepdims=True)])
+    threshold = -np.partition(-maxima, k - 1, axis=1)[:, k - 1]
+    flat = np.flatnonzero(scores >= threshold[:, None])
+    rows, cols = flat // n, flat % n
+    order = np.lexsort((-scores.ravel()[flat], rows))
+    rows, cols = rows[order], cols[order]
+    # Thứ hạng trong hàng = vị trí − vị trí đầu tiên của hàng đó
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    keep = rank < k
+    out = np.empty((b, k), dtype=np.int64)
+    out[rows[keep], rank[keep]] = cols[keep]
+    return out
+
+
+class QuantizedMatrix:
+    """
+    Ma trận factor (N × f) lượng tử hoá: ``codes`` float16, hoặc int8 kèm ``scale`` (N,)
+    float32 theo hàng (hàng i ≈ codes[i] · scale[i]); thường là memmap dùng chung.
+    Không bao giờ giải nén cả ma trận: phép nhân đổi ``block_rows`` hàng 1 lần sang float32,
+    với int8 thì nhân ``scale`` vào kết quả (N số) thay vì vào ma trận.
+    Đủ phần giao diện ndarray mà SVDScorer dùng: ``shape``, ``M[rows]``, ``M[row] = v``,
+    ``M @ v``, ``X @ M.T``.
+    """
+
+    def __init__(self, codes, scale=None, block_rows: int = QUANT_BLOCK_ROWS):
+        self.codes = codes
+        self.scale = scale
+        self.block_rows = block_rows
+
+    @classmethod
+    def quantize(cls, matrix, dtype: str = "int8"):
+        """Lượng tử hoá ma trận float32; int8 đối xứng, scale = max |hàng| / 127."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if dtype == "float16":
+            return cls(matrix.astype(np.float16))
+        if dtype != "int8":
+            raise ValueError(f"unsupported dtype {dtype!r}, expected one of {QUANTIZED_DTYPES}")
+        scale = np.abs(matrix).max(axis=1) / 127
+        scale[scale == 0] = 1.0
+        codes = np.rint(matrix / scale[:, None]).astype(np.int8)
+        return cls(codes, scale.astype(np.float32))
+
+    @property
+    def dtype(self) -> str:
+        return self.codes.dtype.name
+
+    @property
+    def shape(self) -> tuple:
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (0 if self.scale is None else self.scale.nbytes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index) -> np.ndarray:
+        values = self.codes[index].astype(np.float32)
+        if self.scale is not None:
+            values *= self.scale[index][..., None]
+        return values
+
+    def __setitem__(self, row, vector):
+        """Ghi đè 1 hàng (fold-in); memmap ``mode='c'`` ⇒ chỉ trang bị ghi thành bản riêng của process."""
+        row_q = self.quantize(np.asarray(vector)[None], self.dtype)
+        self.codes[row] = row_q.codes[0]
+        if self.scale is not None:
+            self.scale[row] = row_q.scale[0]
+
+    def __array__(self, dtype=None, copy=None):
+        # Giải nén toàn bộ (vd. np.hstack khi ghép ma trận item cho batch): bản riêng float32
+        return self[:] if dtype is None else self[:].astype(dtype)
+
+    def __matmul__(self, other) -> np.ndarray:
+        """``M @ v`` (v: f) hoặc ``M @ X`` (X: f × B), theo block ``block_rows`` hàng."""
+        other = np.asarray(other, dtype=np.float32)
+        out = np.empty((len(self),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            stop = start + self.block_rows
+            out[start:stop] = self.codes[start:stop].astype(np.float32) @ other
+        if self.scale is not None:
+            out *= self.scale.reshape((-1,) + (1,) * (other.ndim - 1))
+        return out
+
+    @property
+    def T(self):
+        return _TransposedQuantized(self)
+
+
+class _TransposedQuantized:
+    """``M.T`` của QuantizedMatrix, chỉ dùng ở vế phải: ``X @ M.T``."""
+
+    # numpy trả NotImplemented cho ``ndarray @ _TransposedQuantized`` ⇒ Python gọi __rmatmul__
+    __array_ufunc__ = None
+
+    def __init__(self, matrix: QuantizedMatrix):
+        self.matrix = matrix
+
+    def __rmatmul__(self, other) -> np.ndarray:
+        """``X @ M.T`` (X: B × f) ⇒ (B × N) C-contiguous, như khi nhân 2 ma trận float32."""
+        m = self.matrix
+        other = np.asarray(other, dtype=np.float32)
+        out = np.empty(other.shape[:-1] + (len(m),), dtype=np.float32)
+        for start in range(0, len(m), m.block_rows):
+            stop = start + m.block_rows
+            out[..., start:stop] = other @ m.codes[start:stop].astype(np.float32).T
+        if m.scale is not None:
+            out *= m.scale
+        return out
+
+
+def _as_factors(matrix):
+    """QuantizedMatrix giữ nguyên (không giải nén), còn lại ⇒ float32 C-contiguous."""
+    if isinstance(matrix, QuantizedMatrix):
+        return matrix
+    return np.ascontiguousarray(matrix, dtype=np.float32)
+
+
+class SVDScorer:
+    """
+    Giữ ma trận factor (trong RAM, hoặc memmap lượng tử hoá dùng chung qua ``open``) và
+    chấm điểm online cho bất kỳ user nào.
+    """
+
+    def __init__(self, user_ids, item_ids, user_factors, item_factors,
+                 user_bias, item_bias, global_mean, seen_indptr, seen_indices, seen_ratings=None,
+                 reg: float = ALS_REG):
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.user_factors = _as_factors(user_factors)
+        self.item_factors = _as_factors(item_factors)
+        self.user_bias = np.asarray(user_bias, dtype=np.float32)
+        self.item_bias = np.asarray(item_bias, dtype=np.float32)
+        self.global_mean = float(global_mean)
+        self.seen_indptr = np.asarray(seen_indptr, dtype=np.int64)
+        self.seen_indices = np.asarray(seen_indices, dtype=np.int32)
+        self.seen_ratings = None if seen_ratings is None else np.asarray(seen_ratings, dtype=np.float32)
+        self.reg = float(reg)
+        # Hàng user đã fold-in rating mới: hàng → (vị trí recipe đã rate, rating)
+        self._folded = {}
+        # Hàng → số lần fold-in (đổi ⇒ gợi ý đã tính cho user hết hạn)
+        self._fold_counts = {}
+
+    @classmethod
+    def load(cls, path=FACTORS_PATH):
+        """Đọc file factors ``.npz``; trả về None nếu chưa có file (app sẽ dùng pickle cũ)."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        with np.load(path) as z:
+            return cls(
+                z["user_ids"], z["item_ids"],
+                z["user_factors"], z["item_factors"],
+                z["user_bias"], z["item_bias"], z["global_mean"],
+                z["seen_indptr"], z["seen_indices"],
+                z["seen_ratings"] if "seen_ratings" in z.files else None,
+                float(z["reg"]) if "reg" in z.files else ALS_REG,
+            )
+
+    @classmethod
+    def open(cls, path=QUANTIZED_FACTORS_DIR):
+        """
+        Map bản lượng tử hoá (``build_quantized_factors``); None nếu chưa có. Mọi mảng mở bằng
+        memmap ``mode='c'`` (copy-on-write): các process map cùng file dùng chung page cache,
+        fold-in ghi vào hàng nào thì chỉ trang chứa hàng đó thành bản riêng của process.
+        """
+        path = Path(path)
+        if not (path / "meta.json").exists():
+            return None
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        def array(name):
+            return np.load(path / f"{name}.npy", mmap_mode="c")
+
+        def factors(name):
+            return QuantizedMatrix(array(name), array(f"{name}_scale") if meta["dtype"] == "int8" else None)
+
+        return cls(
+            array("user_ids"), array("item_ids"),
+            factors("user_factors"), factors("item_factors"),
+            array("user_bias"), array("item_bias"), meta["global_mean"],
+            array("seen_indptr"), array("seen_indices"),
+            array("seen_ratings") if (path / "seen_ratings.npy").exists() else None,
+            meta.get("reg", ALS_REG),
+        )
+
+    def save(self, path=FACTORS_PATH):
+        extra = {} if self.seen_ratings is None else {"seen_ratings": self.seen_ratings}
+        np.savez(
+            path,
+            user_ids=self.user_ids, item_ids=self.item_ids,
+            user_factors=self.user_factors, item_factors=self.item_factors,
+            user_bias=self.user_bias, item_bias=self.item_bias,
+            global_mean=np.float32(self.global_mean), reg=np.float64(self.reg),
+            seen_indptr=self.seen_indptr, seen_indices=self.seen_indices,
+            **extra,
+        )
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    def user_row(self, user_id):
+        """Vị trí của user trong ma trận factor (binary search), None nếu không có."""
+        row = int(np.searchsorted(self.user_ids, user_id))
+        if row < len(self.user_ids) and self.user_ids[row] == user_id:
+            return row
+        return None
+
+    def has_user(self, user_id) -> bool:
+        return self.user_row(user_id) is not None
+
+    def is_folded(self, user_id) -> bool:
+        """User đã có rating mới được fold-in (factor khác với file đã train)."""
+        row = self.user_row(user_id)
+        return row is not None and row in self._folded
+
+    def fold_count(self, user_id) -> int:
+        """Số lần factor của user được fold-in từ lúc load (0 nếu chưa có / user lạ)."""
+        return self._fold_counts.get(self.user_row(user_id), 0)
+
+    def seen_items(self, row: int) -> np.ndarray:
+        """Vị trí các recipe mà user (theo hàng) đã rate."""
+        if row in self._folded:
+            return self._folded[row][0]
+        return self.seen_indices[self.seen_indptr[row]:self.seen_indptr[row + 1]]
+
+    def user_ratings(self, row: int) -> tuple:
+        """
+        (vị trí recipe, rating) user đã rate. File factors không có ``seen_ratings``
+        thì dùng dự đoán hiện tại của model thay cho rating gốc.
+        """
+        if row in self._folded:
+            return self._folded[row]
+        start, end = self.seen_indptr[row], self.seen_indptr[row + 1]
+        positions = self.seen_indices[start:end]
+        if self.seen_ratings is not None:
+            return positions, self.seen_ratings[start:end]
+        pred = (self.global_mean + self.user_bias[row] + self.item_bias[positions]
+                + self.item_factors[positions] @ self.user_factors[row])
+        return positions, pred.astype(np.float32)
+
+    def fold_in(self, user_id, ratings: dict, reg: float | None = None) -> bool:
+        """
+        Cập nhật tại chỗ [p_u, b_u] của 1 user từ rating mới ``{recipe_id: rating}``
+        (ghi đè rating cũ cùng recipe), giữ nguyên item factors: đúng 1 bước ALS
+        của user đó, giải 1 hệ (f+1) × (f+1). False nếu user / mọi recipe đều lạ.
+        ``reg`` mặc định = regularization lúc train (``self.reg``).
+        """
+        reg = self.reg if reg is None else reg
+        row = self.user_row(user_id)
+        if row is None:
+            return False
+        rids = np.fromiter(ratings.keys(), dtype=np.int64, count=len(ratings))
+        values = np.fromiter(ratings.values(), dtype=np.float32, count=len(ratings))
+        new_pos = np.searchsorted(self.item_ids, rids).clip(0, self.n_items - 1)
+        known = self.item_ids[new_pos] == rids
+        if not known.any():
+            return False
+        new_pos, values = new_pos[known], values[known]
+
+        old_pos, old_values = self.user_ratings(row)
+        keep = ~np.isin(old_pos, new_pos)
+        positions = np.concatenate([old_pos[keep], new_pos]).astype(np.int32)
+        targets = np.concatenate([old_values[keep], values]) - self.global_mean - self.item_bias[positions]
+
+        x = np.hstack([self.item_factors[positions], np.ones((len(positions), 1), dtype=np.float32)])
+        a = x.T @ x + reg * len(positions) * np.eye(x.shape[1], dtype=np.float32)
+        solution = np.linalg.solve(a, x.T @ targets)
+        self.user_factors[row] = solution[:-1]
+        self.user_bias[row] = solution[-1]
+        self._folded[row] = (positions, np.concatenate([old_values[keep], values]))
+        self._fold_counts[row] = self._fold_counts.get(row, 0) + 1
+        return True
+
+    def score_user(self, user_id) -> np.ndarray:
+        """
+        Điểm của user với toàn bộ recipe: item_factors @ p_u + b_i.
+        (global_mean và b_u là hằng số với 1 user nên không ảnh hưởng thứ hạng.)
+        """
+        row = self.user_row(user_id)
+        if row is None:
+            raise KeyError(user_id)
+        return self.item_factors @ self.user_factors[row] + self.item_bias
+
+    def score_block(self, rows) -> np.ndarray:
+        """Điểm của nhiều user (theo hàng) cùng lúc: 1 phép nhân ma trận-ma trận (B × I)."""
+        return self.user_factors[rows] @ self.item_factors.T + self.item_bias
+
+    def mask_seen(self, scores: np.ndarray, rows):
+        """Gán -inf cho recipe đã rate trong ma trận điểm (B × I) của các user ``rows``."""
+        rows = np.asarray(rows)
+        starts, ends = self.seen_indptr[rows], self.seen_indptr[rows + 1]
+        counts = ends - starts
+        if counts.sum() > 0:
+            block_rows = np.repeat(np.arange(len(rows)), counts)
+            # Vị trí trong seen_indices của từng phần tử: start của hàng + thứ tự trong hàng
+            within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            cols = self.seen_indices[np.repeat(starts, counts) + within]
+            scores[block_rows, cols] = -np.inf
+        # Recipe mới rate qua fold-in chưa có trong CSR
+        if self._folded:
+            for i, row in enumerate(rows.tolist()):
+                if row in self._folded:
+                    scores[i, self._folded[row][0]] = -np.inf
+        return scores
+
+    def rank(self, user_id, k: int = 20, exclude_seen: bool = True,
+             index=None, nprobe: int | None = None, mask=None) -> tuple:
+        """
+        Top-K cho user dưới dạng (vị trí item, điểm), đã sort giảm dần, bỏ recipe đã rate.
+        Nếu có ``index`` (IVFIndex build trên item_factors + item_bias) thì chỉ quét
+        ``nprobe`` cụm thay vì toàn bộ catalog.
+        ``mask`` (bool, theo vị trí item, vd. từ TagBitmapIndex): chỉ chấm điểm các recipe
+        được phép rồi mới lấy Top-K — chính xác, chi phí tỉ lệ với số recipe được phép.
+        """
+        row = self.user_row(user_id)
+        if row is None:
+            raise KeyError(user_id)
+        seen = self.seen_items(row) if exclude_seen else None
+        if mask is not None:
+            allowed = np.flatnonzero(mask)
+            if seen is not None:
+                allowed = allowed[~np.isin(allowed, seen)]
+            scores = self.item_factors[allowed] @ self.user_factors[row] + self.item_bias[allowed]
+            best = top_k(scores, k)
+            return allowed[best], scores[best]
+        if index is not None:
+            return index.search(self.user_factors[row], k, nprobe=nprobe, exclude=seen)
+        scores = self.score_user(user_id)
+        if seen is not None:
+            scores[seen] = -np.inf
+        best = top_k(scores, k)
+        return best, scores[best]
+
+    def recommend(self, user_id, k: int = 20, exclude_seen: bool = True,
+                  index=None, nprobe: int | None = None, mask=None) -> list:
+        """Top-K recipe ID cho user (xem ``rank``)."""
+        positions, _ = self.rank(user_id, k, exclude_seen, index, nprobe, mask)
+        return self.item_ids[positions].tolist()
+
+
+def build_quantized_factors(scorer: SVDScorer, out_dir=QUANTIZED_FACTORS_DIR, dtype: str = "int8") -> SVDScorer:
+    """Ghi ``scorer`` ra thư mục lượng tử hoá (xem đầu file) và trả về bản đã map lại từ đĩa."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name in ("user_factors", "item_factors"):
+        matrix = QuantizedMatrix.quantize(np.asarray(getattr(scorer, name)), dtype)
+        np.save(out_dir / f"{name}.npy", matrix.codes)
+        if matrix.scale is not None:
+            np.save(out_dir / f"{name}_scale.npy", matrix.scale)
+    arrays = {
+        "user_ids": scorer.user_ids, "item_ids": scorer.item_ids,
+        "user_bias": scorer.user_bias, "item_bias": scorer.item_bias,
+        "seen_indptr": scorer.seen_indptr, "seen_indices": scorer.seen_indices,
+    }
+    if scorer.seen_ratings is not None:
+        arrays["seen_ratings"] = scorer.seen_ratings
+    for name, values in arrays.items():
+        np.save(out_dir / f"{name}.npy", values)
+    # meta.json ghi cuối cùng: có meta ⇒ các file .npy đã đủ
+    with open(out_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"dtype": dtype, "global_mean": scorer.global_mean, "reg": scorer.reg}, f, indent=2)
+    return SVDScorer.open(out_dir)
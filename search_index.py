@@ -0,0 +1,157 @@
+"""
+Inverted index cho ô tìm món theo tên / tag, build 1 lần lúc khởi động (dùng chung qua
+``st.cache_resource``).
+
+- Term = từ viết thường trong tên món và trong tag (``30-minutes-or-less`` ⇒ 30, minutes, ...).
+- Postings: 1 mảng int32 nối liền (vị trí recipe, tăng dần trong từng term) + offset theo
+  term, vocab sort theo chữ cái ⇒ mọi term có cùng prefix nằm liền nhau (2 lần binary search).
+- Query: mỗi từ khớp theo prefix ("chick curr" ⇒ chicken curry), kết quả là giao của các từ;
+  giao 2 mảng đã sort bằng binary search các phần tử của mảng nhỏ trong mảng lớn,
+  bắt đầu từ từ có ít recipe nhất.
+"""
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from scoring import top_k
+
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> list:
+    return _WORD.findall(str(text).lower())
+
+
+class RecipeSearchIndex:
+    """Postings (int32, vị trí trong ``ids``) của từng term, vocab đã sort."""
+
+    def __init__(self, ids, vocab: list, offsets, postings):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.vocab = vocab
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.postings = np.asarray(postings, dtype=np.int32)
+
+    @classmethod
+    def build(cls, ids, names: list, tag_offsets, tag_codes, tag_vocab: list):
+        """Từ tên món (theo thứ tự ``ids``) + tag dạng CSR như trong catalog."""
+        n = len(ids)
+        name_words = [tokenize(name) for name in names]
+        # Tag chỉ có vài trăm loại: tách từ theo mã tag 1 lần (CSR: mã tag → từ)
+        tag_words = [tokenize(t) for t in tag_vocab]
+        n_name_words = sum(len(w) for w in name_words)
+        codes, uniq = pd.factorize(pd.Series([w for ws in name_words + tag_words for w in ws], dtype=object),
+                                   sort=True)
+        word_offsets = np.zeros(len(tag_vocab) + 1, dtype=np.int64)
+        np.cumsum([len(w) for w in tag_words], out=word_offsets[1:])
+
+        # Term của tag theo từng recipe: nhân bản term của mã tag bằng NumPy
+        tag_codes = np.asarray(tag_codes, dtype=np.int64)
+        tag_rows = np.repeat(np.arange(n), np.diff(np.asarray(tag_offsets)))
+        per_tag = np.diff(word_offsets)[tag_codes]
+        within = np.arange(per_tag.sum()) - np.repeat(np.cumsum(per_tag) - per_tag, per_tag)
+        tag_terms = codes[n_name_words:][np.repeat(word_offsets[tag_codes], per_tag) + within]
+
+        rows = np.concatenate([np.repeat(np.arange(n), [len(w) for w in name_words]), np.repeat(tag_rows, per_tag)])
+        terms = np.concatenate([codes[:n_name_words], tag_terms]).astype(np.int64)
+        # (term, recipe) không trùng, sort theo term rồi theo recipe (sort + so sánh kề nhau, không hash)
+        pairs = np.sort(terms * max(n, 1) + rows)
+        pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])] if len(pairs) else pairs
+        terms, postings = pairs // max(n, 1), pairs % max(n, 1)
+        offsets = np.zeros(len(uniq) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(uniq)), out=offsets[1:])
+        return cls(ids, [str(t) for t in uniq], offsets, postings)
+
+    @classmethod
+    def from_catalog(cls, catalog):
+        names = [catalog.name_at(i) for i in range(len(catalog))]
+        return cls.build(catalog.ids, names, catalog.tag_offsets, catalog.tag_codes, catalog.tag_vocab)
+
+    @classmethod
+    def from_recipe_info(cls, recipe_info: dict):
+        """Từ dict pickle cũ ``{rid: {'name', 'tags'}}``."""
+        ids = sorted(int(rid) for rid in recipe_info)
+        vocab, codes, offsets = {}, [], [0]
+        for rid in ids:
+            for tag in recipe_info[rid].get("tags") or []:
+                codes.append(vocab.setdefault(str(tag), len(vocab)))
+            offsets.append(len(codes))
+        names = [str(recipe_info[rid].get("name") or "") for rid in ids]
+        return cls.build(ids, names, offsets, codes, list(vocab))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def align_values(self, item_ids, values) -> np.ndarray:
+        """Mảng float32 theo vị trí ``ids`` từ giá trị theo ``item_ids`` của engine (recipe thiếu ⇒ 0)."""
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        out = np.zeros(len(self.ids), dtype=np.float32)
+        rows = np.searchsorted(self.ids, item_ids).clip(0, max(len(self.ids) - 1, 0))
+        found = self.ids[rows] == item_ids if len(self.ids) else np.zeros(len(item_ids), dtype=bool)
+        out[rows[found]] = np.asarray(values)[found]
+        return out
+
+    def term_range(self, prefix: str) -> tuple:
+        """[lo, hi) các term trong vocab bắt đầu bằng ``prefix``."""
+        lo = bisect_left(self.vocab, prefix)
+        hi = bisect_left(self.vocab, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def matches(self, prefix: str) -> np.ndarray:
+        """Vị trí recipe (int32, tăng dần) có ít nhất 1 term bắt đầu bằng ``prefix``."""
+        lo, hi = self.term_range(prefix)
+        start, end = self.offsets[lo], self.offsets[hi]
+        if hi - lo <= 1:
+            return self.postings[start:end]
+        if end - start > len(self.ids) // 8:
+            # Prefix ngắn khớp rất nhiều term: hợp bằng mask thay vì sort
+            hit = np.zeros(len(self.ids), dtype=bool)
+            hit[self.postings[start:end]] = True
+            return np.flatnonzero(hit).astype(np.int32)
+        return np.unique(self.postings[start:end])
+
+    @staticmethod
+    def intersect(small: np.ndarray, large: np.ndarray) -> np.ndarray:
+        """
+        Giao 2 mảng đã sort: tìm từng phần tử của mảng nhỏ trong mảng lớn (O(m log n));
+        2 mảng cỡ gần nhau thì đánh dấu mảng lớn lên mask (O(m + n)) rẻ hơn.
+        """
+        if len(small) > len(large):
+            small, large = large, small
+        if not len(small):
+            return small
+        if len(small) * 16 > len(large):
+            hit = np.zeros(max(int(small[-1]), int(large[-1])) + 1, dtype=bool)
+            hit[large] = True
+            return small[hit[small]]
+        pos = np.searchsorted(large, small).clip(0, len(large) - 1)
+        return small[large[pos] == small]
+
+    def search_rows(self, query: str) -> np.ndarray:
+        """Vị trí recipe khớp mọi từ trong query (theo prefix); query rỗng ⇒ []."""
+        words = tokenize(query)
+        if not words:
+            return np.empty(0, dtype=np.int32)
+        lists = sorted((self.matches(w) for w in dict.fromkeys(words)), key=len)
+        result = lists[0]
+        for other in lists[1:]:
+            if not len(result):
+                break
+            result = self.intersect(result, other)
+        return result
+
+    def search(self, query: str, k: int = 20, weights=None) -> tuple:
+        """
+        (recipe ID của tối đa k món khớp, tổng số món khớp). ``weights`` (theo vị trí
+        trong ``ids``, vd. độ phổ biến) ⇒ trả về món có weight cao nhất; không thì theo ID.
+        """
+        rows = self.search_rows(query)
+        if weights is not None and len(rows) > k:
+            rows_k = rows[top_k(np.asarray(weights, dtype=np.float32)[rows], k)]
+        elif weights is not None:
+            rows_k = rows[np.argsort(-np.asarray(weights)[rows], kind="stable")]
+        else:
+            rows_k = rows[:k]
+        return self.ids[rows_k].tolist(), len(rows)
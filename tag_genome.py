@@ -0,0 +1,136 @@
+"""
+Tag genome: ma trận độ liên quan recipe × tag (dense, float16) trên đĩa, đọc bằng memory-map.
+
+- Hàng i ứng với recipe ``ids[i]``, cùng thứ tự với ``recipe_catalog/ids.npy``
+  (``open(..., catalog=...)`` kiểm tra điều này), nên tra hàng bằng binary search.
+- float16 ⇒ 231K recipe × 128 tag chỉ ~59 MB, các trang được OS chia sẻ giữa mọi worker.
+- ``score`` chấm điểm nhiều query (profile user hoặc recipe mồi) cùng lúc: duyệt theo
+  block hàng, đổi block sang float32 rồi nhân ma trận bằng BLAS — NumPy không có
+  BLAS cho float16 nên không nhân thẳng trên ma trận float16.
+
+Thư mục gồm ``ids.npy`` (int64), ``relevance.npy`` (N × T, float16), ``tags.json``.
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from scoring import top_k
+
+
+TAG_GENOME_DIR = Path("tag_genome")
+# Số hàng đổi sang float32 mỗi lần (4096 × 128 × 4 byte = 2 MB, vừa cache CPU)
+SCORE_BLOCK_ROWS = 4096
+
+
+class TagGenome:
+    """Ma trận relevance chỉ đọc + API chấm điểm theo batch."""
+
+    def __init__(self, ids, relevance, tags: list):
+        self.ids = ids
+        self.relevance = relevance
+        self.tags = tags
+        self._norms = None
+
+    @classmethod
+    def open(cls, path=TAG_GENOME_DIR, catalog=None):
+        """
+        Memory-map thư mục tag genome; None nếu chưa build, hoặc nếu ``catalog``
+        được truyền vào mà thứ tự recipe không khớp (genome cũ hơn catalog).
+        """
+        path = Path(path)
+        if not (path / "relevance.npy").exists():
+            return None
+        ids = np.load(path / "ids.npy", mmap_mode="r")
+        if catalog is not None and not np.array_equal(ids, catalog.ids):
+            print("Tag genome is not row-aligned with the recipe catalog:", path)
+            return None
+        with open(path / "tags.json", encoding="utf-8") as f:
+            tags = json.load(f)
+        return cls(ids, np.load(path / "relevance.npy", mmap_mode="r"), tags)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def n_tags(self) -> int:
+        return self.relevance.shape[1]
+
+    def rows(self, recipe_ids) -> np.ndarray:
+        """Hàng của từng recipe ID (vector hoá), -1 nếu không có trong genome."""
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, recipe_ids).clip(0, max(len(self.ids) - 1, 0))
+        found = np.asarray(self.ids)[rows] == recipe_ids if len(self.ids) else np.zeros(len(rows), bool)
+        return np.where(found, rows, -1)
+
+    def vectors(self, rows) -> np.ndarray:
+        """Vector relevance float32 (B × T) của các hàng; hàng -1 ⇒ vector 0."""
+        rows = np.asarray(rows)
+        out = np.zeros((len(rows), self.n_tags), dtype=np.float32)
+        ok = rows >= 0
+        out[ok] = self.relevance[rows[ok]]
+        return out
+
+    def profile(self, recipe_ids, weights=None) -> np.ndarray:
+        """Profile tag (T,) = trung bình có trọng số vector của các recipe mồi."""
+        vectors = self.vectors(self.rows(recipe_ids))
+        weights = np.ones(len(vectors), dtype=np.float32) if weights is None else np.asarray(weights, np.float32)
+        return weights @ vectors / max(float(np.abs(weights).sum()), 1e-12)
+
+    def score(self, queries: np.ndarray, rows=None) -> np.ndarray:
+        """
+        Điểm (B × N) của B query (B × T) với mọi recipe — hoặc chỉ các ``rows``
+        (hàng -1 ⇒ điểm 0). Mỗi block hàng: 1 lần đổi sang float32 + 1 phép nhân ma trận.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        rows = None if rows is None else np.asarray(rows)
+        n = len(self.ids) if rows is None else len(rows)
+        out = np.empty((len(queries), n), dtype=np.float32)
+        for start in range(0, n, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, n)
+            if rows is None:
+                block = np.asarray(self.relevance[start:end], dtype=np.float32)
+            else:
+                block = self.vectors(rows[start:end])
+            np.matmul(queries, block.T, out=out[:, start:end])
+        return out
+
+    def similar(self, recipe_ids, k: int = 10) -> list:
+        """
+        Top-k recipe ID có tag giống nhất cho từng recipe mồi (cosine), tất cả trong
+        1 lần ``score``; recipe mồi không có trong genome ⇒ [].
+        """
+        rows = self.rows(recipe_ids)
+        queries = self.vectors(rows)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = self.score(queries / np.where(norms > 0, norms, 1.0))
+        item_norms = self.norms()
+        scores /= np.where(item_norms > 0, item_norms, 1.0)
+        out = []
+        for i, row in enumerate(rows):
+            if row < 0:
+                out.append([])
+                continue
+            scores[i, row] = -np.inf
+            out.append(np.asarray(self.ids)[top_k(scores[i], k)].tolist())
+        return out
+
+    def norms(self) -> np.ndarray:
+        """Chuẩn L2 của từng hàng (tính theo block, cache lại)."""
+        if self._norms is None:
+            self._norms = np.zeros(len(self.ids), dtype=np.float32)
+            for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+                block = np.asarray(self.relevance[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+                self._norms[start:start + len(block)] = np.linalg.norm(block, axis=1)
+        return self._norms
+
+
+def build_tag_genome(ids, relevance: np.ndarray, tags: list, out_dir=TAG_GENOME_DIR) -> TagGenome:
+    """Ghi genome (``ids`` đã sort, cùng thứ tự với catalog) ra thư mục; trả về bản memory-map."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    np.save(out_dir / "ids.npy", np.asarray(ids, dtype=np.int64))
+    np.save(out_dir / "relevance.npy", np.asarray(relevance, dtype=np.float16))
+    with open(out_dir / "tags.json", "w", encoding="utf-8") as f:
+        json.dump(list(tags), f, ensure_ascii=False)
+    return TagGenome.open(out_dir)
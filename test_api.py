@@ -0,0 +1,99 @@
+import json
+import pickle
+import threading
+from http.client import HTTPConnection
+
+import pytest
+
+from api import ApiError, _int_param, make_server
+from artifacts import HotReloader
+from test_blending import make_scorer
+
+
+class StaticResolver:
+    def resolve(self, name, limiter=None):
+        return f"https://img.example/{name}.jpg"
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # Engine đọc artifact (và ratings_log.jsonl) trong thư mục hiện tại khi chưa có manifest
+    monkeypatch.chdir(tmp_path)
+    scorer = make_scorer()
+    scorer.save("svd_factors.npz")
+    with open("recipe_info.pkl", "wb") as f:
+        pickle.dump({int(rid): {"name": f"Dish {rid}", "tags": ["easy"]} for rid in scorer.item_ids}, f)
+    with open("recommendations_3models.pkl", "wb") as f:
+        pickle.dump({"fast": {}, "best": {}, "tag": {}}, f)
+    server = make_server(HotReloader(tmp_path / "artifacts"), port=0, resolver=StaticResolver())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request(server, method, path, body=None):
+    conn = HTTPConnection(*server.server_address[:2], timeout=10)
+    conn.request(method, path, body=None if body is None else json.dumps(body))
+    response = conn.getresponse()
+    payload = json.loads(response.read())
+    conn.close()
+    return response.status, payload
+
+
+@pytest.mark.parametrize("value, expected", [("7", 7), (" 12 ", 12), ("-3", -3), (5, 5)])
+def test_int_param_accepts_ints_and_digit_strings(value, expected):
+    assert _int_param(value, "k") == expected
+
+
+@pytest.mark.parametrize("value", [True, False, 2.7, 3.0, "1.5", "1e3", "", "abc", [1], None])
+def test_int_param_rejects_everything_else(value):
+    with pytest.raises(ApiError) as err:
+        _int_param(value, "k")
+    assert err.value.status == 400
+
+
+def test_int_param_range():
+    assert _int_param(None, "k", default=20, low=1, high=100) == 20
+    with pytest.raises(ApiError):
+        _int_param("0", "k", low=1, high=100)
+
+
+def test_get_recommend(server):
+    status, payload = request(server, "GET", "/recommend?user=101&model=fast&k=5")
+    assert status == 200
+    assert payload["user"] == 101 and payload["source"] == "online"
+    assert len(payload["items"]) == 5
+    assert payload["items"][0]["name"].startswith("Dish ")
+
+
+def test_post_recommend(server):
+    status, payload = request(server, "POST", "/recommend", {"users": [100, 102, 999], "model": "best", "k": 3})
+    assert status == 200
+    assert len(payload["results"]["100"]) == 3 and len(payload["results"]["102"]) == 3
+    assert payload["results"]["999"] is None
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("GET", "/recommend?user=101&k=0", None),
+    ("GET", "/recommend?user=101&k=2.5", None),
+    ("GET", "/recommend?user=101&model=nope", None),
+    ("POST", "/recommend", {"users": [100], "k": True}),
+    ("POST", "/recommend", {"users": [100], "model": "nope"}),
+    ("POST", "/recommend", {"users": [1.5]}),
+])
+def test_bad_parameters_are_400(server, method, path, body):
+    status, payload = request(server, method, path, body)
+    assert status == 400 and "error" in payload
+
+
+def test_unknown_user_and_route_are_404(server):
+    assert request(server, "GET", "/recommend?user=999")[0] == 404
+    assert request(server, "GET", "/nope")[0] == 404
+
+
+def test_health(server):
+    status, payload = request(server, "GET", "/health")
+    assert status == 200
+    assert payload == {"status": "ok", "version": None, "online": True, "users": 6}
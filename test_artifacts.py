@@ -0,0 +1,78 @@
+import pytest
+
+from artifacts import HotReloader, current_artifacts, publish, read_manifest, rollback
+
+
+class FakeEngine:
+    def __init__(self, path, version):
+        self.path, self.version = path, version
+
+    def warm(self):
+        if (self.path / "broken").exists():
+            raise RuntimeError("bad artifact")
+        return self
+
+
+def make_build(tmp_path, name, broken=False):
+    src = tmp_path / "builds" / name
+    src.mkdir(parents=True)
+    (src / "payload.txt").write_text(name)
+    if broken:
+        (src / "broken").write_text("")
+    return src
+
+
+def test_publish_copies_and_switches_current(tmp_path):
+    root = tmp_path / "artifacts"
+    assert current_artifacts(root)[0] is None
+    publish(make_build(tmp_path, "a"), "v1", root)
+    version, path = current_artifacts(root)
+    assert version == "v1" and (path / "payload.txt").read_text() == "a"
+    assert not list(root.glob(".staging-*"))
+    with pytest.raises(ValueError):
+        publish(make_build(tmp_path, "b"), "v1", root)
+    with pytest.raises(FileNotFoundError):
+        publish(tmp_path / "missing", "v2", root)
+
+
+def test_prune_keeps_recently_served_and_the_version_being_replaced(tmp_path):
+    root = tmp_path / "artifacts"
+    for v in ("v1", "v2", "v3"):
+        publish(make_build(tmp_path, v), v, root, keep=2)
+    assert sorted(p.name for p in root.iterdir() if p.is_dir()) == ["v2", "v3"]
+    # v3 publish sau v2 nhưng v2 được phục vụ gần đây hơn (rollback) ⇒ publish v4 xoá v3, giữ v2
+    rollback("v2", root)
+    publish(make_build(tmp_path, "v4"), "v4", root, keep=2)
+    manifest = read_manifest(root)
+    assert manifest["current"] == "v4"
+    assert manifest["served"] == ["v4", "v2"]
+    assert sorted(p.name for p in root.iterdir() if p.is_dir()) == ["v2", "v4"]
+
+
+def test_rollback(tmp_path):
+    root = tmp_path / "artifacts"
+    publish(make_build(tmp_path, "v1"), "v1", root)
+    publish(make_build(tmp_path, "v2"), "v2", root)
+    rollback("v1", root)
+    assert current_artifacts(root)[0] == "v1"
+    assert read_manifest(root)["served"][:2] == ["v1", "v2"]
+    with pytest.raises(ValueError):
+        rollback("v9", root)
+
+
+def test_hot_reloader_swaps_in_the_background_and_keeps_serving_on_failure(tmp_path):
+    root = tmp_path / "artifacts"
+    publish(make_build(tmp_path, "v1"), "v1", root)
+    store = HotReloader(root, loader=FakeEngine, poll_interval=0)
+    first = store.current()
+    assert first.version == "v1"
+
+    publish(make_build(tmp_path, "v2"), "v2", root)
+    store.current()
+    assert store.wait(timeout=5)
+    assert store.current().version == "v2" and first.version == "v1"
+
+    publish(make_build(tmp_path, "v3", broken=True), "v3", root)
+    store.current()
+    assert store.wait(timeout=5)
+    assert store.current().version == "v2"
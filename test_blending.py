@@ -0,0 +1,51 @@
+import numpy as np
+
+from blending import HybridBlender
+from scoring import QuantizedMatrix, SVDScorer
+
+
+def make_scorer(n_users=6, n_items=50, f=4, seed=0):
+    rng = np.random.default_rng(seed)
+    seen_indptr = np.arange(0, 2 * n_users + 1, 2)
+    seen_indices = rng.integers(0, n_items, 2 * n_users)
+    return SVDScorer(
+        np.arange(n_users) + 100, np.arange(n_items) + 1000,
+        rng.normal(size=(n_users, f)), rng.normal(size=(n_items, f)),
+        np.zeros(n_users), rng.normal(size=n_items), 3.5,
+        seen_indptr, seen_indices,
+    )
+
+
+def test_score_block_svd_only_ranks_like_scorer():
+    scorer = make_scorer()
+    rng = np.random.default_rng(1)
+    features = {"cbf_user": rng.normal(size=(6, 3)), "cbf_item": rng.normal(size=(50, 3))}
+    blender = HybridBlender(scorer, features)
+    rows = np.arange(4)
+    scores = blender.score_block(rows, 1.0, "cbf")
+    assert scores.shape == (4, 50)
+    np.testing.assert_array_equal(np.argsort(-scores, axis=1)[:, :10],
+                                  np.argsort(-scorer.score_block(rows), axis=1)[:, :10])
+
+
+def test_score_block_missing_secondary_falls_back_to_svd():
+    scorer = make_scorer()
+    blender = HybridBlender(scorer)
+    assert "tag" not in blender.names
+    rows = np.arange(3)
+    scores = blender.score_block(rows, 0.6, "tag")
+    np.testing.assert_array_equal(np.argsort(-scores, axis=1)[:, :10],
+                                  np.argsort(-scorer.score_block(rows), axis=1)[:, :10])
+
+
+def test_score_block_on_quantized_factors_matches_dense():
+    scorer = make_scorer(n_items=5000)
+    rng = np.random.default_rng(2)
+    features = {"cbf_user": rng.normal(size=(6, 3)), "cbf_item": rng.normal(size=(5000, 3))}
+    quantized = make_scorer(n_items=5000)
+    quantized.item_factors = QuantizedMatrix.quantize(scorer.item_factors)
+    dense = make_scorer(n_items=5000)
+    dense.item_factors = quantized.item_factors[:]
+    rows = np.arange(4)
+    np.testing.assert_allclose(HybridBlender(quantized, features).score_block(rows, 0.7, "cbf"),
+                               HybridBlender(dense, features).score_block(rows, 0.7, "cbf"), rtol=1e-4, atol=1e-4)
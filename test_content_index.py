@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from content_index import ContentNeighbours, TfidfIndex, build_neighbours
+
+
+def dense(index):
+    out = np.zeros((index.n_rows, len(index.vocab)), dtype=np.float64)
+    rows = np.repeat(np.arange(index.n_rows), np.diff(index.indptr))
+    out[rows, index.indices] = index.data
+    return out
+
+
+@pytest.fixture(scope="module")
+def index():
+    rng = np.random.default_rng(0)
+    tokens = [f"tag:t{i}" for i in range(40)]
+    return TfidfIndex.build([list(rng.choice(tokens, rng.integers(2, 6), replace=False)) for _ in range(300)],
+                            max_df=0.2)
+
+
+@pytest.mark.parametrize("block_size", [None, 1, 7, 300])
+def test_neighbours_match_brute_force_cosine(index, block_size):
+    positions, scores = build_neighbours(index, top_n=5, block_size=block_size, n_jobs=1)
+    x = dense(index)
+    sims = x @ x.T
+    np.fill_diagonal(sims, 0.0)
+    assert positions.shape == (300, 5)
+    for row in range(0, 300, 17):
+        ok = positions[row] >= 0
+        np.testing.assert_allclose(scores[row][ok], np.sort(sims[row])[::-1][:ok.sum()], rtol=2e-3)
+        np.testing.assert_allclose(sims[row, positions[row][ok]], scores[row][ok], rtol=2e-3)
+        assert row not in positions[row]
+
+
+def test_single_recipe_has_no_neighbours():
+    index = TfidfIndex.build([["tag:a", "ing:b"]], min_df=1, max_df=1.0)
+    positions, scores = build_neighbours(index, top_n=20, n_jobs=1)
+    assert positions.shape == (1, 0) and scores.shape == (1, 0)
+    assert ContentNeighbours([42], positions, scores).similar(42) == []
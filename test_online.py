@@ -0,0 +1,66 @@
+import numpy as np
+
+from blending import HybridBlender
+from online import OnlineUpdater, RatingsLog
+from test_blending import make_scorer
+
+
+def test_read_new_returns_only_complete_new_lines(tmp_path):
+    log = RatingsLog(tmp_path / "log.jsonl")
+    assert log.read_new() == []
+    log.append(100, 1000, 5)
+    log.append(101, 1001, 4)
+    assert [r["user_id"] for r in log.read_new()] == [100, 101]
+    assert log.read_new() == []
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write('{"user_id": 102, "recipe_id": 1002, "rating": 3.0}\n{"user_id": 10')
+    assert [r["user_id"] for r in log.read_new()] == [102]
+    with open(log.path, "a", encoding="utf-8") as f:
+        f.write('3, "recipe_id": 1003, "rating": 2.0}\n')
+    assert [r["user_id"] for r in log.read_new()] == [103]
+
+
+def test_replaced_log_is_read_from_the_start(tmp_path):
+    log = RatingsLog(tmp_path / "log.jsonl")
+    for i in range(3):
+        log.append(100, 1000 + i, 4)
+    log.read_new()
+    log.path.write_text('{"user_id": 101, "recipe_id": 1000, "rating": 1.0}\n')
+    assert [r["user_id"] for r in log.read_new()] == [101]
+
+
+def test_replay_on_restart_matches_incremental_fold_in(tmp_path):
+    live = make_scorer()
+    updater = OnlineUpdater(live, log=RatingsLog(tmp_path / "log.jsonl"))
+    for rid, rating in [(1003, 5.0), (1010, 1.0), (1003, 2.0), (1020, 4.0)]:
+        assert updater.rate(101, rid, rating) is not None
+    assert updater.rate(999, 1003, 5.0) is None
+
+    restarted = make_scorer()
+    OnlineUpdater(restarted, log=RatingsLog(tmp_path / "log.jsonl"))
+    np.testing.assert_allclose(restarted.user_factors[1], live.user_factors[1], rtol=1e-5)
+    np.testing.assert_allclose(restarted.user_bias[1], live.user_bias[1], rtol=1e-5)
+    assert restarted.is_folded(101) and not restarted.is_folded(100)
+    positions, ratings = restarted.user_ratings(1)
+    assert dict(zip(restarted.item_ids[positions].tolist(), ratings.tolist()))[1003] == 2.0
+
+
+def test_other_process_ratings_are_picked_up_by_sync(tmp_path):
+    writer = OnlineUpdater(make_scorer(), log=RatingsLog(tmp_path / "log.jsonl"))
+    reader_scorer = make_scorer()
+    reader = OnlineUpdater(reader_scorer, log=RatingsLog(tmp_path / "log.jsonl"))
+    writer.rate(102, 1030, 5.0)
+    assert list(reader.sync()) == [102]
+    assert 1030 in reader_scorer.item_ids[reader_scorer.seen_items(2)]
+    assert 1030 not in reader_scorer.recommend(102, 20)
+
+
+def test_fold_in_refreshes_cached_blend_scores(tmp_path):
+    scorer = make_scorer()
+    blender = HybridBlender(scorer)
+    before = blender.component_scores(100, ("svd",))[0].copy()
+    OnlineUpdater(scorer, blender, RatingsLog(tmp_path / "log.jsonl")).rate(100, 1040, 5.0)
+    after = blender.component_scores(100, ("svd",))[0]
+    fresh = scorer.score_user(100)
+    np.testing.assert_allclose(after, (fresh - fresh.mean()) / fresh.std(), rtol=1e-4, atol=1e-5)
+    assert not np.allclose(after, before)
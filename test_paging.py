@@ -0,0 +1,60 @@
+import pickle
+
+import pytest
+
+from engine import RecommenderEngine
+from paging import RecCursor
+from test_blending import make_scorer
+
+
+@pytest.fixture
+def engine(tmp_path):
+    scorer = make_scorer(n_items=800, f=6)
+    scorer.save(tmp_path / "svd_factors.npz")
+    with open(tmp_path / "recipe_info.pkl", "wb") as f:
+        pickle.dump({int(rid): {"name": f"Dish {rid}", "tags": []} for rid in scorer.item_ids}, f)
+    return RecommenderEngine.load(tmp_path)
+
+
+def pages(cursor, size):
+    out = [cursor.items]
+    while cursor.has_more:
+        out.append(cursor.more(size))
+    return out
+
+
+def test_cursor_pages_slice_one_ranking():
+    cursor = RecCursor(range(100), 20, depth=50)
+    assert cursor.items == list(range(20))
+    assert cursor.more(20) == list(range(20, 40))
+    assert cursor.more(20) == list(range(40, 50))
+    assert not cursor.has_more
+
+
+def test_precomputed_first_page_fetches_once_and_skips_shown():
+    calls = []
+
+    def fetch(n):
+        calls.append(n)
+        return [3, 1, 7, 2, 9, 8, 5]
+
+    cursor = RecCursor([1, 2, 3], 3, fetch, depth=6)
+    assert calls == [] and cursor.has_more
+    assert cursor.more(2) == [7, 9]
+    assert cursor.more(5) == [8]
+    assert calls == [6] and not cursor.has_more
+
+
+def test_online_pages_have_no_duplicates_and_first_page_matches_recommend(engine):
+    cursor = engine.cursor(101, "best", first=20, depth=120)
+    assert cursor.items == engine.recommend(101, "best", 20)[0]
+    shown = [rid for page in pages(cursor, 25) for rid in page]
+    assert len(shown) == 120 and len(set(shown)) == 120
+    assert shown == engine.recommend(101, "best", 120)[0]
+
+
+def test_mmr_pages_have_no_duplicates_and_first_page_matches_recommend(engine):
+    cursor = engine.cursor(102, "fast", first=10, diversity=0.5, depth=60)
+    assert cursor.items == engine.recommend(102, "fast", 10, diversity=0.5)[0]
+    shown = [rid for page in pages(cursor, 15) for rid in page]
+    assert len(shown) == 60 and len(set(shown)) == 60
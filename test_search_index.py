@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from search_index import RecipeSearchIndex, tokenize
+
+
+WORDS = ["chicken", "chickpea", "chili", "curry", "cake", "carrot", "soup", "salad", "spicy", "sweet"]
+TAGS = ["30-minutes-or-less", "main-dish", "desserts", "easy"]
+
+
+@pytest.fixture(scope="module")
+def recipes():
+    rng = np.random.default_rng(0)
+    info = {}
+    for rid in rng.choice(100000, 400, replace=False).tolist():
+        name = " ".join(rng.choice(WORDS, rng.integers(1, 4)))
+        info[rid] = {"name": name.title(), "tags": list(rng.choice(TAGS, rng.integers(0, 3), replace=False))}
+    return info
+
+
+def brute_force(info, query):
+    words = tokenize(query)
+    out = []
+    for rid in sorted(info):
+        terms = tokenize(info[rid]["name"]) + [w for t in info[rid]["tags"] for w in tokenize(t)]
+        if words and all(any(t.startswith(w) for t in terms) for w in words):
+            out.append(rid)
+    return out
+
+
+@pytest.mark.parametrize("query", ["chick", "chicken", "c", "chi curr", "Soup", "s sw", "30 min",
+                                   "easy cake", "dessert", "minutes", "zzz", "curry zzz", ""])
+def test_prefix_search_matches_brute_force(recipes, query):
+    index = RecipeSearchIndex.from_recipe_info(recipes)
+    ids, total = index.search(query, k=1000)
+    expected = brute_force(recipes, query)
+    assert ids == expected and total == len(expected)
+
+
+def test_term_range_covers_exactly_the_prefix():
+    index = RecipeSearchIndex.from_recipe_info({1: {"name": "chicken chickpea chili cake"}, 2: {"name": "chic"}})
+    lo, hi = index.term_range("chic")
+    assert index.vocab[lo:hi] == ["chic", "chicken", "chickpea"]
+    assert index.term_range("d") == (len(index.vocab), len(index.vocab))
+
+
+def test_weights_pick_the_highest_scoring_matches(recipes):
+    index = RecipeSearchIndex.from_recipe_info(recipes)
+    weights = np.arange(len(index), dtype=np.float32)
+    ids, total = index.search("c", k=5, weights=weights)
+    assert total > 5
+    assert ids == brute_force(recipes, "c")[::-1][:5]
+
+
+@pytest.mark.parametrize("small, large", [([2, 5, 9], list(range(0, 1000, 1))), ([1, 3, 5, 7], [3, 4, 5, 6])])
+def test_intersect_both_strategies(small, large):
+    small, large = np.array(small, dtype=np.int32), np.array(large, dtype=np.int32)
+    np.testing.assert_array_equal(RecipeSearchIndex.intersect(small, large), np.intersect1d(small, large))
+    np.testing.assert_array_equal(RecipeSearchIndex.intersect(large, small), np.intersect1d(small, large))
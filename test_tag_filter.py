@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from tag_filter import TagBitmapIndex, tokenize
+
+
+RECIPES = {
+    1: {"tags": ["vegetarian", "dessert"]},
+    2: {"tags": ["vegetarian", "30-minutes-or-less"]},
+    3: {"tags": ["dessert", "15-minutes-or-less"]},
+    4: {"tags": ["30-minutes-or-less"]},
+    5: {"tags": ["vegetarian", "main dish"]},
+    6: {"tags": []},
+}
+
+
+def matches(index, expr):
+    return index.ids[index.mask(expr)].tolist()
+
+
+@pytest.fixture
+def index():
+    return TagBitmapIndex.from_recipe_info(RECIPES)
+
+
+def test_tokenize_symbols_words_and_quoted_tags():
+    assert tokenize('a && !(b | "main dish")') == [
+        ("TAG", "a"), ("AND", None), ("NOT", None), ("(", None),
+        ("TAG", "b"), ("OR", None), ("TAG", "main dish"), (")", None),
+    ]
+    assert tokenize("x and not y") == [("TAG", "x"), ("AND", None), ("NOT", None), ("TAG", "y")]
+
+
+def test_and_binds_tighter_than_or(index):
+    assert matches(index, "dessert OR vegetarian AND 30-minutes-or-less") == [1, 2, 3]
+    assert matches(index, "vegetarian AND 30-minutes-or-less OR dessert") == [1, 2, 3]
+
+
+def test_not_binds_tighter_than_and(index):
+    assert matches(index, "NOT dessert AND vegetarian") == [2, 5]
+    assert matches(index, "!vegetarian") == [3, 4, 6]
+
+
+def test_parentheses_override_precedence(index):
+    assert matches(index, "(dessert OR vegetarian) AND 30-minutes-or-less") == [2]
+    assert matches(index, "NOT (dessert OR vegetarian)") == [4, 6]
+    assert matches(index, "vegetarian (30-minutes-or-less | 15-minutes-or-less)") == [2]
+
+
+def test_quoted_tag_and_counts(index):
+    assert matches(index, '"main dish"') == [5]
+    assert index.count(index.evaluate("vegetarian")) == 3
+    assert index.count(index.evaluate("NOT vegetarian")) == 3
+    np.testing.assert_array_equal(index.counts[[index.vocab.index("vegetarian"), index.vocab.index("dessert")]], [3, 2])
+
+
+def test_unknown_tag_raises(index):
+    with pytest.raises(ValueError, match="Không có tag"):
+        index.mask("vegetarian AND vegan")
+
+
+@pytest.mark.parametrize("expr", ["", "   ", "vegetarian AND", "(vegetarian", "vegetarian)", "OR dessert",
+                                  "NOT", '"unterminated'])
+def test_malformed_expression_raises(index, expr):
+    with pytest.raises(ValueError):
+        index.mask(expr)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from user_index import UserIndex
+
+
+IDS = [0, 5, 7, 12, 50, 51, 59, 123, 500, 512, 5000, 51234, 99999, 120000]
+
+
+def brute_force(prefix):
+    return sorted(i for i in IDS if str(i).startswith(prefix))
+
+
+@pytest.mark.parametrize("prefix", ["5", "51", "12", "1", "0", "9", "99999", "6", "120000", "1200001"])
+def test_prefix_ranges_match_string_prefixes_in_numeric_order(prefix):
+    index = UserIndex(IDS)
+    ids, total = index.search(prefix, page_size=100)
+    assert ids == brute_force(prefix) and total == len(ids)
+
+
+def test_paging_walks_across_ranges():
+    index = UserIndex(IDS)
+    expected = brute_force("5")
+    pages = [index.search("5", page=p, page_size=3) for p in range(4)]
+    assert [rid for ids, _ in pages for rid in ids] == expected
+    assert all(total == len(expected) for _, total in pages)
+    assert pages[-1][0] == []
+
+
+def test_empty_and_non_digit_prefix():
+    index = UserIndex(IDS)
+    assert index.search("", page_size=5) == (IDS[:5], len(IDS))
+    assert index.search("a1") == ([], 0)
+    assert index.search("01") == ([], 0)
+
+
+def test_from_sources_merges_and_dedups():
+    index = UserIndex.from_sources(np.array([3, 1, 2]), iter([2, 10]), None)
+    assert index.ids.tolist() == [1, 2, 3, 10]
+    assert 10 in index and 4 not in index
+    assert len(UserIndex.from_sources(None)) == 0
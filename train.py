@@ -0,0 +1,285 @@
+"""
+Pipeline train: từ dữ liệu Food.com thô ra đúng các artifact mà app.py đọc.
+
+- Đọc ``RAW_interactions.csv`` theo từng chunk, dựng ma trận rating CSR (user × recipe).
+- Train SVD có bias (r ≈ μ + b_u + b_i + p_u·q_i) bằng ALS: mỗi nửa bước giải các
+  hệ ridge của mọi user (hoặc item) bằng conjugate gradient vector hoá theo block,
+  các block chạy song song trên mọi core.
+- Đặc trưng nội dung từ ``RAW_recipes.csv``:
+  CBF = TF-IDF của tag + nguyên liệu, hashing xuống ``CBF_DIM`` chiều;
+  Tag = độ liên quan của ``TAG_DIM`` tag phổ biến nhất, ghi thành tag genome
+  (float16, cùng thứ tự hàng với catalog — xem tag_genome.py).
+  Profile của user = trung bình các vector item, trọng số = rating − rating TB của user.
+- Ghi: ``svd_factors.npz``, ``hybrid_features.npz``, thư mục ``recipe_catalog/`` và ``tag_genome/``
+  (thêm ``--neighbours``: bảng món tương tự ``neighbours.npz``, xem content_index.py).
+
+    python train.py --interactions RAW_interactions.csv --recipes RAW_recipes.csv --holdout 0.1
+"""
+import argparse
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from blending import HYBRID_FEATURES_PATH
+from catalog import CATALOG_DIR, build_catalog
+from content_index import NEIGHBOURS_PATH, build_from_recipes, read_recipes, recipe_tokens
+from scoring import ALS_REG, FACTORS_PATH, SVDScorer
+from tag_genome import TAG_GENOME_DIR, build_tag_genome
+
+
+CBF_DIM = 64
+TAG_DIM = 128
+# Tag xuất hiện ở quá nhiều recipe (vd. 'time-to-make') không mang thông tin
+MAX_TAG_DF = 0.5
+
+
+def read_ratings(path, chunksize: int = 200_000, min_rating: int = 1):
+    """Đọc interactions theo chunk; trả về (user_id, recipe_id, rating) dạng mảng NumPy."""
+    users, items, ratings = [], [], []
+    for chunk in pd.read_csv(path, usecols=["user_id", "recipe_id", "rating"], chunksize=chunksize):
+        # rating 0 của Food.com = review không chấm điểm
+        chunk = chunk[chunk["rating"] >= min_rating]
+        users.append(chunk["user_id"].to_numpy(np.int64))
+        items.append(chunk["recipe_id"].to_numpy(np.int64))
+        ratings.append(chunk["rating"].to_numpy(np.float32))
+    return np.concatenate(users), np.concatenate(items), np.concatenate(ratings)
+
+
+def to_csr(rows: np.ndarray, cols: np.ndarray, values: np.ndarray, n_rows: int):
+    """(hàng, cột, giá trị) → CSR (indptr, indices, data), sort theo (hàng, cột)."""
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return indptr, cols[order].astype(np.int32), values[order]
+
+
+def _row_blocks(indptr: np.ndarray, block_nnz: int):
+    """Chia các hàng thành những dải liên tục có tổng nnz ≈ ``block_nnz``."""
+    bounds = np.searchsorted(indptr, np.arange(0, indptr[-1], block_nnz), side="right") - 1
+    bounds = np.unique(np.concatenate([bounds, [len(indptr) - 1]]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def solve_side(indptr, indices, targets, other, reg: float, out, pool,
+               cg_steps: int = 3, block_nnz: int = 1 << 17):
+    """
+    1 nửa bước ALS: với mỗi hàng r giải xấp xỉ (XᵀX + reg·n_r·I) w = Xᵀy,
+    X = ``other[cột của r]``, y = ``targets`` của r, bằng vài bước conjugate gradient
+    khởi động từ nghiệm cũ trong ``out`` (ALS-CG). Không dựng ma trận d × d nào:
+    mỗi bước chỉ cần X·v theo từng rating rồi cộng dồn theo hàng (reduceat).
+    Ghi kết quả vào ``out`` (hàng rỗng ⇒ 0).
+    """
+    # Làm việc trên dạng chuyển vị (d × nnz) để reduceat chạy trên trục liên tục
+    other_t = np.ascontiguousarray(other.T)
+
+    def run(bounds):
+        r0, r1 = bounds
+        s, e = indptr[r0], indptr[r1]
+        counts = np.diff(indptr[r0:r1 + 1])
+        nonempty = counts > 0
+        block = out[r0:r1]
+        block[~nonempty] = 0
+        if s == e:
+            return
+        counts = counts[nonempty]
+        starts = indptr[r0:r1][nonempty] - s
+        seg = np.repeat(np.arange(len(counts)), counts)
+        xt = other_t[:, indices[s:e]]
+        lam = (reg * counts).astype(np.float32)
+
+        def matvec(v):
+            xv = (xt * v[:, seg]).sum(axis=0)
+            return np.add.reduceat(xt * xv, starts, axis=1) + lam * v
+
+        w = np.ascontiguousarray(block[nonempty].T)
+        r = np.add.reduceat(xt * targets[s:e], starts, axis=1) - matvec(w)
+        p = r.copy()
+        rs = (r * r).sum(axis=0)
+        for _ in range(cg_steps):
+            ap = matvec(p)
+            alpha = rs / np.maximum((p * ap).sum(axis=0), 1e-12)
+            w += alpha * p
+            r -= alpha * ap
+            rs_new = (r * r).sum(axis=0)
+            p = r + (rs_new / np.maximum(rs, 1e-12)) * p
+            rs = rs_new
+        block[nonempty] = w.T
+
+    list(pool.map(run, _row_blocks(indptr, block_nnz)))
+
+
+def train_als(u_rows, i_rows, ratings, n_users: int, n_items: int, factors: int = 32,
+              reg: float = ALS_REG, iterations: int = 10, n_jobs: int | None = None, seed: int = 0):
+    """
+    ALS cho SVD có bias. Trả về (P, Q, b_u, b_i, μ).
+    Bước user: ẩn [p_u, b_u], thiết kế [q_i, 1], mục tiêu r − μ − b_i; bước item đối xứng.
+    """
+    rng = np.random.default_rng(seed)
+    mu = float(ratings.mean())
+    by_user = to_csr(u_rows, i_rows, ratings, n_users)
+    by_item = to_csr(i_rows, u_rows, ratings, n_items)
+    # Thứ tự rating theo từng cách sort, để lấy bias của phía còn lại
+    user_order_items = by_user[1]
+    item_order_users = by_item[1]
+
+    user_side = np.zeros((n_users, factors + 1), dtype=np.float32)   # [p_u, b_u]
+    item_side = np.zeros((n_items, factors + 1), dtype=np.float32)   # [q_i, b_i]
+    item_side[:, :factors] = rng.normal(0, 0.1, (n_items, factors))
+    ones_u = np.ones((n_users, 1), dtype=np.float32)
+    ones_i = np.ones((n_items, 1), dtype=np.float32)
+
+    with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+        for it in range(iterations):
+            t0 = time.perf_counter()
+            design = np.hstack([item_side[:, :factors], ones_i])
+            targets = by_user[2] - mu - item_side[user_order_items, factors]
+            solve_side(by_user[0], by_user[1], targets, design, reg, user_side, pool)
+
+            design = np.hstack([user_side[:, :factors], ones_u])
+            targets = by_item[2] - mu - user_side[item_order_users, factors]
+            solve_side(by_item[0], by_item[1], targets, design, reg, item_side, pool)
+
+            pred = (mu + user_side[u_rows, factors] + item_side[i_rows, factors]
+                    + np.einsum("ij,ij->i", user_side[u_rows, :factors], item_side[i_rows, :factors]))
+            rmse = float(np.sqrt(((ratings - pred) ** 2).mean()))
+            print(f"ALS iter {it + 1}/{iterations}: train RMSE {rmse:.4f} ({time.perf_counter() - t0:.1f}s)")
+
+    return (user_side[:, :factors], item_side[:, :factors],
+            user_side[:, factors], item_side[:, factors], mu)
+
+
+def _tfidf_rows(tokens_per_item: list, dim: int, vocab: dict | None = None) -> np.ndarray:
+    """
+    TF-IDF (nhị phân × idf), chuẩn hoá L2, dạng dense (N × dim).
+    ``vocab`` = None: map token vào ``dim`` cột bằng crc32 có dấu (feature hashing);
+    ngược lại chỉ giữ token có trong ``vocab`` (token → cột).
+    """
+    n = len(tokens_per_item)
+    rows = np.repeat(np.arange(n), [len(t) for t in tokens_per_item])
+    codes, uniq = pd.factorize(pd.Series([t for tokens in tokens_per_item for t in tokens], dtype=object))
+    # 1 token lặp lại trong cùng recipe chỉ tính 1 lần
+    pairs = np.sort(rows * len(uniq) + codes)
+    pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])]
+    rows, codes = pairs // len(uniq), pairs % len(uniq)
+    df = np.bincount(codes, minlength=len(uniq))
+    idf = np.log((1 + n) / (1 + df)).astype(np.float32) + 1.0
+
+    if vocab is None:
+        hashes = np.array([zlib.crc32(t.encode("utf-8")) for t in uniq], dtype=np.int64)
+        cols = hashes % dim
+        weights = np.where(hashes >> 31 & 1, 1.0, -1.0).astype(np.float32) * idf
+    else:
+        cols = np.array([vocab.get(t, -1) for t in uniq], dtype=np.int64)
+        weights = idf
+    keep = cols[codes] >= 0
+    out = np.zeros((n, dim), dtype=np.float32)
+    np.add.at(out, (rows[keep], cols[codes[keep]]), weights[codes[keep]])
+    norm = np.linalg.norm(out, axis=1, keepdims=True)
+    out /= np.where(norm > 0, norm, 1.0)
+    return out
+
+
+def content_features(recipes: pd.DataFrame, item_ids: np.ndarray):
+    """Đặc trưng CBF (hashing TF-IDF) và tag (TAG_DIM tag phổ biến) theo đúng thứ tự ``item_ids``."""
+    recipes = recipes.drop_duplicates("id").set_index("id").reindex(item_ids)
+    tags = [t if isinstance(t, list) else [] for t in recipes["tags"]]
+    ingredients = [t if isinstance(t, list) else [] for t in recipes["ingredients"]]
+
+    cbf = _tfidf_rows([recipe_tokens(a, b) for a, b in zip(tags, ingredients)], CBF_DIM)
+
+    counts = pd.Series([t for ts in tags for t in set(ts)]).value_counts()
+    counts = counts[counts <= MAX_TAG_DF * len(item_ids)]
+    vocab = {t: i for i, t in enumerate(counts.index[:TAG_DIM])}
+    tag = _tfidf_rows(tags, TAG_DIM, vocab)
+    return cbf, tag, list(vocab)
+
+
+def user_profiles(indptr, indices, ratings, item_features: np.ndarray) -> np.ndarray:
+    """Profile user = Σ (r_ui − r̄_u) · x_i / n_u (vector hoá bằng reduceat)."""
+    counts = np.diff(indptr)
+    user_of = np.repeat(np.arange(len(counts)), counts)
+    mean = np.add.reduceat(ratings, indptr[:-1][counts > 0]) / counts[counts > 0]
+    means = np.zeros(len(counts), dtype=np.float32)
+    means[counts > 0] = mean
+    weighted = item_features[indices] * (ratings - means[user_of])[:, None]
+    out = np.zeros((len(counts), item_features.shape[1]), dtype=np.float32)
+    out[counts > 0] = np.add.reduceat(weighted, indptr[:-1][counts > 0], axis=0) / counts[counts > 0, None]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train SVD (ALS) + đặc trưng CBF/tag + catalog cho app")
+    parser.add_argument("--interactions", required=True, help="RAW_interactions.csv")
+    parser.add_argument("--recipes", required=True, help="RAW_recipes.csv")
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--reg", type=float, default=ALS_REG)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--min-user-ratings", type=int, default=5)
+    parser.add_argument("--holdout", type=float, default=0.0, help="Tỉ lệ rating giữ lại làm test")
+    parser.add_argument("--test-out", default="test_ratings.csv")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--neighbours", action="store_true", help="Build luôn neighbours.npz (món tương tự)")
+    args = parser.parse_args()
+    t_start = time.perf_counter()
+
+    users, items, ratings = read_ratings(args.interactions)
+    recipes = read_recipes(args.recipes)
+    print(f"Loaded {len(ratings):,} ratings, {len(recipes):,} recipes ({time.perf_counter() - t_start:.1f}s)")
+
+    # Chỉ giữ user có đủ số rating (giống thống kê "Số User (≥5)" trên app)
+    uniq_users, inverse, counts = np.unique(users, return_inverse=True, return_counts=True)
+    keep = counts[inverse] >= args.min_user_ratings
+    users, items, ratings = users[keep], items[keep], ratings[keep]
+
+    rng = np.random.default_rng(args.seed)
+    if args.holdout > 0:
+        test = rng.random(len(ratings)) < args.holdout
+        pd.DataFrame({"user_id": users[test], "recipe_id": items[test], "rating": ratings[test]}).to_csv(
+            args.test_out, index=False)
+        users, items, ratings = users[~test], items[~test], ratings[~test]
+        print(f"Held out {int(test.sum()):,} ratings → {args.test_out}")
+
+    user_ids, u_rows = np.unique(users, return_inverse=True)
+    item_ids = np.unique(np.concatenate([recipes["id"].to_numpy(np.int64), items]))
+    i_rows = np.searchsorted(item_ids, items)
+
+    # Trùng (user, recipe) thì giữ rating cuối cùng
+    key = u_rows.astype(np.int64) * len(item_ids) + i_rows
+    _, last = np.unique(key[::-1], return_index=True)
+    last = len(key) - 1 - last
+    u_rows, i_rows, ratings = u_rows[last], i_rows[last], ratings[last]
+
+    t0 = time.perf_counter()
+    p, q, bu, bi, mu = train_als(u_rows, i_rows, ratings, len(user_ids), len(item_ids),
+                                 args.factors, args.reg, args.iterations, args.jobs, args.seed)
+    print(f"ALS done in {time.perf_counter() - t0:.1f}s")
+
+    seen_indptr, seen_indices, seen_ratings = to_csr(u_rows, i_rows, ratings, len(user_ids))
+    SVDScorer(user_ids, item_ids, p, q, bu, bi, mu, seen_indptr, seen_indices, seen_ratings,
+              reg=args.reg).save(FACTORS_PATH)
+
+    cbf_item, tag_item, tag_names = content_features(recipes, item_ids)
+    np.savez(
+        HYBRID_FEATURES_PATH,
+        cbf_user=user_profiles(seen_indptr, seen_indices, seen_ratings, cbf_item), cbf_item=cbf_item,
+        tag_user=user_profiles(seen_indptr, seen_indices, seen_ratings, tag_item),
+    )
+
+    info = {int(rid): {"name": name, "tags": tags}
+            for rid, name, tags in zip(recipes["id"], recipes["name"], recipes["tags"])}
+    catalog = build_catalog(info, CATALOG_DIR)
+    # Genome theo đúng thứ tự hàng của catalog (item_ids của SVD ⊇ recipe trong catalog)
+    build_tag_genome(catalog.ids, tag_item[np.searchsorted(item_ids, catalog.ids)], tag_names, TAG_GENOME_DIR)
+    if args.neighbours:
+        build_from_recipes(recipes, n_jobs=args.jobs).save(NEIGHBOURS_PATH)
+    print(f"Wrote {FACTORS_PATH}, {HYBRID_FEATURES_PATH}, {CATALOG_DIR}/, {TAG_GENOME_DIR}/ "
+          f"in {time.perf_counter() - t_start:.1f}s total")
+
+
+if __name__ == "__main__":
+    main()
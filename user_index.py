@@ -0,0 +1,77 @@
+"""
+Index ID user cho ô tìm kiếm: mảng int64 đã sort, build 1 lần rồi dùng chung cho mọi rerun,
+nên widget chỉ nhận 1 trang nhỏ kết quả thay vì ``sorted(...)`` hàng chục nghìn ID.
+
+Tìm theo prefix chữ số không cần mảng chuỗi: các ID dài L chữ số bắt đầu bằng prefix ``p``
+(n chữ số) nằm đúng trong khoảng số ``[p·10^(L−n), (p+1)·10^(L−n))`` ⇒ mỗi độ dài là
+1 đoạn liên tiếp của mảng đã sort (2 lần binary search). Ghép các đoạn theo độ dài tăng
+dần cho kết quả đúng thứ tự số.
+"""
+import numpy as np
+
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class UserIndex:
+    """ID user (int64, sort tăng dần, không trùng) + tìm theo prefix có phân trang."""
+
+    def __init__(self, ids):
+        self.ids = np.unique(np.asarray(ids, dtype=np.int64))
+        self._max_digits = len(str(int(self.ids[-1]))) if len(self.ids) else 0
+
+    @classmethod
+    def from_sources(cls, *sources):
+        """Hợp các nguồn ID (mảng / iterable, bỏ qua None), vd. scorer + gợi ý tính sẵn."""
+        parts = [np.fromiter(s, dtype=np.int64) if not isinstance(s, np.ndarray) else s
+                 for s in sources if s is not None]
+        return cls(np.concatenate(parts) if parts else np.empty(0, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, user_id):
+        i = int(np.searchsorted(self.ids, user_id))
+        return i < len(self.ids) and self.ids[i] == user_id
+
+    def _prefix_ranges(self, prefix: str) -> list:
+        """Các đoạn [lo, hi) của ``ids`` có ID bắt đầu bằng ``prefix``, theo thứ tự số."""
+        if prefix.startswith("0"):
+            # ID không có số 0 ở đầu: chỉ "0" khớp chính nó
+            return [(0, 1)] if prefix == "0" and 0 in self else []
+        p, n = int(prefix), len(prefix)
+        ranges = []
+        for extra in range(self._max_digits - n + 1):
+            scale = 10 ** extra
+            lo, hi = np.searchsorted(self.ids, [p * scale, (p + 1) * scale])
+            if hi > lo:
+                ranges.append((int(lo), int(hi)))
+        return ranges
+
+    def search(self, prefix: str = "", page: int = 0, page_size: int = DEFAULT_PAGE_SIZE) -> tuple:
+        """
+        (ID của trang ``page``, tổng số ID khớp). Prefix rỗng ⇒ mọi user;
+        prefix không phải chữ số ⇒ không khớp.
+        """
+        prefix = (prefix or "").strip()
+        if not prefix:
+            ranges = [(0, len(self.ids))]
+        elif not prefix.isdigit():
+            return [], 0
+        else:
+            ranges = self._prefix_ranges(prefix)
+        total = sum(hi - lo for lo, hi in ranges)
+
+        # Bỏ qua page · page_size kết quả đầu, lấy page_size kết quả tiếp theo qua các đoạn
+        skip, need, out = page * page_size, page_size, []
+        for lo, hi in ranges:
+            if skip >= hi - lo:
+                skip -= hi - lo
+                continue
+            take = self.ids[lo + skip:min(hi, lo + skip + need)]
+            out.extend(take.tolist())
+            need -= len(take)
+            skip = 0
+            if need <= 0:
+                break
+        return out, total